@@ -0,0 +1,58 @@
+"""
+Benchmark the blacklist checks, run with `python -m benchmarks.bench_blacklist` from the repository root.
+The blacklist has every kind of rule, a tenth of the lines is blacklisted.
+"""
+import timeit
+
+from p2000.blacklist import Blacklist
+from p2000.rtlsdr import Line
+
+LINE = "FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|{0:09d}|ALN|{1}"
+CONFIG = {
+    "rtlsdr": {
+        "blacklist": {
+            "messages": ["ALN TESTOPROEP {0}".format(i) for i in range(100)],
+            "monitorcodes": ["{0:09d}".format(i) for i in range(100)],
+            "prefixes": ["ALN PROEFALARM", "ALN TEST"],
+            "wildcards": ["*OEFENING*", "ALN ? PROEF*"],
+            "patterns": [r"ALN (?:A|B)\d TESTBERICHT"]
+        }
+    }
+}
+
+
+def create_lines(count):
+    lines = []
+    for i in range(count):
+        if i % 10 == 0:
+            message = "TESTOPROEP {0}".format(i % 100)
+        else:
+            message = "A2 Dorpsstraat {0} Groningen".format(i)
+        lines.append(Line(LINE.format(1000000 + i, message)))
+    return lines
+
+
+def run(count=100000):
+    """
+    Run every benchmark.
+    :param count: The amount of lines to check per benchmark.
+    :return: A dict with the name of every benchmark and its lines per second.
+    """
+    blacklist = Blacklist(config=CONFIG, interval=None)
+    lines = create_lines(count)
+    assert sum(blacklist.is_line_blacklisted(line) for line in lines) == count // 10
+
+    def check(function):
+        seconds = min(timeit.repeat(lambda: [function(line) for line in lines], number=1, repeat=5))
+        return int(count / seconds)
+
+    return {
+        "is_line_blacklisted": check(blacklist.is_line_blacklisted),
+        "is_monitorcode_blacklisted": check(blacklist.is_monitorcode_blacklisted),
+        "is_message_blacklisted": check(blacklist.is_message_blacklisted),
+    }
+
+
+if __name__ == '__main__':
+    for name, value in sorted(run().items()):
+        print("{0:<28} {1:>10} lines/sec".format(name, value))
@@ -0,0 +1,52 @@
+"""
+Benchmark the extraction of structured alarm fields, run with `python -m benchmarks.bench_extraction`
+from the repository root. The corpus holds messages in the formats of the P2000 network, ambulance,
+fire department, police and KNRM, and is repeated to the requested amount.
+"""
+import os
+import timeit
+
+from p2000.extraction import extract, extract_many
+from p2000.rtlsdr import Line
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "p2000.log")
+
+
+def load_corpus(count):
+    """
+    :param count: The amount of lines.
+    :return: A list with the FLEX Line objects of the corpus, repeated to the given amount.
+    """
+    with open(CORPUS, "rb") as corpus:
+        lines = [Line.parse(raw) for raw in corpus if raw.strip()]
+    return (lines * (count // len(lines) + 1))[:count]
+
+
+def rate(statement, number):
+    """
+    Time the given statement.
+    :param statement: A callable without arguments.
+    :param number: The amount of messages handled by one call of the statement.
+    :return: The amount of messages per second as an int.
+    """
+    seconds = min(timeit.repeat(statement, number=1, repeat=5))
+    return int(number / seconds)
+
+
+def run(count=20000):
+    """
+    Run every benchmark.
+    :param count: The amount of messages per benchmark.
+    :return: A dict with the name of every benchmark and its messages per second.
+    """
+    lines = load_corpus(count)
+    messages = [line.message for line in lines]
+    return {
+        "extract": rate(lambda: [extract(m) for m in messages], count),
+        "extract_many": rate(lambda: extract_many(lines), count),
+    }
+
+
+if __name__ == '__main__':
+    for name, value in sorted(run().items()):
+        print("{0:<24} {1:>10} messages/sec".format(name, value))
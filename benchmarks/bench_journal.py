@@ -0,0 +1,47 @@
+"""
+Benchmark the Journal, run with `python -m benchmarks.bench_journal` from the repository root.
+Lines are appended with every fsync policy, then the whole journal is replayed and replayed from the middle.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from p2000.journal import Journal
+
+RAW = b"FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|001523172 000123456|ALN|A2 Dorpsstraat 9711AA Groningen\n"
+
+
+def run(count=50000):
+    """
+    Run every benchmark.
+    :param count: The amount of lines per benchmark, the "always" policy appends a tenth of them.
+    :return: A dict with the name of every benchmark and its lines per second.
+    """
+    results = {}
+    directory = tempfile.mkdtemp(prefix="p2000-bench-")
+    try:
+        for policy in Journal.POLICIES:
+            amount = max(count // 10, 1) if policy == Journal.ALWAYS else count
+            journal = Journal(os.path.join(directory, policy), fsync=policy, segment_size=1024 * 1024)
+            start = time.time()
+            for _ in range(amount):
+                journal.append(RAW)
+            journal.close()
+            results["append_" + policy] = int(amount / (time.time() - start))
+        journal = Journal(os.path.join(directory, Journal.NEVER))
+        start = time.time()
+        replayed = sum(1 for _ in journal.replay())
+        results["replay"] = int(replayed / (time.time() - start))
+        start = time.time()
+        replayed = sum(1 for _ in journal.replay(offset=journal.end // 2))
+        results["replay_from_offset"] = int(replayed / (time.time() - start))
+        journal.close()
+    finally:
+        shutil.rmtree(directory)
+    return results
+
+
+if __name__ == '__main__':
+    for name, value in sorted(run().items()):
+        print("{0:<24} {1:>10} lines/sec".format(name, value))
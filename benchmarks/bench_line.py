@@ -0,0 +1,66 @@
+"""
+Micro-benchmark for FLEX Line parsing, run with `python -m benchmarks.bench_line` from the repository root.
+The legacy parser is the Line implementation from before the single-pass parser, it is kept here for comparison.
+Line parses more than the legacy parser, the time, the capcodes and the FLEX frame fields, at about the same rate.
+Splitting the raw bytes and decoding only the needed fields was measured to be slower than decoding the line once.
+The gain is in `single_blacklist`, a raw line is parsed once instead of once per blacklist check.
+"""
+import timeit
+
+from p2000.rtlsdr import Line, parse_many
+
+RAW = b"FLEX: 2018-09-15 21:42:05 1600/2/K/A 10.120 [001523172] ALN A2 Dorpsstraat Groningen 12345 x\n"
+
+
+class LegacyLine:
+
+    def __init__(self, line, **kwargs):
+        words = line.split()
+        self.line = line
+        self.timestamp = kwargs.get('timestamp', " ".join(words[1:2]))
+        self.monitorcode = kwargs.get('monitorcode', words[5].strip("[]"))
+        self.message = kwargs.get('message', " ".join(words[6:-1]))
+
+
+def legacy_blacklist(raw, messages, monitorcodes):
+    # is_monitorcode_blacklisted and is_message_blacklisted each decoded and split the raw line.
+    return (LegacyLine(raw.decode("utf-8").rstrip()).monitorcode in monitorcodes
+            or LegacyLine(raw.decode("utf-8").rstrip()).message in messages)
+
+
+def single_blacklist(raw, messages, monitorcodes):
+    line = Line.parse(raw)
+    return line.monitorcode in monitorcodes or line.message in messages
+
+
+def rate(statement, number):
+    """
+    Time the given statement.
+    :param statement: A callable without arguments.
+    :param number: The amount of lines handled by one call of the statement.
+    :return: The amount of lines per second as an int.
+    """
+    seconds = min(timeit.repeat(statement, number=1, repeat=5))
+    return int(number / seconds)
+
+
+def run(count=100000):
+    """
+    Run every benchmark.
+    :param count: The amount of lines to parse per benchmark.
+    :return: A dict with the name of every benchmark and its lines per second.
+    """
+    raws = [RAW] * count
+    buffer = RAW * count
+    return {
+        "legacy_line": rate(lambda: [LegacyLine(r.decode("utf-8").rstrip()) for r in raws], count),
+        "line_parse": rate(lambda: [Line.parse(r) for r in raws], count),
+        "parse_many": rate(lambda: parse_many(buffer), count),
+        "legacy_blacklist": rate(lambda: [legacy_blacklist(r, [], []) for r in raws], count),
+        "single_blacklist": rate(lambda: [single_blacklist(r, [], []) for r in raws], count),
+    }
+
+
+if __name__ == '__main__':
+    for name, value in sorted(run().items()):
+        print("{0:<20} {1:>10} lines/sec".format(name, value))
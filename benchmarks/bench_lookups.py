@@ -0,0 +1,86 @@
+"""
+Benchmark the Region and Discipline lookups, run with `python -m benchmarks.bench_lookups` from the repository root.
+The ids are those of stored units and alarms, the titles those of the sidebar links the Scraper matches,
+the messages those of decoded alarms. Bulk row conversion converts stored unit rows back to Units, as every read does.
+"""
+import os
+import shutil
+import tempfile
+import timeit
+
+from p2000 import Unit, Region, Discipline
+from p2000.storage.units import Connection, SQLiteConnection, CapcodeIndex
+
+REGION_IDS = [region.value["id"] for region in Region] + ["99"]
+DISCIPLINE_IDS = [discipline.value["id"] for discipline in Discipline] + ["99"]
+TITLES = [
+    "Capcodes Brandweer Roepnummers", "Capcodes Ambulance & GHOR", "Capcodes Politie en COPI",
+    "Capcodes KNRM", "Capcodes Gemeente", "Capcodes OvD-G Regio"
+]
+MESSAGES = [
+    "A1 Ambulance 17123 Rit 93412 Coolsingel 3012AD Rotterdam", "P 1 BRT-01 Brand woning Dorpsstraat Zwolle 051131",
+    "P 2 Assistentie Politie Stationsplein Utrecht", "Proefalarm", "KNRM Reddingboot Scheveningen",
+    "B1 15101 Rit 11873 Van Hoytemastraat Den Haag"
+]
+
+
+def rate(statement, number):
+    """
+    Time the given statement.
+    :param statement: A callable without arguments.
+    :param number: The amount of lookups done by one call of the statement.
+    :return: The amount of lookups per second as an int.
+    """
+    seconds = min(timeit.repeat(statement, number=1, repeat=5))
+    return int(number / seconds)
+
+
+def capcode_index(count):
+    """
+    Build a CapcodeIndex over blocks of 100 units per region and discipline, in a temporary SQLite database.
+    :param count: The amount of units.
+    :return: The built CapcodeIndex.
+    """
+    directory = tempfile.mkdtemp(prefix="p2000-bench-")
+    try:
+        connection = SQLiteConnection(os.path.join(directory, "units.sqlite3")).establish()
+        labels = [(r, d) for r in Region.all() for d in Discipline.all()]
+        connection.write_units([
+            Unit(capcode=str(1000000 + i * 37), region=labels[i // 100 % len(labels)][0], town="Town",
+                 function="Function", discipline=labels[i // 100 % len(labels)][1]) for i in range(count)
+        ])
+        index = CapcodeIndex(connection).build()
+        connection.close()
+        return index
+    finally:
+        shutil.rmtree(directory)
+
+
+def run(count=20000):
+    """
+    Run every benchmark.
+    :param count: The amount of lookups per benchmark.
+    :return: A dict with the name of every benchmark and its lookups per second.
+    """
+    region_ids = (REGION_IDS * (count // len(REGION_IDS) + 1))[:count]
+    discipline_ids = (DISCIPLINE_IDS * (count // len(DISCIPLINE_IDS) + 1))[:count]
+    titles = (TITLES * (count // len(TITLES) + 1))[:count]
+    messages = (MESSAGES * (count // len(MESSAGES) + 1))[:count]
+    rows = [{"capcode": "{0:09d}".format(i), "region": r, "town": "Town", "function": "Function", "discipline": d}
+            for i, (r, d) in enumerate(zip(region_ids, discipline_ids))]
+    connection = Connection()
+    index = capcode_index(count)
+    capcodes = ["{0:09d}".format(1000000 + i * 23) for i in range(count)]
+    return {
+        "region_match_by_id": rate(lambda: [Region.match_by_id(i) for i in region_ids], count),
+        "discipline_match_by_id": rate(lambda: [Discipline.match_by_id(i) for i in discipline_ids], count),
+        "discipline_match": rate(lambda: [Discipline.match(t) for t in titles], count),
+        "discipline_classify": rate(lambda: [Discipline.classify(m) for m in messages], count),
+        "capcode_index_guess": rate(lambda: [index.guess(c) for c in capcodes], count),
+        "unit_row_to_object": rate(lambda: [connection.row_to_object(r) for r in rows], count),
+    }
+
+
+if __name__ == '__main__':
+    for name, value in sorted(run().items()):
+        print("{0:<24} {1:>10} lookups/sec".format(name, value))
@@ -0,0 +1,81 @@
+"""
+Benchmark the path from decoded line to stored alarm, run with `python -m benchmarks.bench_reader`
+from the repository root. A recording is replayed as fast as possible through a reader,
+every line is written by a BufferedWriter to a local stand-in database:
+    * sqlite - A temporary SQLite file, see `alarms.SQLiteConnection`.
+    * memory - The in-memory collections of `benchmarks.memory`, it measures the overhead of the reader itself.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from p2000.blacklist import Blacklist
+from p2000.replay import ReplayConnection
+from p2000.rtlsdr import AbstractReader
+from p2000.storage.alarms import SQLiteConnection, BufferedWriter
+from benchmarks.memory import MemoryConnection
+
+LINE = "FLEX|2018-09-15 {0:02d}:{1:02d}:{2:02d}|1600/2/K/A|10.120|{3:09d} {4:09d}|ALN|A2 Dorpsstraat {5} Groningen\n"
+CONFIG = {"rtlsdr": {"blacklist": {"messages": [], "monitorcodes": []}}}
+
+
+class NullReader(AbstractReader):
+
+    def act(self, line):
+        pass
+
+
+def write_recording(path, count):
+    with open(path, "w") as f:
+        for i in range(count):
+            second = i // 10
+            f.write(LINE.format(second // 3600 % 24, second // 60 % 60, second % 60, i % 5000, 1000000 + i, i))
+
+
+def measure(path, connection, count, workers):
+    """
+    Replay the recording through a reader into the given connection.
+    :return: A dict with the lines per second, and the average and maximum latency in ms when pipelined.
+    """
+    reader = NullReader(blacklist=Blacklist(config=CONFIG, interval=None), workers=workers)
+    writer = BufferedWriter(connection, batch_size=500, interval=0.05, spool_size=count)
+    reader.add_writer(writer)
+    start = time.time()
+    writer.start()
+    reader.attach(ReplayConnection(path, speed=None))
+    writer.stop()
+    seconds = time.time() - start
+    assert writer.written == count, writer.error
+    result = {"lines_per_sec": int(count / seconds)}
+    if reader.stats is not None:
+        result["latency_avg_ms"] = round(reader.stats.latency_avg * 1000, 3)
+        result["latency_max_ms"] = round(reader.stats.latency_max * 1000, 3)
+    return result
+
+
+def run(count=20000, workers=2):
+    """
+    Run every benchmark.
+    :param count: The amount of lines in the recording.
+    :param workers: The amount of workers of the pipelined reader.
+    :return: A dict with the results of every benchmark, see `measure`.
+    """
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "flex.log")
+        write_recording(path, count)
+        result = {}
+        for name, pipelined in (("inline", 0), ("pipelined", workers)):
+            result["memory_" + name] = measure(path, MemoryConnection(), count, pipelined)
+            connection = SQLiteConnection(os.path.join(directory, name + ".sqlite3")).establish()
+            result["sqlite_" + name] = measure(path, connection, count, pipelined)
+            connection.close()
+        return result
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    for name, values in sorted(run().items()):
+        print("{0:<22} {1}".format(name, ", ".join("{0}={1}".format(k, v) for k, v in sorted(values.items()))))
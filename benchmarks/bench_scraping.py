@@ -0,0 +1,48 @@
+"""
+Benchmark the Scraper parser backends, run with `python -m benchmarks.bench_scraping` from the repository root.
+The saved discipline page is blown up to the size of a large region, with site chrome around the table.
+"""
+import timeit
+
+from p2000.storage.units.parsing import PARSERS, get_parser
+from tests.stand_in import fixture
+
+ROW = "<tr><td>{0:07d}</td><td>Groningen</td><td>Brandweer Groningen Post {0} &amp; Haren</td></tr>\n"
+CHROME = "<div class=\"jw-menu\"><a href=\"/x\">Menu item</a><p>Some text</p></div>\n"
+
+
+def region_page(rows=2000, chrome=500):
+    """
+    Build a page like the discipline page of a large region.
+    :param rows: The amount of rows in the units table.
+    :param chrome: The amount of navigation blocks before and after the table.
+    :return: The html as a String.
+    """
+    page = fixture("brandweer.html").decode("utf-8")
+    body = "".join(ROW.format(i) for i in range(rows))
+    start = page.index("<tbody>") + len("<tbody>")
+    end = page.index("</tbody>")
+    page = page[:start] + body + page[end:]
+    return page.replace("<body>", "<body>" + CHROME * chrome).replace("</body>", CHROME * chrome + "</body>")
+
+
+def run(rows=2000):
+    """
+    Run every benchmark.
+    :param rows: The amount of rows in the units table.
+    :return: A dict with the name of every backend and the amount of pages it parses per second.
+    """
+    page = region_page(rows)
+    expected = get_parser("soup").rows(page)
+    result = {}
+    for name in sorted(PARSERS):
+        parser = get_parser(name)
+        assert parser.rows(page) == expected, name
+        seconds = min(timeit.repeat(lambda: parser.rows(page), number=1, repeat=5))
+        result[name] = round(1.0 / seconds, 2)
+    return result
+
+
+if __name__ == '__main__':
+    for name, value in sorted(run().items()):
+        print("{0:<10} {1:>8} pages/sec".format(name, value))
@@ -0,0 +1,119 @@
+"""
+Benchmark the storage backends, run with `python -m benchmarks.bench_storage` from the repository root.
+Both backends insert the same units and alarms and then look the units up by capcode.
+MongoDB is the server in config.json, its backend is skipped when it cannot be reached.
+The benchmark writes to the P2000Benchmark database and a temporary SQLite file, never to the configured data.
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from p2000 import Unit, Region, Discipline
+from p2000.rtlsdr import Line
+from p2000.storage import alarms, units
+
+FLEX = "FLEX|2018-09-15 21:{0:02d}:{1:02d}|1600/2/K/A|10.120|{2:09d}|ALN|A2 Dorpsstraat Groningen"
+
+
+class MongoUnits(units.Connection):
+
+    def db_name(self):
+        return "P2000Benchmark"
+
+
+class MongoAlarms(alarms.Connection):
+
+    def db_name(self):
+        return "P2000Benchmark"
+
+
+def create_units(amount):
+    return [
+        Unit(capcode="{0:07d}".format(i), region=Region.GRONINGEN, town="Groningen",
+             function="Post {0}".format(i), discipline=Discipline.FIRE_DEPARTMENT)
+        for i in range(amount)
+    ]
+
+
+def create_lines(amount):
+    return [Line(FLEX.format(i // 60 % 60, i % 60, i % 5000)) for i in range(amount)]
+
+
+def rate(amount, function):
+    start = time.time()
+    function()
+    return round(amount / (time.time() - start), 1)
+
+
+def measure(unit_connection, alarm_connection, amount, batch_size):
+    """
+    Measure the throughput of one backend.
+    :return: A dict with the amount of units and alarms inserted, and units found, per second.
+    """
+    unit_connection.drop_collection()
+    alarm_connection.drop_collection()
+    rows = create_units(amount)
+    lines = create_lines(amount)
+    capcodes = [u.capcode for u in rows]
+
+    def insert_units():
+        for start in range(0, amount, batch_size):
+            unit_connection.write_units(rows[start:start + batch_size])
+
+    def insert_alarms():
+        for start in range(0, amount, batch_size):
+            alarm_connection.write_alarms(lines[start:start + batch_size])
+
+    def find_units():
+        for capcode in capcodes:
+            unit_connection.find_units(capcode)
+
+    def find_units_many():
+        for start in range(0, amount, batch_size):
+            unit_connection.find_units_many(capcodes[start:start + batch_size])
+
+    return {
+        "insert_units": rate(amount, insert_units),
+        "insert_alarms": rate(amount, insert_alarms),
+        "find_units": rate(amount, find_units),
+        "find_units_many": rate(amount, find_units_many)
+    }
+
+
+def run(amount=10000, batch_size=100):
+    """
+    Run every benchmark.
+    :param amount: The amount of units and alarms to write and look up.
+    :param batch_size: The amount of units or alarms per write, and capcodes per `find_units_many`.
+    :return: A dict with a dict of rates for every backend, None for a backend that could not be reached.
+    """
+    result = {}
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, "benchmark.sqlite3")
+        unit_connection = units.SQLiteConnection(path).establish()
+        alarm_connection = alarms.SQLiteConnection(path).establish()
+        result["sqlite"] = measure(unit_connection, alarm_connection, amount, batch_size)
+        unit_connection.close()
+        alarm_connection.close()
+    finally:
+        shutil.rmtree(directory)
+    try:
+        unit_connection = MongoUnits().establish(timeout=1)
+        alarm_connection = MongoAlarms().establish(timeout=1)
+    except IOError:
+        result["mongo"] = None
+    else:
+        result["mongo"] = measure(unit_connection, alarm_connection, amount, batch_size)
+        unit_connection.client.drop_database("P2000Benchmark")
+    return result
+
+
+if __name__ == '__main__':
+    for backend, rates in sorted(run().items()):
+        if rates is None:
+            print("{0:<8} unavailable".format(backend))
+            continue
+        for name, value in sorted(rates.items()):
+            print("{0:<8} {1:<16} {2:>10} /sec".format(backend, name, value))
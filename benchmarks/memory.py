@@ -0,0 +1,45 @@
+"""
+An in-memory stand-in for the MongoDB collections of the alarms Connection, so the reader benchmark measures the
+reader and the BufferedWriter rather than a database. Only what `alarms.Connection.write_alarms` uses is supported:
+`insert_many` keyed on the `_id` of the rows, and `bulk_write` with upserted `$inc` updates for the rollups.
+"""
+from pymongo.errors import BulkWriteError
+
+from p2000.storage.alarms import Connection
+from p2000.storage.alarms.database import DUPLICATE_KEY
+
+
+class MemoryCollection:
+
+    def __init__(self):
+        self.rows = {}
+
+    def insert_many(self, rows, ordered=True):
+        errors = []
+        for index, row in enumerate(rows):
+            if row["_id"] in self.rows:
+                errors.append({"index": index, "code": DUPLICATE_KEY, "errmsg": "E11000 duplicate key error"})
+                if ordered:
+                    break
+                continue
+            self.rows[row["_id"]] = dict(row)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(rows) - len(errors)})
+
+    def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            key = tuple(sorted(operation._filter.items()))
+            row = self.rows.setdefault(key, dict(operation._filter))
+            for field, value in operation._doc["$inc"].items():
+                row[field] = row.get(field, 0) + value
+
+
+class MemoryConnection(Connection):
+    """
+    An alarms Connection that writes the alarms and rollups to MemoryCollections.
+    """
+
+    def __init__(self):
+        super(MemoryConnection, self).__init__()
+        self.collection = MemoryCollection()
+        self.rollups = MemoryCollection()
@@ -0,0 +1,77 @@
+"""
+Run every benchmark and write the results as JSON, run with `python -m benchmarks.suite` from the repository root.
+Nothing needs a dongle or network, the MongoDB storage benchmark is skipped when the server in config.json
+cannot be reached. Compare the JSON files of 2 releases to spot regressions.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --only line blacklist --quick
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+import p2000
+from benchmarks import bench_blacklist, bench_extraction, bench_journal, bench_line, bench_lookups, bench_reader, \
+    bench_scraping, bench_storage
+
+# The name of every benchmark, its module and the arguments of a quick run.
+BENCHMARKS = [
+    ("line", bench_line, {"count": 10000}),
+    ("blacklist", bench_blacklist, {"count": 10000}),
+    ("lookups", bench_lookups, {"count": 2000}),
+    ("extraction", bench_extraction, {"count": 2000}),
+    ("scraping", bench_scraping, {"rows": 200}),
+    ("storage", bench_storage, {"amount": 1000}),
+    ("reader", bench_reader, {"count": 2000}),
+    ("journal", bench_journal, {"count": 2000}),
+]
+
+
+def run(only=None, quick=False):
+    """
+    Run the benchmarks.
+    :param only: The names of the benchmarks to run, default is every benchmark.
+    :param quick: Run every benchmark on a small input, to check that the suite works.
+    :return: A JSON serializable dict with the environment and the results of every benchmark.
+    :raises ValueError: When one of the names is unknown.
+    """
+    names = [name for name, _, _ in BENCHMARKS]
+    for name in only or []:
+        if name not in names:
+            raise ValueError("Unknown benchmark '{0}', choose from {1}.".format(name, names))
+    results = {}
+    for name, module, arguments in BENCHMARKS:
+        if only and name not in only:
+            continue
+        start = time.time()
+        results[name] = module.run(**(arguments if quick else {}))
+        results[name]["seconds"] = round(time.time() - start, 3)
+    return {
+        "version": p2000.VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "quick": quick,
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the P2000 benchmarks.")
+    parser.add_argument("--output", help="The file to write the JSON results to, default is stdout.")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="Only run these benchmarks.")
+    parser.add_argument("--quick", action="store_true", help="Run on small inputs, to check the suite works.")
+    args = parser.parse_args(argv)
+    result = run(args.only, args.quick)
+    if args.output is None:
+        json.dump(result, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
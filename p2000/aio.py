@@ -0,0 +1,217 @@
+import abc
+import asyncio
+import os
+
+from requests import ConnectionError
+
+from p2000.rtlsdr import Connection, AbstractReader
+
+
+class AsyncConnection:
+    """
+    The asyncio variant of `rtlsdr.Connection`.
+    rtl_fm and multimon-ng are started with `asyncio.create_subprocess_exec` and connected with an OS pipe,
+    so reading the decoded lines never blocks the event loop.
+    The raw lines can be read with `async for line in connection`.
+    """
+
+    COMMAND_RTLFM = Connection.COMMAND_RTLFM
+    COMMAND_MULTI = Connection.COMMAND_MULTI
+
+    def __init__(self, **kwargs):
+        """
+        Create a new AsyncConnection.
+        :keyword limit: The maximum length in bytes of a single line, default is 64 KiB.
+        :keyword timeout: The amount of seconds to wait for the processes to terminate on kill, default is 2.
+        """
+        self.limit = kwargs.get("limit", 2 ** 16)
+        self.timeout = kwargs.get("timeout", 2)
+        self.rtlfm_process = None
+        self.multi_process = None
+        self.stdout = None
+
+    async def open(self, **kwargs):
+        """
+        Open a new connection with the RTLSDR antenna.
+        Spawns the same 2 processes as `rtlsdr.Connection.open`, the output of rtl_fm is piped into multimon-ng.
+        :return: Nothing
+        """
+        read, write = os.pipe()
+        try:
+            self.rtlfm_process = await asyncio.create_subprocess_exec(*self.COMMAND_RTLFM, stdout=write)
+            self.multi_process = await asyncio.create_subprocess_exec(
+                *self.COMMAND_MULTI, stdin=read, stdout=asyncio.subprocess.PIPE, limit=self.limit
+            )
+        finally:
+            # The children hold their own copies of the pipe, multimon-ng sees EOF as soon as rtl_fm exits.
+            os.close(read)
+            os.close(write)
+        self.stdout = self.multi_process.stdout
+
+    async def kill(self):
+        """
+        Terminate the processes started by this connection, other rtl_fm processes are left alone.
+        Processes that do not exit within `self.timeout` seconds are killed.
+        :return: Nothing
+        """
+        for process in (self.rtlfm_process, self.multi_process):
+            if process is None or process.returncode is not None:
+                continue
+            try:
+                process.terminate()
+                await asyncio.wait_for(process.wait(), self.timeout)
+            except ProcessLookupError:
+                pass
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+        self.stdout = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        line = await self.stdout.readline()
+        if not line:
+            raise StopAsyncIteration
+        return line
+
+
+class AsyncAbstractReader(AbstractReader):
+    """
+    The asyncio variant of `rtlsdr.AbstractReader`.
+    The user should extend this class and create his/her own implementation of the `async def act(line)` method.
+    Unlike `AbstractReader.act`, act receives a FLEX Line object instead of the raw line.
+
+    The next line is only read once act has finished, or once a slot is free when `concurrency` is above 1,
+    so a slow act backs up the pipe instead of filling memory.
+    Cancelling the task that runs `attach` terminates the processes of the connection.
+    Lines that are not FLEX lines, like multimon-ng status output, are skipped. Attached writers receive every
+    FLEX line that is not blacklisted, before act(line) is called.
+
+    :ivar concurrency: The maximum amount of act(line) calls that run at the same time.
+    """
+
+    # The keywords of AbstractReader that only apply to the threaded reader, use `concurrency` instead of workers.
+    UNSUPPORTED = ("workers", "queue_size", "overflow", "spill_path", "metrics", "dedup", "journal")
+
+    def __init__(self, **kwargs):
+        """
+        Create a new AsyncReader.
+        :keyword encoding: The encoding for the received lines, default is UTF-8.
+        :keyword concurrency: The maximum amount of act(line) calls that run at the same time, default is 1.
+        :raises ValueError: When a keyword of `AbstractReader` is given that the asyncio variant does not support,
+            see UNSUPPORTED.
+        """
+        unsupported = [key for key in self.UNSUPPORTED if kwargs.get(key) is not None]
+        if unsupported:
+            raise ValueError("The AsyncAbstractReader does not support {0}.".format(", ".join(unsupported)))
+        super(AsyncAbstractReader, self).__init__(**kwargs)
+        self.concurrency = kwargs.get("concurrency", 1)
+
+    @abc.abstractmethod
+    async def act(self, line):
+        """
+        Act on the given line.
+
+        :param line: The FLEX Line object to operate on.
+        :return: Up to the user.
+        """
+
+    async def attach(self, connection):
+        """
+        Attach the given connection to the reader and read from it until it is exhausted.
+
+        :param connection: The AsyncConnection to attach.
+        :return: Nothing
+
+        :raises ConnectionError: Raised when a connection is already active or existent.
+        """
+        if self.connection is None or self.connection.stdout is None:
+            await self.__setup_connection__(connection)
+        else:
+            raise ConnectionError("Connection is already active.")
+
+    async def detach(self):
+        """
+        Detach the current connection from the reader.
+        Kills the connection and sets self.connection to None.
+
+        :return: Nothing.
+        """
+        if self.connection is not None:
+            await self.connection.kill()
+            self.connection = None
+
+    async def lines(self):
+        """
+        Iterate over the FLEX lines of the current connection, other lines are skipped.
+        Every line that is not blacklisted is passed to the attached writers first.
+
+        :return: An async iterator of FLEX Line objects.
+        """
+        async for raw in self.connection:
+            try:
+                line = self.create_line(raw)
+            except ValueError:
+                continue
+            if self.writers and not self.is_line_blacklisted(line):
+                for writer in self.writers:
+                    writer.write(line)
+            yield line
+
+    async def __setup_connection__(self, connection):
+        """
+        Set the connection to the instance, open it and act on every line.
+        The connection is always detached in case of error, cancellation or a finished process.
+
+        :param connection: The connection to set up.
+        :return: Nothing
+        """
+        try:
+            self.connection = connection
+            await connection.open()
+            if self.concurrency > 1:
+                await self.__run_concurrent__()
+            else:
+                async for line in self.lines():
+                    await self.act(line)
+        finally:
+            await self.detach()
+
+    async def __run_concurrent__(self):
+        """
+        Act on the lines of the current connection with at most `self.concurrency` act(line) calls at a time.
+        Pending act(line) calls are awaited when the connection is exhausted, and cancelled on error.
+        The first exception raised by an act(line) call is raised as soon as the next line is read,
+        like an inline act(line) call would.
+
+        :return: Nothing
+        """
+        slots = asyncio.Semaphore(self.concurrency)
+        tasks = set()
+        errors = []
+
+        def done(task):
+            tasks.discard(task)
+            slots.release()
+            if not task.cancelled() and task.exception() is not None:
+                errors.append(task.exception())
+
+        try:
+            async for line in self.lines():
+                await slots.acquire()
+                if errors:
+                    slots.release()
+                    raise errors[0]
+                task = asyncio.ensure_future(self.act(line))
+                tasks.add(task)
+                task.add_done_callback(done)
+            if tasks:
+                await asyncio.gather(*tasks)
+            if errors:
+                raise errors[0]
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
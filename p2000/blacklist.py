@@ -0,0 +1,154 @@
+import fnmatch
+import os
+import re
+import time
+
+from p2000 import utils
+
+
+class Rules:
+    """
+    An immutable, compiled snapshot of the blacklist settings in config.json["rtlsdr"]["blacklist"].
+    Monitorcodes and exact messages are held in sets, every other message rule is compiled into one regex.
+
+    :ivar monitorcodes: A frozenset with the blacklisted capcodes.
+    :ivar messages: A frozenset with the blacklisted messages, these have to match exactly.
+    :ivar pattern: A compiled regex with every prefix, wildcard and regex rule, None if there are none.
+    """
+
+    def __init__(self, settings):
+        """
+        Compile the given blacklist settings.
+        :param settings: A dict with the optional keys:
+            * monitorcodes - A list of capcodes.
+            * messages - A list of messages that have to match exactly.
+            * prefixes - A list of message prefixes, ex. "ALN TESTOPROEP".
+            * wildcards - A list of shell style wildcards, ex. "* TESTOPROEP *".
+            * patterns - A list of regular expressions, matched from the start of the message.
+        :raises re.error: Raised when one of the patterns is not a valid regular expression.
+        """
+        self.settings = settings
+        self.monitorcodes = frozenset(settings.get("monitorcodes", []))
+        self.messages = frozenset(settings.get("messages", []))
+        alternatives = [re.escape(prefix) for prefix in settings.get("prefixes", [])]
+        alternatives += [fnmatch.translate(wildcard) for wildcard in settings.get("wildcards", [])]
+        alternatives += settings.get("patterns", [])
+        if alternatives:
+            self.pattern = re.compile("|".join("(?:{0})".format(a) for a in alternatives))
+        else:
+            self.pattern = None
+
+    def is_monitorcode_blacklisted(self, line):
+        """
+        Only the monitorcode, the first capcode of the line, is checked. A line of the pipe separated output with
+        a blacklisted capcode after the first one is not blacklisted.
+        :param line: The FLEX Line object to check.
+        :return: True if the monitorcode of the line is blacklisted.
+        """
+        return line.monitorcode in self.monitorcodes
+
+    def is_message_blacklisted(self, line):
+        """
+        :param line: The FLEX Line object to check.
+        :return: True if the message of the line matches any of the message rules.
+        """
+        message = line.message
+        if message in self.messages:
+            return True
+        return self.pattern is not None and self.pattern.match(message) is not None
+
+
+class Blacklist:
+    """
+    A blacklist that is loaded from config.json and reloaded when the file changes.
+    The file is checked at most once per `interval` seconds, only its modification time is read for that.
+    A reload compiles a new Rules object and swaps it in with a single assignment, so a check never sees
+    half loaded rules. A config file that can not be loaded, for example while it is being written,
+    leaves the current rules in place and is tried again on the next check.
+
+    :ivar rules: The current Rules.
+    :ivar reloads: The amount of times the rules were reloaded.
+    :ivar error: The error of the last failed reload, None if the last reload succeeded.
+    """
+
+    def __init__(self, path=utils.CONFIG_PATH, **kwargs):
+        """
+        Create a new Blacklist.
+        :param path: The config file to load the blacklist from, default is `utils.CONFIG_PATH`.
+        :keyword config: The already loaded config, saves parsing the config file again.
+        :keyword interval: The minimum amount of seconds between checks for changes, default is 1.
+            Set to None to disable reloading.
+        """
+        self.path = path
+        self.interval = kwargs.get("interval", 1)
+        self.reloads = 0
+        self.error = None
+        self.mtime = self.__mtime__()
+        config = kwargs.get("config")
+        self.rules = Rules(self.__settings__(config if config is not None else utils.load_config(path)))
+        self.checked = time.time()
+
+    @staticmethod
+    def __settings__(config):
+        return config["rtlsdr"]["blacklist"]
+
+    def __mtime__(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except OSError:
+            return None
+
+    def reload(self):
+        """
+        Load and compile the blacklist from the config file, the current rules are kept on failure.
+        :return: True if the rules were replaced, else False.
+        """
+        mtime = self.__mtime__()
+        try:
+            rules = Rules(self.__settings__(utils.load_config(self.path)))
+        except (IOError, OSError, ValueError, KeyError, re.error) as error:
+            self.error = error
+            return False
+        self.rules = rules
+        self.mtime = mtime
+        self.error = None
+        self.reloads += 1
+        return True
+
+    def refresh(self):
+        """
+        Reload the rules if the config file changed and the interval has passed since the last check.
+        :return: The current Rules.
+        """
+        if self.interval is not None:
+            now = time.time()
+            if now - self.checked >= self.interval:
+                self.checked = now
+                if self.__mtime__() != self.mtime:
+                    self.reload()
+        return self.rules
+
+    def is_monitorcode_blacklisted(self, line):
+        """
+        Check to see if the monitorcode of the given FLEX Line object is blacklisted.
+        :param line: The FLEX Line object to check.
+        :return: True if the line is blacklisted.
+        """
+        return self.refresh().is_monitorcode_blacklisted(line)
+
+    def is_message_blacklisted(self, line):
+        """
+        Check to see if the message of the given FLEX Line object is blacklisted.
+        :param line: The FLEX Line object to check.
+        :return: True if the line is blacklisted.
+        """
+        return self.refresh().is_message_blacklisted(line)
+
+    def is_line_blacklisted(self, line):
+        """
+        Check to see if the given FLEX Line object is blacklisted by capcode or by message.
+        :param line: The FLEX Line object to check.
+        :return: True if the line is blacklisted.
+        """
+        rules = self.refresh()
+        return rules.is_monitorcode_blacklisted(line) or rules.is_message_blacklisted(line)
@@ -0,0 +1,362 @@
+import json
+import os
+import queue
+import socket
+import threading
+
+from p2000.enums import Region, Discipline
+from p2000.rtlsdr import AbstractReader
+from p2000.utils import format_capcode
+
+# The default address of a Broker, next to the port of the PrometheusSink.
+ADDRESS = ("127.0.0.1", 9651)
+
+
+def create_socket(address):
+    """
+    :param address: A (host, port) tuple for TCP, or the path of a Unix socket as a String.
+    :return: A new, unconnected socket for the address.
+    """
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    return socket.socket(family, socket.SOCK_STREAM)
+
+
+def encode(payload):
+    """
+    :param payload: A JSON serializable dict.
+    :return: The payload as compact JSON, one line of bytes.
+    """
+    return json.dumps(payload, separators=(",", ":"), sort_keys=True).encode("utf-8") + b"\n"
+
+
+class Subscription:
+    """
+    The filter of a subscriber, a line matches when it matches every filter that is set.
+    A filter matches when the line has any of its values, an empty filter matches every line.
+
+    :ivar capcodes: A set with capcodes in the 7 digit format.
+    :ivar regions: A set with Region ids.
+    :ivar disciplines: A set with Discipline ids.
+    """
+
+    def __init__(self, capcodes=None, regions=None, disciplines=None):
+        self.capcodes = set(format_capcode(c) for c in capcodes or [])
+        self.regions = set(r.value["id"] if isinstance(r, Region) else str(r) for r in regions or [])
+        self.disciplines = set(d.value["id"] if isinstance(d, Discipline) else str(d) for d in disciplines or [])
+
+    def matches(self, payload):
+        """
+        :param payload: The published dict of a line, see `Broker.payload`.
+        :return: True if the subscriber wants the line.
+        """
+        return ((not self.capcodes or not self.capcodes.isdisjoint(payload["capcodes"]))
+                and (not self.regions or not self.regions.isdisjoint(payload["regions"]))
+                and (not self.disciplines or not self.disciplines.isdisjoint(payload["disciplines"])))
+
+    def as_dict(self):
+        return {"capcodes": sorted(self.capcodes), "regions": sorted(self.regions),
+                "disciplines": sorted(self.disciplines)}
+
+    @classmethod
+    def from_dict(cls, values):
+        """
+        :param values: A dict as created by `as_dict`.
+        :return: A new Subscription.
+        :raises ValueError: When the values are not a dict of lists.
+        """
+        if not isinstance(values, dict) or not all(isinstance(v, list) for v in values.values()):
+            raise ValueError("A subscription is a JSON object of lists, got '{0}'.".format(values))
+        return cls(values.get("capcodes"), values.get("regions"), values.get("disciplines"))
+
+
+class Subscriber:
+    """
+    A client of a Broker, with its own bounded buffer and a thread that sends it.
+    A client that reads slower than lines are published only loses its own oldest lines.
+
+    :ivar subscription: The Subscription of the client.
+    :ivar sent: The amount of lines that were sent.
+    :ivar dropped: The amount of lines that were discarded because the buffer was full.
+    """
+
+    def __init__(self, connection, subscription, buffer_size):
+        self.connection = connection
+        self.subscription = subscription
+        self.queue = queue.Queue(buffer_size)
+        self.sent = 0
+        self.dropped = 0
+        self.thread = None
+
+    def publish(self, data):
+        """
+        Queue the data for the client, the oldest queued data is discarded when the buffer is full.
+        :param data: The bytes to send.
+        :return: Nothing
+        """
+        while True:
+            try:
+                self.queue.put_nowait(data)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def close(self):
+        """
+        Stop sending, and close the connection to the client.
+        :return: Nothing
+        """
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except (OSError, socket.error):
+            pass
+        self.connection.close()
+
+    @property
+    def stats(self):
+        return {"sent": self.sent, "dropped": self.dropped, "buffered": self.queue.qsize(),
+                "subscription": self.subscription.as_dict()}
+
+
+class Broker(AbstractReader):
+    """
+    A reader that shares one receiver with many consumers. Every FLEX line that is not blacklisted is published
+    as a line of compact JSON to the subscribers that want it, over TCP or a Unix socket:
+        {"capcodes":["1523172"],"disciplines":["01"],"line":"FLEX|...","message":"ALN ...","regions":["01"],
+         "time":"21:42:05","timestamp":"2018-09-15"}
+    A subscriber sends its Subscription as a line of JSON when it connects, the broker filters on it, see
+    `BrokerConnection` for the client. The regions and disciplines of a line are guessed with a CapcodeIndex
+    when one is given, else the discipline is classified from the message and the region is unknown.
+        broker = Broker(index=CapcodeIndex(connection).build()).start()
+        broker.attach(SupervisedConnection())
+
+    :ivar address: The address the broker listens on, the port is filled in when it was 0.
+    :ivar published: The amount of lines that were published.
+    """
+
+    ACT_ON_LINES = True
+
+    def __init__(self, address=ADDRESS, **kwargs):
+        """
+        Create a new Broker.
+        :param address: A (host, port) tuple for TCP, or the path of a Unix socket as a String,
+            default is ("127.0.0.1", 9651).
+        :keyword index: The CapcodeIndex to guess the regions and disciplines of lines with, default is None.
+        :keyword buffer_size: The maximum amount of lines buffered per subscriber, default is 1024.
+        :keyword handshake_timeout: The amount of seconds a client gets to send its Subscription, default is 5.
+        :keyword encoding: See `AbstractReader`, as are the other keywords.
+        """
+        super(Broker, self).__init__(**kwargs)
+        self.address = address
+        self.index = kwargs.get("index")
+        self.buffer_size = kwargs.get("buffer_size", 1024)
+        self.handshake_timeout = kwargs.get("handshake_timeout", 5)
+        self.lock = threading.Lock()
+        self.subscribers = []
+        self.server = None
+        self.thread = None
+        self.published = 0
+
+    @property
+    def broker_stats(self):
+        """
+        :return: A dict with the amount of published lines, and the stats of every subscriber.
+        """
+        with self.lock:
+            return {"published": self.published, "subscribers": [s.stats for s in self.subscribers]}
+
+    def start(self):
+        """
+        Start listening for subscribers, from a background thread.
+        :return: The current instance.
+        """
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+        self.server = create_socket(self.address)
+        if not isinstance(self.address, str):
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(self.address)
+        self.server.listen(16)
+        if not isinstance(self.address, str):
+            self.address = self.server.getsockname()[:2]
+        self.thread = threading.Thread(target=self.__accept__, args=(self.server,), name="p2000-broker")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop listening, and disconnect every subscriber.
+        :return: Nothing
+        """
+        server, self.server = self.server, None
+        if server is not None:
+            try:
+                server.shutdown(socket.SHUT_RDWR)
+            except (OSError, socket.error):
+                pass
+            server.close()
+            self.thread.join()
+            self.thread = None
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.unlink(self.address)
+        with self.lock:
+            subscribers, self.subscribers = self.subscribers, []
+        for subscriber in subscribers:
+            subscriber.close()
+            subscriber.thread.join()
+
+    def act(self, line):
+        """
+        Publish the given FLEX Line object to every subscriber that wants it.
+        The reader only passes FLEX lines that are not blacklisted, see `AbstractReader.ACT_ON_LINES`.
+        :param line: The FLEX Line object to publish.
+        :return: Nothing
+        """
+        payload = self.payload(line)
+        data = encode(payload)
+        with self.lock:
+            self.published += 1
+            for subscriber in self.subscribers:
+                if subscriber.subscription.matches(payload):
+                    subscriber.publish(data)
+
+    def payload(self, line):
+        """
+        :param line: A FLEX Line object.
+        :return: The dict that is published for the line.
+        """
+        capcodes = [format_capcode(c) for c in line.capcodes]
+        if self.index is not None:
+            labels = set(self.index.guess_many(capcodes).values())
+        else:
+            labels = set([(Region.UNKNOWN, Discipline.classify(line.message))])
+        return {
+            "line": line.line,
+            "timestamp": line.timestamp,
+            "time": line.time,
+            "capcodes": capcodes,
+            "message": line.message,
+            "regions": sorted(set(region.value["id"] for region, _ in labels)),
+            "disciplines": sorted(set(discipline.value["id"] for _, discipline in labels))
+        }
+
+    def __accept__(self, server):
+        while True:
+            try:
+                connection, _ = server.accept()
+            except (OSError, socket.error):
+                return  # The server socket was closed by stop().
+            thread = threading.Thread(target=self.__serve__, args=(connection,), name="p2000-broker-subscriber")
+            thread.daemon = True
+            thread.start()
+
+    def __serve__(self, connection):
+        """
+        Read the Subscription of a new client, then send it its lines until it disconnects.
+        :param connection: The socket of the client.
+        :return: Nothing
+        """
+        try:
+            connection.settimeout(self.handshake_timeout)
+            stream = connection.makefile("rb")
+            request = stream.readline()
+            stream.close()
+            subscription = Subscription.from_dict(json.loads(request.decode("utf-8")))
+            connection.settimeout(None)
+        except (ValueError, OSError, socket.error):
+            connection.close()
+            return
+        subscriber = Subscriber(connection, subscription, self.buffer_size)
+        subscriber.thread = threading.current_thread()
+        with self.lock:
+            if self.server is None:
+                connection.close()
+                return  # The broker was stopped during the handshake.
+            self.subscribers.append(subscriber)
+        try:
+            while True:
+                data = subscriber.queue.get()
+                if data is None:
+                    return
+                connection.sendall(data)
+                subscriber.sent += 1
+        except (OSError, socket.error):
+            pass  # The client disconnected.
+        finally:
+            with self.lock:
+                if subscriber in self.subscribers:
+                    self.subscribers.remove(subscriber)
+            connection.close()
+
+
+class BrokerConnection:
+    """
+    A Connection that reads the lines a Broker publishes, with the same `stdout` contract as `rtlsdr.Connection`,
+    so any reader can be attached to it and keeps its act(line):
+        MyReader().attach(BrokerConnection(regions=[Region.GRONINGEN], disciplines=[Discipline.AMBULANCE]))
+    """
+
+    def __init__(self, address=ADDRESS, **kwargs):
+        """
+        Create a new BrokerConnection.
+        :param address: The address of the Broker, default is ("127.0.0.1", 9651).
+        :keyword capcodes: Only receive lines with any of these capcodes, default is every capcode.
+        :keyword regions: Only receive lines of any of these Regions, default is every Region.
+        :keyword disciplines: Only receive lines of any of these Disciplines, default is every Discipline.
+        :keyword encoding: The encoding of the raw lines on stdout, default is UTF-8.
+        """
+        self.address = address
+        self.subscription = Subscription(kwargs.get("capcodes"), kwargs.get("regions"), kwargs.get("disciplines"))
+        self.encoding = kwargs.get("encoding", "utf-8")
+        self.socket = None
+        self.stdout = None
+
+    def open(self, **kwargs):
+        """
+        Connect to the Broker and send the subscription.
+        :return: Nothing
+        :raises IOError: When the Broker can not be reached.
+        """
+        self.socket = create_socket(self.address)
+        try:
+            self.socket.connect(self.address)
+            self.socket.sendall(encode(self.subscription.as_dict()))
+        except (OSError, socket.error) as error:
+            self.kill()
+            raise IOError("Could not subscribe to the broker at {0}: {1}".format(self.address, error))
+        self.stdout = self.__lines__(self.socket.makefile("rb"))
+
+    def kill(self):
+        """
+        Disconnect from the Broker.
+        :return: Nothing
+        """
+        if self.socket is not None:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except (OSError, socket.error):
+                pass
+            self.socket.close()
+            self.socket = None
+        self.stdout = None
+
+    def __lines__(self, stream):
+        """
+        :param stream: The file of the socket.
+        :return: A generator with the raw lines of the published lines, as bytes including the newline.
+        """
+        try:
+            for data in stream:
+                yield (json.loads(data.decode("utf-8"))["line"] + "\n").encode(self.encoding)
+        except (OSError, socket.error, ValueError):
+            return  # Disconnected by kill() or by the Broker.
+        finally:
+            stream.close()
@@ -0,0 +1,77 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class Deduplicator:
+    """
+    Recognise FLEX messages that were seen before within a time window, ex. the same page decoded by
+    overlapping receivers, or repeated by the P2000 network.
+    A message is keyed on a hash of its sorted capcodes and its text. The keys are kept in insertion order
+    with the time they were first seen, expired keys are dropped from the front on every check and the oldest key
+    is evicted once `size` keys are kept, so memory is bounded however many messages arrive.
+    The window starts when a message is first seen, a message that is repeated after the window passes again.
+
+    :ivar checked: The amount of messages that were checked.
+    :ivar suppressed: The amount of messages that were recognised as duplicates.
+    :ivar evictions: The amount of keys that were dropped before their window passed, because the index was full.
+    """
+
+    def __init__(self, window=30, size=10000, clock=time.time):
+        """
+        Create a new Deduplicator.
+        :param window: The amount of seconds a message is remembered, default is 30.
+        :param size: The maximum amount of remembered messages, default is 10000.
+        :param clock: The callable that returns the current time in seconds, default is `time.time`.
+        """
+        self.window = window
+        self.size = size
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.seen = OrderedDict()
+        self.checked = 0
+        self.suppressed = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(line):
+        """
+        :param line: A FLEX Line object.
+        :return: The hash of the sorted capcodes and the message of the line.
+        """
+        return hash((tuple(sorted(line.capcodes)), line.message))
+
+    def is_duplicate(self, line):
+        """
+        Check to see if the given line was seen within the window, and remember it if it was not.
+        :param line: The FLEX Line object to check.
+        :return: True if the line is a duplicate.
+        """
+        key = self.key(line)
+        now = self.clock()
+        with self.lock:
+            self.checked += 1
+            seen = self.seen
+            expired = now - self.window
+            while seen:
+                oldest, first = next(iter(seen.items()))
+                if first > expired:
+                    break
+                del seen[oldest]
+            if key in seen:
+                self.suppressed += 1
+                return True
+            seen[key] = now
+            if len(seen) > self.size:
+                seen.popitem(last=False)
+                self.evictions += 1
+            return False
+
+    @property
+    def stats(self):
+        """
+        :return: A dict with the amount of checked, suppressed and remembered messages, and the evictions.
+        """
+        with self.lock:
+            return {"checked": self.checked, "suppressed": self.suppressed,
+                    "size": len(self.seen), "evictions": self.evictions}
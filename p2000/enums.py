@@ -1,3 +1,4 @@
+import re
 from enum import Enum
 
 
@@ -56,31 +57,34 @@ class Region(Enum):
     def match_by_id(val):
         """
         Check to see what Region is matched with the given id.
-        This method checks every Region for it's id.
+        The Regions are looked up by id in a dict that is built once.
         :param val: The id to verify.
         :return: A Region object if a match is found, Region.UNKNOWN if no match was found.
         """
-        for region in Region:
-            if region.value["id"] == str(val):
-                return region
-        return Region.UNKNOWN
+        return REGIONS_BY_ID.get(str(val), Region.UNKNOWN)
 
 
 # noinspection PyTypeChecker
 class Discipline(Enum):
     """
     Represents a discipline in the Dutch national service.
-    Each discipline has a dict with a string id and a list of keywords that can be
-    matched against the titles of sidebar links in the Scraper.
+    Each discipline has a dict with a string id, a list of keywords that can be
+    matched against the titles of sidebar links in the Scraper, and a list of "message" keywords that
+    are matched as whole words against the text of alarm messages.
     """
     # Todo - Maybe move the initial values to the config.json to make them easily editable.
     __order__ = 'UNKNOWN FIRE_DEPARTMENT AMBULANCE POLICE KNRM'
 
-    UNKNOWN =         {"id": "00", "keywords": []}
-    FIRE_DEPARTMENT = {"id": "01", "keywords": ["brandweer"]}
-    AMBULANCE =       {"id": "02", "keywords": ["ambulance", "ghor", "ovd-g"]}
-    POLICE =          {"id": "03", "keywords": ["politie", "copi", "sgbo", "persinfo", "persvoorlichter", "voa", "bhv"]}
-    KNRM =            {"id": "04", "keywords": ["knrm", "kwc"]}
+    UNKNOWN =         {"id": "00", "keywords": [], "message": []}
+    FIRE_DEPARTMENT = {"id": "01", "keywords": ["brandweer"],
+                       "message": ["brandweer", "brand", "gebouwbrand", "woningbrand", "buitenbrand", "voertuigbrand",
+                                   "brt", "bdh", "oms", "bmi", "gaslekkage", "wateroverlast"]}
+    AMBULANCE =       {"id": "02", "keywords": ["ambulance", "ghor", "ovd-g"],
+                       "message": ["ambulance", "ghor", "ovd-g", "a1", "a2", "b1", "b2", "mmt", "rit"]}
+    POLICE =          {"id": "03", "keywords": ["politie", "copi", "sgbo", "persinfo", "persvoorlichter", "voa", "bhv"],
+                       "message": ["politie", "copi", "sgbo", "persinfo", "persvoorlichter", "voa", "bhv"]}
+    KNRM =            {"id": "04", "keywords": ["knrm", "kwc"],
+                       "message": ["knrm", "kwc", "reddingboot", "kustwacht"]}
 
     @staticmethod
     def all():
@@ -98,8 +102,9 @@ class Discipline(Enum):
         if isinstance(discipline, Discipline):
             keywords = discipline.value["keywords"]
             if len(keywords) > 0:
+                text = text.lower()
                 for keyword in keywords:
-                    if keyword in text.lower():
+                    if keyword in text:
                         return True
             return False
         else:
@@ -109,24 +114,82 @@ class Discipline(Enum):
     def match(text):
         """
         Check to see what Discipline is matched with the given text.
-        This method checks every Discipline for keywords.
+        The keywords of every Discipline are found with a single compiled pattern, when the text holds the
+        keywords of several Disciplines the first one in the order of the enum is returned, as with `is_match`.
         :param text: The text to verify.
         :return: A Discipline object if a match is found, Discipline.UNKNOWN if no match was found.
         """
-        for discipline in Discipline:
-            if Discipline.is_match(text, discipline):
-                return discipline
-        return Discipline.UNKNOWN
+        return TITLE_MATCHER.match(text, Discipline.UNKNOWN)
+
+    @staticmethod
+    def classify(message):
+        """
+        Check to see what Discipline is matched with the text of an alarm message, ex. "A1 Ambulance Rit 12345".
+        The "message" keywords of every Discipline are matched as whole words, so "brand" is found in
+        "Brand woning" but not in "Brandstof". This is fast enough to run on every line that is read.
+        :param message: The text of the message.
+        :return: A Discipline object if a match is found, Discipline.UNKNOWN if no match was found.
+        """
+        return MESSAGE_MATCHER.match(message, Discipline.UNKNOWN)
 
     @staticmethod
     def match_by_id(val):
         """
         Check to see what Discipline is matched with the given id.
-        This method checks every Discipline for it's id.
+        The Disciplines are looked up by id in a dict that is built once.
         :param val: The id to verify.
         :return: A Discipline object if a match is found, Discipline.UNKNOWN if no match was found.
         """
-        for discipline in Discipline:
-            if discipline.value["id"] == val:
-                return discipline
-        return Discipline.UNKNOWN
+        try:
+            return DISCIPLINES_BY_ID.get(val, Discipline.UNKNOWN)
+        except TypeError:  # An unhashable id, ex. a list, never matches.
+            return Discipline.UNKNOWN
+
+
+class KeywordMatcher:
+    """
+    Find which of several groups of keywords occurs in a text, with one compiled alternation of every keyword
+    instead of a substring check per keyword. Matching is case insensitive.
+    """
+
+    def __init__(self, groups, words=False):
+        """
+        Create a new KeywordMatcher.
+        :param groups: A list of (value, keywords) tuples, when a text holds the keywords of several groups
+            the value of the first group is returned.
+        :param words: True to match keywords as whole words only, default is False which matches substrings.
+        """
+        self.ranks = {}
+        self.values = []
+        for rank, (value, keywords) in enumerate(groups):
+            self.values.append(value)
+            for keyword in keywords:
+                self.ranks.setdefault(keyword.lower(), rank)
+        # The longest keywords go first, so a keyword is not shadowed by a shorter one it starts with.
+        alternation = "|".join(re.escape(k) for k in sorted(self.ranks, key=lambda k: (-len(k), k)))
+        if words:
+            alternation = r"(?<!\w)(?:{0})(?!\w)".format(alternation)
+        self.pattern = re.compile(alternation, re.IGNORECASE | re.UNICODE) if self.ranks else None
+
+    def match(self, text, default=None):
+        """
+        :param text: The text to search.
+        :param default: The value to return when no keyword occurs in the text.
+        :return: The value of the first group of which a keyword occurs in the text, else the default.
+        """
+        if self.pattern is None:
+            return default
+        best = None
+        for found in self.pattern.finditer(text):
+            rank = self.ranks[found.group(0).lower()]
+            if best is None or rank < best:
+                best = rank
+                if rank == 0:
+                    break
+        return default if best is None else self.values[best]
+
+
+REGIONS_BY_ID = dict((region.value["id"], region) for region in Region)
+DISCIPLINES_BY_ID = dict((discipline.value["id"], discipline) for discipline in Discipline)
+TITLE_MATCHER = KeywordMatcher([(d, d.value["keywords"]) for d in Discipline])
+MESSAGE_MATCHER = KeywordMatcher([(d, d.value["message"]) for d in Discipline], words=True)
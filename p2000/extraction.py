@@ -0,0 +1,122 @@
+import re
+
+from p2000.enums import Discipline
+
+# Words that make up the name of a town, ex. "Den Haag", "'s-Hertogenbosch", "Capelle aan den IJssel".
+WORD = r"(?!Rit\b)(?:'[st]-)?(?:IJ|[A-Z])[a-z][\w'-]*"
+TOWN = r"{0}(?:(?:\s(?:aan|a/d|den|de|der|op|in|bij|ter|van))*\s{0})*".format(WORD)
+# The endings of Dutch street names, ex. "Kerkstraat", "Coolsingel", "Stationsplein".
+# Endings that are common in town names, like "dam" and "hoven", are left out.
+ENDINGS = ["straat", "str", "weg", "laan", "plein", "dijk", "kade", "singel", "gracht", "pad", "dreef", "hof", "park",
+           "plantsoen", "steeg", "markt", "baan", "ring", "allee", "wal", "kanaal", "erf", "veld", "haven", "brug",
+           "akker", "lei", "poort", "zijde"]
+# A street is a word with one of the endings, or one of the endings as a word of its own, ex. "Markt".
+# It can be preceded by titles and adjectives, ex. "Burg. Oude Enghweg", or by a name with particles,
+# ex. "Jan van Galenstraat". A word without an ending is only a street when a house number and a town
+# or a postal code follow, ex. "Damrak 1 Amsterdam".
+STREET = r"""(?:(?:Burg|Dr|Prof|Mr|St|Sint|Van|De|Den|Het)\.?\s)*
+    (?:(?:Oude|Nieuwe|Lange|Korte|Hoge|Lage|Grote|Kleine|Noord|Zuid|Oost|West|Eerste|Tweede|Derde)\s
+      |{word}(?:\s(?:van|de|der|den|het|ter|ten|'t))+\s)*
+    (?:(?:IJ|[A-Z])[\w'-]*?(?:{endings})|{bare})\b
+  | {word}(?=\s\d+[a-zA-Z]?\s+(?:[1-9]\d{{3}}\s?[A-Z]{{2}}\b|{word}))""".format(
+    word=WORD, endings="|".join(ENDINGS), bare="|".join(e.capitalize() for e in ENDINGS))
+
+# Every field has its own alternative, so a message is scanned once with finditer.
+PATTERN = re.compile(r"""
+    (?P<priority>\A(?:(?:ALN|NUM)\s+)?(?:(?P<level>[AB])\s?(?P<urgency>[12])|(?i:P|Prio)\s?(?P<prio>[1-5]))\b)
+  | (?P<ride>\b(?i:Rit):?\s*(?P<ride_number>\d{3,9})\b)
+  | (?P<postal>\b(?P<digits>[1-9]\d{3})\s?(?P<letters>[A-Z]{2})\b(?:\s+(?P<postal_town>%s))?)
+  | (?P<street>\b(?P<street_name>%s)
+      (?:\s(?P<number>\d+[a-zA-Z]?)\b(?!\s?[A-Z]{2}\b))?(?:\s+(?P<street_town>%s))?)
+""" % (TOWN, STREET, TOWN), re.VERBOSE)
+
+
+class Alarm:
+    """
+    The structured fields of an alarm message, see `extract`. Fields that are not in the message are None.
+
+    :ivar priority: The urgency of the alarm, ex. "A1", "A2" or "B1" for the ambulance and "P1" for the others.
+    :ivar postal_code: The postal code, without a space, ex. "3012AD".
+    :ivar street: The street, with the house number if there is one, ex. "Coolsingel 40".
+    :ivar town: The town, ex. "Rotterdam".
+    :ivar ride: The ride number of an ambulance, ex. "93412".
+    :ivar discipline: The Discipline the message text is classified as, see `Discipline.classify`.
+    """
+
+    __slots__ = ("priority", "postal_code", "street", "town", "ride", "discipline")
+
+    def __init__(self, **kwargs):
+        self.priority = kwargs.get("priority")
+        self.postal_code = kwargs.get("postal_code")
+        self.street = kwargs.get("street")
+        self.town = kwargs.get("town")
+        self.ride = kwargs.get("ride")
+        self.discipline = kwargs.get("discipline", Discipline.UNKNOWN)
+
+    def as_dict(self):
+        """
+        :return: A dict with every field, the discipline as its id.
+        """
+        return {
+            "priority": self.priority,
+            "postal_code": self.postal_code,
+            "street": self.street,
+            "town": self.town,
+            "ride": self.ride,
+            "discipline": self.discipline.value["id"]
+        }
+
+    def __eq__(self, other):
+        return isinstance(other, Alarm) and all(getattr(self, s) == getattr(other, s) for s in self.__slots__)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "Alarm({0})".format(", ".join("{0}={1!r}".format(s, getattr(self, s)) for s in self.__slots__))
+
+
+def extract(message):
+    """
+    Extract the structured fields of an alarm message in a single pass, the first occurrence of a field wins.
+    A town that follows the postal code is preferred over one that follows the street.
+    :param message: The text of the message, the leading message type of `Line.message` is skipped.
+    :return: An Alarm object.
+    """
+    priority = postal_code = street = town = ride = street_town = None
+    for found in PATTERN.finditer(message):
+        group = found.lastgroup
+        if group == "priority":
+            urgency = found.group("urgency")
+            priority = found.group("level") + urgency if urgency else "P" + found.group("prio")
+        elif group == "ride":
+            ride = ride or found.group("ride_number")
+        elif group == "postal":
+            if postal_code is None:
+                postal_code = found.group("digits") + found.group("letters")
+                town = found.group("postal_town")
+        elif street is None:
+            number = found.group("number")
+            street = found.group("street_name") + (" " + number if number else "")
+            street_town = found.group("street_town")
+    return Alarm(priority=priority, postal_code=postal_code, street=street, town=town or street_town, ride=ride,
+                 discipline=Discipline.classify(message))
+
+
+def enrich(line):
+    """
+    Extract the structured fields of the message of the given FLEX Line object.
+    :param line: The FLEX Line object to enrich.
+    :return: The same line, with `line.alarm` set to an Alarm object.
+    """
+    line.alarm = extract(line.message)
+    return line
+
+
+def extract_many(lines):
+    """
+    Extract the structured fields of many messages, ex. to backfill stored alarms.
+    :param lines: An iterable of FLEX Line objects, or of message Strings.
+    :return: A list with an Alarm object for every line, in the same order.
+    """
+    return [extract(line if isinstance(line, str) else line.message) for line in lines]
@@ -0,0 +1,273 @@
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from bisect import bisect_right
+
+# Every record is the length of the line, the time it was read and the CRC32 of the line, followed by the line.
+HEADER = struct.Struct("<IdI")
+SUFFIX = ".journal"
+
+
+def segment_name(base):
+    """
+    :param base: The offset of the first record of the segment.
+    :return: The file name of the segment, ex. "00000000000000004096.journal".
+    """
+    return "{0:020d}{1}".format(base, SUFFIX)
+
+
+def list_segments(directory):
+    """
+    :param directory: The directory of the journal.
+    :return: A sorted list with the base offset of every segment in the directory.
+    """
+    if not os.path.isdir(directory):
+        return []
+    return sorted(int(name[:-len(SUFFIX)]) for name in os.listdir(directory)
+                  if name.endswith(SUFFIX) and name[:-len(SUFFIX)].isdigit())
+
+
+def read_records(path, start=0):
+    """
+    Read the records of a segment through a memory map, a torn or corrupt record ends the segment.
+    :param path: The path of the segment.
+    :param start: The position in the segment to start at, it has to be the start of a record.
+    :return: A generator with a (position, timestamp, line) tuple for every record.
+    """
+    with open(path, "rb") as segment:
+        size = os.fstat(segment.fileno()).st_size
+        if size <= start:
+            return
+        view = mmap.mmap(segment.fileno(), size, access=mmap.ACCESS_READ)
+        try:
+            position = start
+            while position + HEADER.size <= size:
+                length, timestamp, checksum = HEADER.unpack_from(view, position)
+                end = position + HEADER.size + length
+                if end > size:
+                    return
+                line = view[position + HEADER.size:end]
+                if zlib.crc32(line) & 0xffffffff != checksum:
+                    return
+                yield position, timestamp, line
+                position = end
+        finally:
+            view.close()
+
+
+class Journal:
+    """
+    An append-only journal of the raw lines read from a Connection, so lines that were not stored yet survive
+    a crash of the process or the database, and history can be scanned without the database.
+    The journal is a directory of segments, every segment is named after the offset of its first record.
+    An offset is the position of a record in the journal as a whole, so it stays valid across segments.
+    When the active segment would grow past `segment_size` a new segment is started, and segments that are
+    older than `retention` seconds, or that do not fit in `retention_bytes`, are deleted.
+    Every line is handed to the OS when it is appended, so a crash of the process loses nothing. What a crash
+    of the machine can lose is determined by the fsync policy:
+        * ALWAYS - Every line is synced to disk before `append` returns.
+        * INTERVAL - Unsynced lines are synced by a background thread every `fsync_interval` seconds, and by
+          `append` when that much time has passed since the last sync, so at most `fsync_interval` seconds
+          of lines are lost also when no more lines are appended.
+        * NEVER - The OS decides when to write to disk.
+    Attach it to a reader with `AbstractReader(journal=Journal(directory))`, and read it back with `replay`.
+
+    :ivar appended: The amount of lines that were appended.
+    """
+
+    ALWAYS = "always"
+    INTERVAL = "interval"
+    NEVER = "never"
+    POLICIES = [ALWAYS, INTERVAL, NEVER]
+
+    def __init__(self, directory, **kwargs):
+        """
+        Open the journal in the given directory, it is created when it does not exist.
+        A torn record at the end of the last segment, ex. after a crash during a write, is truncated.
+        :param directory: The directory of the segments.
+        :keyword segment_size: The maximum size of a segment in bytes, default is 64 MiB.
+        :keyword fsync: The fsync policy, one of POLICIES, default is "interval".
+        :keyword fsync_interval: The amount of seconds between syncs with the "interval" policy, default is 1.
+            An interval of 0 syncs on every append, without a background thread.
+        :keyword retention: The amount of seconds a full segment is kept, default is None which keeps every segment.
+        :keyword retention_bytes: The maximum size of every segment together, the active segment included,
+            default is no maximum.
+        :keyword clock: The callable that returns the current time in seconds, default is `time.time`.
+        :raises ValueError: When the fsync policy is unknown.
+        """
+        self.directory = directory
+        self.segment_size = kwargs.get("segment_size", 64 * 1024 * 1024)
+        self.fsync = kwargs.get("fsync", self.INTERVAL)
+        self.fsync_interval = kwargs.get("fsync_interval", 1)
+        self.retention = kwargs.get("retention")
+        self.retention_bytes = kwargs.get("retention_bytes")
+        self.clock = kwargs.get("clock", time.time)
+        if self.fsync not in self.POLICIES:
+            raise ValueError("Unknown fsync policy '{0}', choose from {1}.".format(self.fsync, self.POLICIES))
+        self.lock = threading.Lock()
+        self.appended = 0
+        self.synced = self.clock()
+        self.dirty = False
+        self.closed = threading.Event()
+        self.syncer = None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        segments = list_segments(directory)
+        self.base = segments[-1] if segments else 0
+        self.size = self.__recover__(self.__path__(self.base)) if segments else 0
+        self.file = open(self.__path__(self.base), "ab", buffering=0)
+        if self.fsync == self.INTERVAL and self.fsync_interval > 0:
+            self.syncer = threading.Thread(target=self.__sync_periodically__, name="p2000-journal-fsync")
+            self.syncer.daemon = True
+            self.syncer.start()
+
+    @property
+    def end(self):
+        """
+        :return: The offset the next line will be appended at.
+        """
+        with self.lock:
+            return self.base + self.size
+
+    def append(self, line, timestamp=None):
+        """
+        Append a raw line to the journal.
+        :param line: The raw line as bytes, as read from a Connection.
+        :param timestamp: The time the line was read in seconds, default is now.
+        :return: The offset of the line.
+        :raises IOError: When the journal was closed.
+        """
+        now = self.clock()
+        record = HEADER.pack(len(line), now if timestamp is None else timestamp,
+                             zlib.crc32(line) & 0xffffffff) + line
+        with self.lock:
+            if self.file is None:
+                raise IOError("The journal in '{0}' is closed.".format(self.directory))
+            if self.size > 0 and self.size + len(record) > self.segment_size:
+                self.__rotate__()
+            offset = self.base + self.size
+            self.file.write(record)
+            self.size += len(record)
+            self.appended += 1
+            self.dirty = True
+            if self.fsync == self.ALWAYS or (self.fsync == self.INTERVAL and now - self.synced >= self.fsync_interval):
+                self.__sync__(now)
+        return offset
+
+    def replay(self, offset=None, since=None):
+        """
+        Read the lines of this journal back, see `replay`.
+        """
+        return replay(self.directory, offset=offset, since=since)
+
+    def close(self):
+        """
+        Sync and close the active segment, and stop the background sync thread.
+        :return: Nothing
+        """
+        self.closed.set()
+        if self.syncer is not None:
+            self.syncer.join()
+            self.syncer = None
+        with self.lock:
+            if self.file is not None:
+                if self.fsync != self.NEVER:
+                    os.fsync(self.file.fileno())
+                self.file.close()
+                self.file = None
+
+    def __sync__(self, now):
+        """
+        Sync the active segment to disk, the lock has to be held.
+        """
+        os.fsync(self.file.fileno())
+        self.synced = now
+        self.dirty = False
+
+    def __sync_periodically__(self):
+        """
+        Sync the lines that were appended since the last sync, every `fsync_interval` seconds until closed.
+        """
+        while not self.closed.wait(self.fsync_interval):
+            with self.lock:
+                if self.file is not None and self.dirty:
+                    self.__sync__(self.clock())
+
+    def __path__(self, base):
+        return os.path.join(self.directory, segment_name(base))
+
+    def __recover__(self, path):
+        """
+        Truncate the segment after its last complete record.
+        :param path: The path of the segment.
+        :return: The size of the segment.
+        """
+        size = 0
+        for position, _, line in read_records(path):
+            size = position + HEADER.size + len(line)
+        if os.path.getsize(path) != size:
+            with open(path, "r+b") as segment:
+                segment.truncate(size)
+        return size
+
+    def __rotate__(self):
+        """
+        Close the active segment and start a new one, then apply the retention, the lock has to be held.
+        """
+        if self.fsync != self.NEVER:
+            self.__sync__(self.clock())
+        self.file.close()
+        self.base += self.size
+        self.size = 0
+        self.file = open(self.__path__(self.base), "ab", buffering=0)
+        self.__retain__()
+
+    def __retain__(self):
+        """
+        Delete the full segments that are past the retention, the oldest first. The active segment is kept.
+        """
+        full = [base for base in list_segments(self.directory) if base != self.base]
+        # The active segment is counted as full, so the journal stays within retention_bytes until the next rotation.
+        total = sum(os.path.getsize(self.__path__(base)) for base in full) + self.segment_size
+        now = self.clock()
+        for base in full:
+            path = self.__path__(base)
+            expired = self.retention is not None and os.path.getmtime(path) < now - self.retention
+            if not expired and (self.retention_bytes is None or total <= self.retention_bytes):
+                break
+            total -= os.path.getsize(path)
+            os.remove(path)
+
+
+def replay(directory, offset=None, since=None):
+    """
+    Read the lines of a journal back in the order they were appended, every segment is read through a memory map.
+    Use it to write the lines that were read after the last stored alarm again after a crash, or to scan history.
+    :param directory: The directory of the journal.
+    :param offset: Start at the record at this offset, ex. a value returned by `Journal.append`.
+        An offset before the oldest segment starts at the oldest line. Default is the oldest line.
+    :param since: Skip the lines that were read before this time in seconds, default is None.
+    :return: A generator with an (offset, timestamp, line) tuple for every line, the line is raw bytes.
+    """
+    segments = list_segments(directory)
+    index = 0
+    if offset is not None:
+        index = max(bisect_right(segments, offset) - 1, 0)
+    elif since is not None:
+        # Start at the last segment that begins before `since`, the segments before it only hold older lines.
+        for position, base in enumerate(segments):
+            first = next(read_records(os.path.join(directory, segment_name(base))), None)
+            if first is None or first[1] > since:
+                break
+            index = position
+    for base in segments[index:]:
+        start = offset - base if offset is not None and offset > base else 0
+        try:
+            for position, timestamp, line in read_records(os.path.join(directory, segment_name(base)), start):
+                if since is None or timestamp >= since:
+                    yield base + position, timestamp, line
+        except (IOError, OSError):
+            continue  # The segment was deleted by the retention while it was replayed.
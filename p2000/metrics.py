@@ -0,0 +1,284 @@
+import logging
+import threading
+from bisect import bisect_left
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+# The default histogram buckets in seconds, from half a millisecond up to a minute.
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Counter:
+    """
+    A thread safe counter that only goes up.
+    """
+
+    TYPE = "counter"
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount=1):
+        """
+        Increment the counter.
+        :param amount: The amount to add, default is 1.
+        :return: Nothing
+        """
+        with self.lock:
+            self.value += amount
+
+    def samples(self):
+        """
+        :return: A list of (suffix, extra labels, value) tuples, in the Prometheus text format.
+        """
+        return [("", {}, self.value)]
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """
+    A thread safe histogram with fixed buckets, it keeps the count per bucket, the amount of observations and their sum.
+    """
+
+    TYPE = "histogram"
+
+    def __init__(self, name, description, buckets=BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(self.buckets) + 1)  # The last count is for values above the largest bucket.
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """
+        Record a value.
+        :param value: The value, ex. a latency in seconds.
+        :return: Nothing
+        """
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def samples(self):
+        with self.lock:
+            counts, count, total = list(self.counts), self.count, self.sum
+        samples = []
+        cumulative = 0
+        for bound, amount in zip(self.buckets, counts):
+            cumulative += amount
+            samples.append(("_bucket", {"le": repr(bound)}, cumulative))
+        samples.append(("_bucket", {"le": "+Inf"}, count))
+        samples.append(("_count", {}, count))
+        samples.append(("_sum", {}, total))
+        return samples
+
+    def snapshot(self):
+        with self.lock:
+            return {"count": self.count, "sum": self.sum}
+
+
+class Metrics:
+    """
+    The counters and histograms of a reader and its connection. A reader without Metrics skips every measurement,
+    so instrumentation costs nothing unless it is enabled with `AbstractReader(metrics=Metrics())`.
+    Export them with a sink, see `PrometheusSink` and `LogSink`.
+
+    :ivar labels: The labels of every sample, ex. {"receiver": "0"} to tell the metrics of 2 readers apart.
+    :ivar lines_read: The amount of lines read from the connection.
+    :ivar lines_blacklisted: The amount of FLEX lines that were blacklisted.
+    :ivar parse_failures: The amount of lines that were not FLEX lines, ex. multimon-ng status output.
+    :ivar duplicates: The amount of FLEX lines that were suppressed as duplicates, see `Deduplicator`.
+    :ivar act_errors: The amount of act(line) calls that raised an exception.
+    :ivar restarts: The amount of times the processes of the connection were restarted.
+    :ivar act_seconds: The duration of act(line) calls.
+    :ivar read_stall_seconds: The time spent waiting for the next line from the connection.
+    """
+
+    def __init__(self, labels=None):
+        self.labels = labels or {}
+        self.lines_read = Counter("p2000_lines_read_total", "Lines read from the connection.")
+        self.lines_blacklisted = Counter("p2000_lines_blacklisted_total", "FLEX lines that were blacklisted.")
+        self.parse_failures = Counter("p2000_parse_failures_total", "Lines that were not FLEX lines.")
+        self.duplicates = Counter("p2000_duplicates_total", "FLEX lines that were suppressed as duplicates.")
+        self.act_errors = Counter("p2000_act_errors_total", "act(line) calls that raised an exception.")
+        self.restarts = Counter("p2000_connection_restarts_total", "Restarts of the connection processes.")
+        self.act_seconds = Histogram("p2000_act_seconds", "Duration of act(line) calls.")
+        self.read_stall_seconds = Histogram("p2000_read_stall_seconds", "Time spent waiting for the next line.")
+
+    def all(self):
+        """
+        :return: A list with every counter and histogram.
+        """
+        return [self.lines_read, self.lines_blacklisted, self.parse_failures, self.duplicates, self.act_errors,
+                self.restarts, self.act_seconds, self.read_stall_seconds]
+
+    def snapshot(self):
+        """
+        :return: A dict with the value of every counter, and the count and sum of every histogram, by name.
+        """
+        return dict((metric.name, metric.snapshot()) for metric in self.all())
+
+
+def escape_label(value):
+    """
+    Escape a label value for the Prometheus text exposition format.
+    :param value: The label value, it is converted to a String.
+    :return: The value with backslashes, double quotes and newlines escaped.
+    """
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(registries):
+    """
+    Render metrics in the Prometheus text exposition format.
+    :param registries: A list of Metrics objects, their metrics are told apart by their labels.
+    :return: The text as a String.
+    """
+    lines = []
+    for index, metric in enumerate(registries[0].all() if registries else []):
+        lines.append("# HELP {0} {1}".format(metric.name, metric.description))
+        lines.append("# TYPE {0} {1}".format(metric.name, metric.TYPE))
+        for registry in registries:
+            for suffix, labels, value in registry.all()[index].samples():
+                labels = dict(registry.labels, **labels)
+                text = ",".join('{0}="{1}"'.format(k, escape_label(v)) for k, v in sorted(labels.items()))
+                lines.append("{0}{1}{2} {3}".format(metric.name, suffix, "{" + text + "}" if text else "", value))
+    return "\n".join(lines) + "\n"
+
+
+def format_line(registries):
+    """
+    Render metrics as a single log line, with the counters and the count and average of every histogram.
+    :param registries: A list of Metrics objects.
+    :return: The line as a String.
+    """
+    parts = []
+    for registry in registries:
+        prefix = ",".join("{0}={1}".format(k, v) for k, v in sorted(registry.labels.items()))
+        for name, value in sorted(registry.snapshot().items()):
+            name = name.replace("p2000_", "", 1)
+            if prefix:
+                name = "{0}[{1}]".format(name, prefix)
+            if isinstance(value, dict):
+                average = value["sum"] / value["count"] if value["count"] else 0.0
+                parts.append("{0}.count={1} {0}.avg={2:.6f}".format(name, value["count"], average))
+            else:
+                parts.append("{0}={1}".format(name, value))
+    return " ".join(parts)
+
+
+class PrometheusSink:
+    """
+    Serve metrics in the Prometheus text format over HTTP, from a background thread.
+    Every path answers with the metrics, ex. http://127.0.0.1:9650/metrics.
+    """
+
+    def __init__(self, metrics, host="127.0.0.1", port=9650):
+        """
+        Create a new PrometheusSink.
+        :param metrics: A Metrics object, or a list of them.
+        :param host: The address to listen on, default is 127.0.0.1.
+        :param port: The port to listen on, 0 picks a free port, default is 9650.
+        """
+        self.registries = metrics if isinstance(metrics, list) else [metrics]
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """
+        Start serving.
+        :return: The current instance.
+        """
+        registries = self.registries
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                body = render_prometheus(registries).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(target=self.server.serve_forever, name="p2000-metrics")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving.
+        :return: Nothing
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.thread.join()
+            self.server = None
+            self.thread = None
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class LogSink:
+    """
+    Log metrics as a single line every `interval` seconds, from a background thread.
+    """
+
+    def __init__(self, metrics, interval=60, logger=None):
+        """
+        Create a new LogSink.
+        :param metrics: A Metrics object, or a list of them.
+        :param interval: The amount of seconds between log lines, default is 60.
+        :param logger: The Logger to log to at INFO level, default is the "p2000.metrics" logger.
+        """
+        self.registries = metrics if isinstance(metrics, list) else [metrics]
+        self.interval = interval
+        self.logger = logger or logging.getLogger("p2000.metrics")
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        Start logging.
+        :return: The current instance.
+        """
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.__run__, name="p2000-metrics-log")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop logging, the metrics are logged a last time.
+        :return: Nothing
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def __run__(self):
+        while not self.stopped.wait(self.interval):
+            self.logger.info(format_line(self.registries))
+        self.logger.info(format_line(self.registries))
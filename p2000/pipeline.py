@@ -0,0 +1,280 @@
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger("p2000.pipeline")
+
+
+class PipelineStats:
+    """
+    Thread safe counters for a Pipeline.
+
+    :ivar enqueued: The amount of lines that were handed to the pipeline.
+    :ivar processed: The amount of lines that were acted upon by a worker.
+    :ivar dropped: The amount of lines that were discarded because the queue was full.
+    :ivar spilled: The amount of lines that were written to the spill file because the queue was full.
+    :ivar errors: The amount of act(line) calls that raised an exception.
+    :ivar latency_total: The summed time in seconds between enqueueing a line and finishing act(line).
+    :ivar latency_max: The largest time in seconds between enqueueing a line and finishing act(line).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.enqueued = 0
+        self.processed = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.errors = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def increment(self, name, amount=1):
+        """
+        Increment the counter with the given name.
+        :param name: The name of the counter, ex. "dropped".
+        :param amount: The amount to add to the counter, default is 1.
+        :return: Nothing
+        """
+        with self.lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def record(self, latency, failed=False):
+        """
+        Record a finished act(line) call.
+        :param latency: The time in seconds between enqueueing the line and finishing act(line).
+        :param failed: If the act(line) call raised an exception, default is False.
+        :return: Nothing
+        """
+        with self.lock:
+            self.processed += 1
+            self.errors += 1 if failed else 0
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    @property
+    def latency_avg(self):
+        """
+        The average time in seconds between enqueueing a line and finishing act(line).
+        :return: The average latency as a float, 0.0 if nothing was processed yet.
+        """
+        with self.lock:
+            return self.latency_total / self.processed if self.processed else 0.0
+
+
+class Spill:
+    """
+    A FIFO on disk that holds the lines that did not fit in the queue of a Pipeline.
+    Lines are stored length prefixed so that any byte sequence can be spilled.
+    The file is truncated as soon as every spilled line has been read back.
+    """
+
+    def __init__(self, path=None):
+        """
+        Create a new Spill.
+        :param path: The file to spill to, a temporary file is used if no path is given.
+        """
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="p2000-spill-")
+            os.close(fd)
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "w+b")
+        self.read_offset = 0
+        self.write_offset = 0
+        self.pending = 0
+
+    def write(self, item):
+        """
+        Append an item to the end of the spill.
+        :param item: A tuple with the enqueue timestamp and the raw line as bytes.
+        :return: Nothing
+        """
+        timestamp, line = item
+        header = "{0!r} {1}\n".format(timestamp, len(line)).encode("ascii")
+        with self.lock:
+            self.file.seek(self.write_offset)
+            self.file.write(header)
+            self.file.write(line)
+            self.write_offset = self.file.tell()
+            self.pending += 1
+
+    def read(self):
+        """
+        Take the oldest item from the spill.
+        :return: A tuple with the enqueue timestamp and the raw line, or None if the spill is empty.
+        """
+        with self.lock:
+            if self.pending == 0:
+                return None
+            self.file.flush()
+            self.file.seek(self.read_offset)
+            timestamp, length = self.file.readline().split()
+            line = self.file.read(int(length))
+            self.read_offset = self.file.tell()
+            self.pending -= 1
+            if self.pending == 0:
+                self.file.seek(0)
+                self.file.truncate()
+                self.read_offset = self.write_offset = 0
+            return float(timestamp), line
+
+    def close(self):
+        """
+        Close and remove the spill file.
+        :return: Nothing
+        """
+        with self.lock:
+            self.file.close()
+            if os.path.exists(self.path):
+                os.remove(self.path)
+
+
+class Pipeline:
+    """
+    A bounded queue between the thread that drains a Connection and a pool of workers that call act(line).
+    Draining stdout never waits on act(line), so a slow act(line) can not back up rtl_fm and multimon-ng.
+    What happens when the queue is full is determined by the overflow policy:
+        * BLOCK - Wait until a worker has room, the pipe backs up like it would without a pipeline.
+        * DROP_OLDEST - Discard the oldest queued line to make room for the new one.
+        * SPILL - Write the line to a file on disk, the workers read it back when the queue is empty.
+
+    :ivar stats: The PipelineStats for this pipeline.
+    """
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    SPILL = "spill"
+    POLICIES = [BLOCK, DROP_OLDEST, SPILL]
+
+    def __init__(self, act, **kwargs):
+        """
+        Create a new Pipeline that calls the given act for every line.
+        :param act: The callable to call with every line, usually AbstractReader.act.
+        :keyword workers: The amount of worker threads, default is 1.
+        :keyword size: The maximum amount of lines in the queue, default is 1024.
+        :keyword overflow: The overflow policy, one of Pipeline.POLICIES, default is Pipeline.BLOCK.
+        :keyword spill_path: The file to spill to when the overflow policy is SPILL, default is a temporary file.
+        :raises ValueError: Raised when the overflow policy is unknown or the amount of workers is below 1.
+        """
+        self.act = act
+        self.workers = kwargs.get("workers", 1)
+        self.size = kwargs.get("size", 1024)
+        self.overflow = kwargs.get("overflow", self.BLOCK)
+        if self.overflow not in self.POLICIES:
+            raise ValueError("Unknown overflow policy '{0}'.".format(self.overflow))
+        if self.workers < 1:
+            raise ValueError("A pipeline needs at least 1 worker.")
+        self.queue = queue.Queue(self.size)
+        self.spill = Spill(kwargs.get("spill_path")) if self.overflow == self.SPILL else None
+        self.stats = PipelineStats()
+        self.threads = []
+
+    @property
+    def depth(self):
+        """
+        The amount of lines that are waiting to be acted upon, spilled lines included.
+        :return: The depth as an int.
+        """
+        return self.queue.qsize() + (self.spill.pending if self.spill is not None else 0)
+
+    def start(self):
+        """
+        Start the worker threads.
+        :return: The current instance.
+        """
+        for index in range(self.workers):
+            thread = threading.Thread(target=self.__work__, name="p2000-worker-{0}".format(index))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def feed(self, stdout):
+        """
+        Drain the given stdout into the queue until it is exhausted.
+        :param stdout: Any iterable of lines, usually Connection.stdout.
+        :return: Nothing
+        """
+        for line in stdout:
+            self.put(line)
+
+    def put(self, line):
+        """
+        Hand a line to the workers, the overflow policy is applied when the queue is full.
+        :param line: The line to enqueue.
+        :return: Nothing
+        """
+        item = (time.time(), line)
+        self.stats.increment("enqueued")
+        if self.overflow == self.BLOCK:
+            self.queue.put(item)
+        elif self.overflow == self.DROP_OLDEST:
+            self.__put_drop_oldest__(item)
+        elif self.spill.pending > 0 or not self.__try_put__(item):
+            # Once spilling has started every new line is spilled as well, this keeps the lines in order.
+            self.spill.write(item)
+            self.stats.increment("spilled")
+
+    def stop(self, timeout=None):
+        """
+        Let the workers finish every queued and spilled line, then stop them.
+        :param timeout: The maximum amount of seconds to wait for each worker, default is no limit.
+        :return: Nothing
+        """
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join(timeout)
+        self.threads = []
+        if self.spill is not None:
+            self.spill.close()
+
+    def __try_put__(self, item):
+        try:
+            self.queue.put_nowait(item)
+            return True
+        except queue.Full:
+            return False
+
+    def __put_drop_oldest__(self, item):
+        while not self.__try_put__(item):
+            try:
+                self.queue.get_nowait()
+                self.stats.increment("dropped")
+            except queue.Empty:
+                pass
+
+    def __next_item__(self):
+        """
+        Take the next item for a worker, spilled items are taken once the queue is empty.
+        :return: A tuple with the enqueue timestamp and the line, or None when the worker should stop.
+        """
+        if self.spill is not None:
+            try:
+                return self.queue.get_nowait()
+            except queue.Empty:
+                item = self.spill.read()
+                if item is not None:
+                    return item
+        return self.queue.get()
+
+    def __work__(self):
+        while True:
+            item = self.__next_item__()
+            if item is None:
+                # Drain whatever is left in the spill before the worker stops.
+                item = self.spill.read() if self.spill is not None else None
+                if item is None:
+                    return
+                self.queue.put(None)
+            timestamp, line = item
+            failed = False
+            try:
+                self.act(line)
+            except Exception:
+                failed = True
+                logger.exception("act(line) raised an exception for line %r.", line)
+            self.stats.record(time.time() - timestamp, failed)
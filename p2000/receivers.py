@@ -0,0 +1,177 @@
+import queue
+import threading
+import time
+
+import p2000.utils
+from p2000.metrics import Metrics
+from p2000.supervisor import SupervisedConnection
+
+
+class Receiver:
+    """
+    A single dongle of a ReceiverPool, with its connection and its statistics.
+
+    :ivar name: The name of the receiver, ex. "0".
+    :ivar settings: The settings of the receiver, see `rtlsdr.Connection`.
+    :ivar connection: The connection of the receiver.
+    :ivar metrics: The Metrics of the receiver, labeled with its name.
+    :ivar last_line: The time the last line was read, None if no line was read.
+    :ivar error: The error that stopped the receiver, None if it did not fail.
+    """
+
+    def __init__(self, name, settings, connection, metrics):
+        self.name = name
+        self.settings = settings
+        self.connection = connection
+        self.metrics = metrics
+        self.thread = None
+        self.last_line = None
+        self.error = None
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def stats(self):
+        """
+        :return: A dict with the lines read, the restarts, if the receiver is running, the time of the last line
+            and the last error.
+        """
+        return {
+            "lines": self.metrics.lines_read.value,
+            "restarts": self.metrics.restarts.value,
+            "running": self.running,
+            "last_line": self.last_line,
+            "error": repr(self.error) if self.error is not None else None
+        }
+
+
+class ReceiverPool:
+    """
+    Drive several dongles from one process, ex. on different frequencies or antennas for coverage.
+    Every receiver has its own connection, read by its own thread, the lines of every receiver are merged into
+    the single `stdout` of the pool. The pool has the contract of a Connection, so any reader can be attached to it:
+        reader.attach(ReceiverPool())
+    A message that is decoded by several receivers is passed on once per receiver.
+
+    :ivar receivers: The Receiver objects, in the order of the settings.
+    """
+
+    def __init__(self, receivers=None, **kwargs):
+        """
+        Create a new ReceiverPool.
+        :param receivers: A list with a settings dict per receiver, each with a "name" and any of the keywords of
+            `rtlsdr.Connection`, ex. {"name": "0", "device": 0, "frequency": "169.65M", "ppm": 83, "gain": 30}.
+            Default is config.json["rtlsdr"]["receivers"].
+        :keyword factory: The callable that creates the connection of a receiver, it is called with the Metrics and
+            the settings without the name as keywords. Default is `SupervisedConnection`.
+        :keyword queue_size: The maximum amount of merged lines that wait to be read, default is 1024.
+            A full queue blocks the receiver threads.
+        :raises ValueError: When there are no receivers, or 2 receivers have the same name.
+        """
+        if receivers is None:
+            receivers = p2000.utils.load_config()["rtlsdr"]["receivers"]
+        factory = kwargs.get("factory", SupervisedConnection)
+        self.queue = queue.Queue(kwargs.get("queue_size", 1024))
+        self.receivers = []
+        for index, settings in enumerate(receivers):
+            settings = dict(settings)
+            name = str(settings.pop("name", index))
+            if name in [r.name for r in self.receivers]:
+                raise ValueError("Receiver '{0}' is configured twice.".format(name))
+            metrics = Metrics({"receiver": name})
+            self.receivers.append(Receiver(name, settings, factory(metrics, **settings), metrics))
+        if not self.receivers:
+            raise ValueError("A ReceiverPool needs at least one receiver.")
+        self.stdout = None
+
+    @property
+    def metrics(self):
+        """
+        :return: A list with the Metrics of every receiver, to pass to a sink.
+        """
+        return [receiver.metrics for receiver in self.receivers]
+
+    @property
+    def stats(self):
+        """
+        :return: A dict with the stats of every receiver by name, see `Receiver.stats`.
+        """
+        return dict((receiver.name, receiver.stats) for receiver in self.receivers)
+
+    def open(self, **kwargs):
+        """
+        Open the connection of every receiver, and start a thread per receiver that reads it.
+        When a connection fails to open, the connections that were already opened are killed.
+        :keyword kill: See `rtlsdr.Connection.open`.
+        :return: Nothing
+        :raises Exception: The error of the connection that failed to open.
+        """
+        for index, receiver in enumerate(self.receivers):
+            receiver.error = None
+            try:
+                receiver.connection.open(**kwargs)
+            except BaseException:
+                for opened in self.receivers[:index]:
+                    opened.connection.kill()
+                raise
+        for receiver in self.receivers:
+            receiver.thread = threading.Thread(target=self.__read__, args=(receiver,),
+                                               name="p2000-receiver-" + receiver.name)
+            receiver.thread.daemon = True
+            receiver.thread.start()
+        self.stdout = self.__merge__(len(self.receivers))
+
+    def kill(self):
+        """
+        Kill the connection of every receiver, and wait for their threads.
+        :return: Nothing
+        """
+        for receiver in self.receivers:
+            receiver.connection.kill()
+        while any(receiver.running for receiver in self.receivers):
+            # Unblock the receiver threads that wait for room in the queue.
+            self.__drain__()
+            for receiver in self.receivers:
+                if receiver.thread is not None:
+                    receiver.thread.join(0.05)
+        self.__drain__()
+        self.stdout = None
+
+    def __drain__(self):
+        try:
+            while True:
+                self.queue.get_nowait()
+        except queue.Empty:
+            pass
+
+    def __read__(self, receiver):
+        """
+        Read the lines of a receiver into the merged queue, a None marks the end of the receiver.
+        :param receiver: The Receiver to read.
+        :return: Nothing
+        """
+        metrics = receiver.metrics
+        try:
+            for line in receiver.connection.stdout:
+                metrics.lines_read.inc()
+                receiver.last_line = time.time()
+                self.queue.put(line)
+        except Exception as error:
+            receiver.error = error
+        finally:
+            self.queue.put(None)
+
+    def __merge__(self, running):
+        """
+        Yield the merged lines until every receiver has ended.
+        :param running: The amount of receivers that were started.
+        :return: A generator with the raw lines.
+        """
+        while running > 0:
+            line = self.queue.get()
+            if line is None:
+                running -= 1
+            else:
+                yield line
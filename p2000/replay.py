@@ -0,0 +1,159 @@
+import threading
+import time
+from subprocess import Popen, PIPE
+
+from p2000.rtlsdr import Connection, Line
+
+
+class ReplayConnection:
+    """
+    A Connection that plays back a recording instead of listening to the antenna, with the same `stdout` contract
+    as `rtlsdr.Connection`, so any reader can be attached to it. Useful to load test and regression test
+    `act(line)` implementations on machines without an SDR.
+    Two kinds of recordings can be played back:
+        * TEXT - The output of multimon-ng, ex. saved with `multimon-ng ... | tee flex.log`.
+          Lines are paced on their FLEX timestamps, lines without a timestamp are passed on immediately.
+        * RAW - The raw audio as rtl_fm outputs it, 16 bit signed mono at `sample_rate`, ex. saved with
+          `rtl_fm ... > flex.raw`. The audio is piped through COMMAND_MULTI and paced on its sample rate.
+    IQ captures have to be demodulated to audio first, ex. with `rtl_fm` or `csdr`, multimon-ng only decodes audio.
+
+    :ivar replayed: The amount of lines that were passed on to stdout.
+    """
+
+    TEXT = "text"
+    RAW = "raw"
+    FORMATS = [TEXT, RAW]
+    COMMAND_MULTI = Connection.COMMAND_MULTI
+    CHUNK_SIZE = 4096
+
+    def __init__(self, path, **kwargs):
+        """
+        Create a new ReplayConnection for the given recording.
+        :param path: The path to the recording.
+        :keyword format: The kind of recording, one of FORMATS, default is "text".
+        :keyword speed: The playback speed, 1 is real time and 10 is 10 times as fast.
+            None plays the recording back as fast as the reader can read it, default is 1.
+        :keyword max_gap: The maximum amount of seconds to wait between 2 lines of a text recording,
+            default is no maximum.
+        :keyword sample_rate: The sample rate of a raw recording, default is 22050, the rate of COMMAND_RTLFM.
+        :raises ValueError: When the format is unknown or the speed is not positive.
+        """
+        self.path = path
+        self.format = kwargs.get("format", self.TEXT)
+        self.speed = kwargs.get("speed", 1)
+        self.max_gap = kwargs.get("max_gap")
+        self.sample_rate = kwargs.get("sample_rate", 22050)
+        if self.format not in self.FORMATS:
+            raise ValueError("Unknown format '{0}', choose from {1}.".format(self.format, self.FORMATS))
+        if self.speed is not None and self.speed <= 0:
+            raise ValueError("The speed has to be positive, or None for as fast as possible.")
+        self.stopped = threading.Event()
+        self.file = None
+        self.multi_process = None
+        self.feeder = None
+        self.stdout = None
+        self.replayed = 0
+
+    def open(self, **kwargs):
+        """
+        Start playing back the recording.
+        :return: Nothing
+        """
+        self.stopped.clear()
+        self.replayed = 0
+        self.file = open(self.path, "rb")
+        if self.format == self.TEXT:
+            lines = self.file if self.speed is None else self.__paced__(self.file)
+        elif self.speed is None:
+            self.multi_process = Popen(self.COMMAND_MULTI, stdin=self.file, stdout=PIPE)
+            lines = self.multi_process.stdout
+        else:
+            self.multi_process = Popen(self.COMMAND_MULTI, stdin=PIPE, stdout=PIPE)
+            self.feeder = threading.Thread(target=self.__feed__, name="p2000-replay-feeder")
+            self.feeder.daemon = True
+            self.feeder.start()
+            lines = self.multi_process.stdout
+        self.stdout = self.__count__(lines)
+
+    def kill(self):
+        """
+        Stop playing back, only the multimon-ng process started by this connection is terminated.
+        :return: Nothing
+        """
+        self.stopped.set()
+        if self.multi_process is not None:
+            if self.multi_process.poll() is None:
+                self.multi_process.terminate()
+            self.multi_process.wait()
+            self.multi_process.stdout.close()
+            self.multi_process = None
+        if self.feeder is not None:
+            self.feeder.join()
+            self.feeder = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        self.stdout = None
+
+    def __count__(self, lines):
+        for line in lines:
+            if self.stopped.is_set():
+                return
+            self.replayed += 1
+            yield line
+
+    def __paced__(self, lines):
+        """
+        Pass the lines of a text recording on at the pace of their timestamps.
+        :param lines: The raw lines of the recording.
+        :return: A generator with the raw lines.
+        """
+        first = None
+        start = time.time()
+        previous = None
+        for raw in lines:
+            try:
+                timestamp = Line.parse(raw).datetime
+            except ValueError:
+                timestamp = None
+            if timestamp is not None:
+                if first is None:
+                    first = timestamp
+                elif previous is not None and self.max_gap is not None:
+                    gap = (timestamp - previous).total_seconds()
+                    if gap > self.max_gap:
+                        # Shift the schedule, as if the gap was only max_gap seconds.
+                        first += timestamp - previous
+                        start += self.max_gap / float(self.speed)
+                previous = timestamp
+                delay = start + (timestamp - first).total_seconds() / self.speed - time.time()
+                if delay > 0 and self.stopped.wait(delay):
+                    return
+            yield raw
+
+    def __feed__(self):
+        """
+        Write a raw recording to multimon-ng at `speed` times its sample rate, from a background thread.
+        :return: Nothing
+        """
+        rate = self.sample_rate * 2 * self.speed  # Bytes per second, 2 bytes per sample.
+        start = time.time()
+        written = 0
+        stdin = self.multi_process.stdin
+        try:
+            while not self.stopped.is_set():
+                chunk = self.file.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                stdin.write(chunk)
+                written += len(chunk)
+                delay = start + written / rate - time.time()
+                if delay > 0 and self.stopped.wait(delay):
+                    break
+        except (IOError, ValueError):
+            pass  # multimon-ng exited or the connection was killed.
+        finally:
+            try:
+                stdin.close()
+            except IOError:
+                pass
@@ -1,12 +1,34 @@
 import abc
+import time
+from datetime import datetime
 
 from requests import ConnectionError
 
-from p2000 import utils
-from subprocess import Popen, PIPE, call
+from p2000.blacklist import Blacklist
+from p2000.pipeline import Pipeline
+from subprocess import Popen, PIPE, TimeoutExpired
 
 
 class Line:
+    """
+    A single FLEX message as decoded by multimon-ng.
+    Both the classic output, "FLEX: 2018-09-15 21:42:05 1600/2/K/A 10.120 [001523172] ALN message",
+    and the pipe separated output, "FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|001523172 000123456|ALN|message",
+    are understood. The line is split once, the FLEX frame fields are only converted when they are read.
+
+    :ivar line: The decoded line the object was created from.
+    :ivar timestamp: The date of the message, ex. "2018-09-15".
+    :ivar time: The time of the message, ex. "21:42:05".
+    :ivar monitorcode: The first capcode of the message, ex. "001523172".
+    :ivar capcodes: A list with every capcode of the message.
+    :ivar message: The message, including the message type, ex. "ALN A2 Dorpsstraat Groningen".
+    :ivar units: A list with the Units of the capcodes, None until the line is enriched, see `UnitCache`.
+    :ivar alarm: The structured fields of the message, None until they are extracted, see `extraction.enrich`.
+    :ivar received: The UTC datetime the line was read, None until it is spooled, see `alarms.BufferedWriter`.
+    """
+
+    __slots__ = ("line", "timestamp", "time", "monitorcode", "capcodes", "message", "units", "alarm", "received",
+                 "__frame", "__cycle")
 
     def __init__(self, line, **kwargs):
         """
@@ -15,12 +37,106 @@ class Line:
         :keyword timestamp: The timestamp to set to the object.
         :keyword monitorcode: The monitorcode to set to the object.
         :keyword message: The message to set to the object.
+        :raises ValueError: Raised when the line is not a FLEX line.
         """
-        words = line.split()
         self.line = line
-        self.timestamp = kwargs.get('timestamp', " ".join(words[1:2]))
-        self.monitorcode = kwargs.get('monitorcode', words[5].strip("[]"))
-        self.message = kwargs.get('message', " ".join(words[6:-1]))
+        self.units = None
+        self.alarm = None
+        self.received = None
+        try:
+            if line.startswith("FLEX|"):
+                fields = line.split("|", 6)
+                self.timestamp, _, self.time = fields[1].partition(" ")
+                self.__frame = fields[2]
+                self.__cycle = fields[3]
+                self.capcodes = fields[4].split()
+                self.monitorcode = self.capcodes[0]
+                self.message = " ".join(fields[5:7])
+            else:
+                words = line.split(None, 6)
+                if len(words) == 7:
+                    _, self.timestamp, self.time, self.__frame, self.__cycle, monitorcode, rest = words
+                else:
+                    _, self.timestamp, self.time, self.__frame, self.__cycle, monitorcode = words
+                    rest = ""
+                self.monitorcode = monitorcode = monitorcode.strip("[]")
+                self.capcodes = [monitorcode]
+                # The last word is not part of the message, see the classic multimon-ng output.
+                # Only a rest with single spaces between the words can be split on the last space.
+                if "  " in rest or "\t" in rest or rest[-1:].isspace():
+                    self.message = " ".join(rest.split()[:-1])
+                else:
+                    self.message = rest.rpartition(" ")[0]
+        except (IndexError, ValueError):
+            raise ValueError("Not a FLEX line: '{0}'.".format(line))
+        if kwargs:
+            self.timestamp = kwargs.get('timestamp', self.timestamp)
+            self.monitorcode = kwargs.get('monitorcode', self.monitorcode)
+            self.message = kwargs.get('message', self.message)
+
+    @classmethod
+    def parse(cls, raw, encoding="utf-8"):
+        """
+        Create a new FLEX Line object from a raw line as read from a Connection.
+        :param raw: The line as bytes, trailing whitespace is stripped.
+        :param encoding: The encoding of the line, default is "utf-8".
+        :return: A new FLEX Line object.
+        :raises ValueError: Raised when the line is not a FLEX line.
+        """
+        return cls(raw.decode(encoding).rstrip())
+
+    @property
+    def datetime(self):
+        """
+        The timestamp and time of the message combined.
+        :return: A naive datetime.datetime in the timezone of the receiver.
+        """
+        date, clock = self.timestamp, self.time
+        return datetime(int(date[0:4]), int(date[5:7]), int(date[8:10]),
+                        int(clock[0:2]), int(clock[3:5]), int(clock[6:8]))
+
+    @property
+    def baud(self):
+        """
+        :return: The baud rate of the FLEX frame as an int, ex. 1600.
+        """
+        return int(self.__frame.split("/")[0])
+
+    @property
+    def levels(self):
+        """
+        :return: The amount of FSK levels of the FLEX frame as an int, ex. 2.
+        """
+        return int(self.__frame.split("/")[1])
+
+    @property
+    def phase(self):
+        """
+        :return: The FLEX phase, ex. "K".
+        """
+        return self.__frame.split("/")[2]
+
+    @property
+    def type(self):
+        """
+        :return: The FLEX frame type flag, ex. "A", or None if multimon-ng did not output it.
+        """
+        parts = self.__frame.split("/")
+        return parts[3] if len(parts) > 3 else None
+
+    @property
+    def cycle(self):
+        """
+        :return: The FLEX cycle number as an int.
+        """
+        return int(self.__cycle.partition(".")[0])
+
+    @property
+    def frame(self):
+        """
+        :return: The FLEX frame number as an int.
+        """
+        return int(self.__cycle.partition(".")[2])
 
     def __str__(self):
         """
@@ -37,16 +153,62 @@ class Line:
                "\t@monitorcode = {3}".format(self.line, self.message, self.timestamp, self.monitorcode)
 
 
+def parse_many(buffer, encoding="utf-8"):
+    """
+    Create FLEX Line objects for every line in the given buffer.
+    Lines that are empty or that are not FLEX lines, like multimon-ng status output, are skipped.
+    :param buffer: The lines as bytes, separated by newlines.
+    :param encoding: The encoding of the lines, default is "utf-8".
+    :return: A list of FLEX Line objects.
+    """
+    lines = [line.rstrip() for line in buffer.decode(encoding).splitlines() if line.startswith("FLEX")]
+    try:
+        return [Line(line) for line in lines]
+    except ValueError:
+        pass  # A malformed line is rare, only then is every line parsed on its own.
+    result = []
+    for line in lines:
+        try:
+            result.append(Line(line))
+        except ValueError:
+            pass
+    return result
+
+
 class Connection:
     
     COMMAND_RTLFM = ["rtl_fm", "-f", "169.65M", "-M", "fm", "-s", "22050", "-p", "83", "-g", "30"]
     COMMAND_MULTI = ["multimon-ng", "-q", "-a", "FLEX", "-t", "raw", "/dev/stdin"]
-    COMMAND_KILL = ["killall", "-9", "rtl_fm"]
+    TIMEOUT = 2
+    SETTINGS = ("device", "frequency", "ppm", "gain")
 
-    def __init__(self):
+    def __init__(self, metrics=None, **kwargs):
+        """
+        Create a new Connection, the settings of rtl_fm default to those of COMMAND_RTLFM.
+        :param metrics: The Metrics to count restarts in, default is the Metrics of the reader it is attached to.
+        :keyword device: The index of the dongle, default is the first dongle.
+        :keyword frequency: The frequency to listen on, ex. "169.65M".
+        :keyword ppm: The frequency correction of the dongle in ppm, ex. 83.
+        :keyword gain: The gain in dB, ex. 30.
+        """
+        settings = dict((key, value) for key, value in kwargs.items() if key in self.SETTINGS)
+        if settings:
+            self.COMMAND_RTLFM = self.rtlfm_command(**settings)
         self.rtlfm_process = None
         self.multi_process = None
         self.stdout = None
+        self.metrics = metrics
+
+    @staticmethod
+    def rtlfm_command(device=None, frequency="169.65M", ppm=83, gain=30):
+        """
+        Create the rtl_fm command for the given settings, the sample rate is the one multimon-ng expects.
+        :return: The command as a list.
+        """
+        command = ["rtl_fm"]
+        if device is not None:
+            command += ["-d", str(device)]
+        return command + ["-f", str(frequency), "-M", "fm", "-s", "22050", "-p", str(ppm), "-g", str(gain)]
 
     def open(self, **kwargs):
         """
@@ -54,21 +216,48 @@ class Connection:
         Spawns 2 processes:
             * rtl_fm - A process that runs an instance of rtl_fm that connects to the antenna.
             * multimon-ng - A process that runs an instance of multimon_ng that decodes the FLEX protocol messages.
-        :keyword kill: To kill or not kill any current running processes, default is True.
+        Opening a connection that was opened before counts as a restart in the metrics.
+        :keyword kill: To kill or not kill the processes this connection started before, default is False.
         :return: Nothing
         """
         if kwargs.get("kill", False):
             self.kill()
-        self.rtlfm_process = Popen(self.COMMAND_RTLFM, stdout=PIPE)
-        self.multi_process = Popen(self.COMMAND_MULTI, stdin=self.rtlfm_process.stdout, stdout=PIPE)
+        if self.metrics is not None and self.multi_process is not None:
+            self.metrics.restarts.inc()
+        self.__spawn__()
         self.stdout = self.multi_process.stdout
 
+    def __spawn__(self):
+        """
+        Start rtl_fm and multimon-ng, with the output of rtl_fm piped into multimon-ng.
+        :return: Nothing
+        """
+        self.rtlfm_process = Popen(self.COMMAND_RTLFM, stdout=PIPE)
+        try:
+            self.multi_process = Popen(self.COMMAND_MULTI, stdin=self.rtlfm_process.stdout, stdout=PIPE)
+        finally:
+            # multimon-ng holds its own copy of the pipe, so it sees EOF as soon as rtl_fm exits.
+            self.rtlfm_process.stdout.close()
+
     def kill(self):
         """
-        Kill the connection with COMMAND_KILL.
+        Terminate the processes started by this connection, other rtl_fm processes are left alone.
+        Processes that do not exit within TIMEOUT seconds are killed.
         :return: Nothing
         """
-        call(self.COMMAND_KILL)
+        for process in (self.rtlfm_process, self.multi_process):
+            if process is None:
+                continue
+            if process.poll() is None:
+                process.terminate()
+                try:
+                    process.wait(self.TIMEOUT)
+                except TimeoutExpired:
+                    process.kill()
+                    process.wait()
+            if process.stdout is not None:
+                process.stdout.close()
+        self.stdout = None
 
 
 class AbstractReader:
@@ -77,17 +266,70 @@ class AbstractReader:
     A Reader can act on a line received by any Connection that is attached to the Reader.
     The user should extend this class and create his/her own implementation of the act(line) method.
 
-    :ivar blacklist_messages: An array of messages contained in config.json
-    :ivar blacklist_monitorcodes: An array of monitorcodes contained in config.json
+    :ivar blacklist: The Blacklist from config.json, reloaded when config.json changes.
     :ivar encoding: The encoding for the received lines, default is UTF-8.
     :ivar connection: The connection to act on, set and unset with attach and detach respectively.
+    :ivar workers: The amount of worker threads that call act(line), 0 means act(line) is called inline.
+    :ivar pipeline: The Pipeline of the current connection, None if the reader is not pipelined.
+    :ivar writers: The writers that receive every FLEX Line that is not blacklisted, see `add_writer`.
+    :ivar metrics: The Metrics the reader is instrumented with, None if instrumentation is disabled.
+    :ivar dedup: The Deduplicator in front of act(line), None if duplicates are not suppressed.
+    :ivar journal: The Journal every raw line is appended to, None if lines are not journaled.
     """
 
+    # Set to True in a subclass to have act(line) called with FLEX Line objects instead of raw lines,
+    # the line is then parsed once and lines that are not FLEX lines or that are blacklisted never reach act(line).
+    ACT_ON_LINES = False
+
     def __init__(self, **kwargs):
-        self.blacklist_messages = utils.load_config()["rtlsdr"]["blacklist"]["messages"]
-        self.blacklist_monitorcodes = utils.load_config()["rtlsdr"]["blacklist"]["monitorcodes"]
+        """
+        Create a new Reader.
+        :keyword encoding: The encoding for the received lines, default is UTF-8.
+        :keyword blacklist: The Blacklist to check lines against, default is the blacklist in config.json.
+        :keyword workers: The amount of worker threads that call act(line), default is 0.
+            When set, stdout is drained into a bounded queue by the reader thread, see `Pipeline`.
+        :keyword queue_size: The maximum amount of queued lines in pipelined mode, default is 1024.
+        :keyword overflow: The overflow policy in pipelined mode, one of Pipeline.POLICIES, default is "block".
+        :keyword spill_path: The spill file for the "spill" overflow policy, default is a temporary file.
+        :keyword metrics: The Metrics to instrument the reader with, default is None which disables instrumentation.
+            A connection without Metrics of its own shares them.
+        :keyword dedup: The Deduplicator that suppresses repeated FLEX messages before the writers and act(line),
+            default is None which passes every message on.
+        :keyword journal: The Journal to append every raw line to as soon as it is read, default is None.
+        """
+        self.blacklist = kwargs.get("blacklist") or Blacklist()
         self.encoding = kwargs.get("encoding", "utf-8")
         self.connection = None
+        self.workers = kwargs.get("workers", 0)
+        self.queue_size = kwargs.get("queue_size", 1024)
+        self.overflow = kwargs.get("overflow", Pipeline.BLOCK)
+        self.spill_path = kwargs.get("spill_path")
+        self.pipeline = None
+        self.writers = []
+        self.metrics = kwargs.get("metrics")
+        self.dedup = kwargs.get("dedup")
+        self.journal = kwargs.get("journal")
+
+    def add_writer(self, writer):
+        """
+        Attach a writer to the reader, ex. an alarms BufferedWriter.
+        Every line that is a FLEX line and is not blacklisted is passed to `writer.write(line)` before act(line)
+        is called, so the writer should not block.
+
+        :param writer: The writer to attach.
+        :return: Nothing
+        """
+        self.writers.append(writer)
+
+    def remove_writer(self, writer):
+        """
+        Detach a writer that was attached with `add_writer`.
+
+        :param writer: The writer to detach.
+        :return: Nothing
+        """
+        if writer in self.writers:
+            self.writers.remove(writer)
 
     @abc.abstractmethod
     def act(self, line):
@@ -130,6 +372,7 @@ class AbstractReader:
         Set the connection to the instance and open it.
         As soon as the connection is opened a loop is started on stdout of the connection.
         Each line that is received wil be acted upon with the act(line) method.
+        In pipelined mode the lines are only queued here and acted upon by the workers of a Pipeline.
         The connection is always detached in case of error or a finished process.
 
         :param connection: The connection to set up.
@@ -137,12 +380,124 @@ class AbstractReader:
         """
         try:
             self.connection = connection
+            if self.metrics is not None and getattr(connection, "metrics", False) is None:
+                connection.metrics = self.metrics
             connection.open()
-            for line in self.connection.stdout:
-                self.act(line)
+            if self.workers > 0:
+                self.__run_pipeline__()
+            else:
+                for line in self.__read__():
+                    self.__dispatch__(line)
         finally:
             self.detach()
 
+    def __read__(self):
+        """
+        The lines of the current connection, timed when the reader is instrumented.
+        Lines are appended to the Journal as soon as they are read, before they are queued or handled.
+
+        :return: An iterable of raw lines.
+        """
+        lines = self.connection.stdout
+        if self.metrics is not None:
+            lines = self.__timed__(lines, self.metrics)
+        if self.journal is not None:
+            lines = self.__journaled__(lines, self.journal)
+        return lines
+
+    @staticmethod
+    def __journaled__(lines, journal):
+        for line in lines:
+            journal.append(line)
+            yield line
+
+    @staticmethod
+    def __timed__(stdout, metrics):
+        iterator = iter(stdout)
+        while True:
+            start = time.time()
+            try:
+                line = next(iterator)
+            except StopIteration:
+                return
+            metrics.read_stall_seconds.observe(time.time() - start)
+            metrics.lines_read.inc()
+            yield line
+
+    def __run_pipeline__(self):
+        """
+        Drain the stdout of the current connection into a new Pipeline.
+        The workers are allowed to finish every queued line before this method returns.
+
+        :return: Nothing
+        """
+        self.pipeline = Pipeline(
+            self.__dispatch__, workers=self.workers, size=self.queue_size,
+            overflow=self.overflow, spill_path=self.spill_path
+        ).start()
+        try:
+            self.pipeline.feed(self.__read__())
+        finally:
+            self.pipeline.stop()
+
+    def __dispatch__(self, raw):
+        """
+        Pass a raw line to the attached writers and to act(line).
+        FLEX lines that the Deduplicator recognises as duplicates are dropped.
+        With ACT_ON_LINES the line is parsed once for the writers and act(line), and lines that are not
+        FLEX lines or that are blacklisted are dropped as well.
+
+        :param raw: The raw line as read from the connection.
+        :return: Nothing
+        """
+        metrics = self.metrics
+        dedup = self.dedup
+        parsed = self.ACT_ON_LINES
+        line = None
+        if parsed or self.writers or metrics is not None or dedup is not None:
+            try:
+                line = self.create_line(raw)
+            except ValueError:
+                if metrics is not None:
+                    metrics.parse_failures.inc()
+                if parsed:
+                    return
+            if line is not None:
+                if dedup is not None and dedup.is_duplicate(line):
+                    if metrics is not None:
+                        metrics.duplicates.inc()
+                    return
+                if not self.is_line_blacklisted(line):
+                    for writer in self.writers:
+                        writer.write(line)
+                else:
+                    if metrics is not None:
+                        metrics.lines_blacklisted.inc()
+                    if parsed:
+                        return
+        if parsed:
+            raw = line
+        if metrics is None:
+            self.act(raw)
+            return
+        start = time.time()
+        try:
+            self.act(raw)
+        except Exception:
+            metrics.act_errors.inc()
+            raise
+        finally:
+            metrics.act_seconds.observe(time.time() - start)
+
+    @property
+    def stats(self):
+        """
+        The statistics of the pipeline, the pipeline keeps them after it is stopped.
+
+        :return: A PipelineStats object, or None if the reader has not run in pipelined mode.
+        """
+        return self.pipeline.stats if self.pipeline is not None else None
+
     def decode_line(self, line, strip=True):
         """
         Decode the line from a byte-format to the format determined by self.encoding, default is "utf-8".
@@ -165,8 +520,24 @@ class AbstractReader:
         """
         strip = kwargs.get("strip", True)
         decode = kwargs.get("decode", True)
+        if decode and strip:
+            return Line.parse(line, self.encoding)
         return Line(self.decode_line(line, strip=strip) if decode else line)
 
+    @property
+    def blacklist_messages(self):
+        """
+        :return: The messages that are blacklisted by an exact match, as contained in config.json.
+        """
+        return self.blacklist.rules.messages
+
+    @property
+    def blacklist_monitorcodes(self):
+        """
+        :return: The monitorcodes that are blacklisted, as contained in config.json.
+        """
+        return self.blacklist.rules.monitorcodes
+
     def is_line_blacklisted(self, line):
         """
         Check to see if the given line is in the blacklist.
@@ -175,7 +546,9 @@ class AbstractReader:
         :param line: The line to check against the blacklist.
         :return: True if the line is blacklisted.
         """
-        return self.is_monitorcode_blacklisted(line) or self.is_message_blacklisted(line)
+        if not isinstance(line, Line):
+            line = self.create_line(line)
+        return self.blacklist.is_line_blacklisted(line)
 
     def is_monitorcode_blacklisted(self, line):
         """
@@ -185,20 +558,18 @@ class AbstractReader:
         :param line: The line to check against the blacklist.
         :return: True if the line is blacklisted.
         """
-        if isinstance(line, Line):
-            return line.monitorcode in self.blacklist_monitorcodes
-        else:
-            return self.create_line(line).monitorcode in self.blacklist_monitorcodes
+        if not isinstance(line, Line):
+            line = self.create_line(line)
+        return self.blacklist.is_monitorcode_blacklisted(line)
 
     def is_message_blacklisted(self, line):
         """
         Check to see if the given line is in the blacklist.
-        The blacklist is checked for messages.
+        The blacklist is checked for messages, see `Blacklist` for the supported message rules.
 
         :param line: The line to check against the blacklist.
         :return: True if the line is blacklisted.
         """
-        if isinstance(line, Line):
-            return line.message in self.blacklist_messages
-        else:
-            return self.create_line(line).message in self.blacklist_messages
+        if not isinstance(line, Line):
+            line = self.create_line(line)
+        return self.blacklist.is_message_blacklisted(line)
@@ -0,0 +1,3 @@
+from p2000.storage.alarms.database import Connection, RollupError
+from p2000.storage.alarms.writer import BufferedWriter
+from p2000.storage.alarms.sqlite import SQLiteConnection
@@ -0,0 +1,317 @@
+import hashlib
+from datetime import datetime
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import PyMongoError, BulkWriteError
+
+from p2000 import Unit, Region, Discipline
+from p2000.rtlsdr import Line
+from p2000.storage.database import AbstractConnection
+
+# The MongoDB error code of a write that conflicts with a unique index, ex. an alarm that was already written.
+DUPLICATE_KEY = 11000
+
+
+class RollupError(PyMongoError):
+    """
+    Raised when the alarms were written, but the rollups could not be updated.
+    The increments are kept by the Connection and written along with the next alarms, see `Connection.write_alarms`.
+    """
+
+
+class Connection(AbstractConnection):
+    """
+    This class is responsible for writing decoded FLEX Lines to and from a MongoDB database.
+    The details of the database are in the config.json.
+
+    Next to the raw alarms, rollup documents with alarm counts are kept up to date as alarms are written.
+    There is one rollup document per bucket, ex. one per hour, with the total and the counts per
+    capcode, region, discipline and region/discipline combination. Queries with `alarm_counts` read only
+    the rollups, so their cost depends on the amount of buckets rather than the amount of alarms.
+    Raw alarms can expire with a TTL index, see config.json["database"]["collections"]["alarms"]["expire_after"],
+    the rollups are kept.
+    The `_id` of an alarm is derived from its line, which holds the time of the message, so writing the same lines
+    again, ex. after a failed write or when a journal is replayed, does not store them twice.
+    """
+
+    BUCKETS = {
+        "minute": lambda d: d.replace(second=0, microsecond=0),
+        "hour": lambda d: d.replace(minute=0, second=0, microsecond=0),
+        "day": lambda d: d.replace(hour=0, minute=0, second=0, microsecond=0)
+    }
+    GROUPS = ["capcode", "region", "discipline", "region_discipline"]
+
+    def __init__(self):
+        """
+        Created a new Database to write and read alarms from.
+        The database is initialized with values from config.json["database"]["collections"]["alarms"]
+        and config.json["database"]["url"]
+        """
+        super(Connection, self).__init__()
+        self.rollups = None
+        self.pending_rollups = {}
+
+    @property
+    def rollups(self):
+        """
+        The rollups collection, fetched from the database when it is first used.
+        :return: A Collection, or None if the connection is not established.
+        """
+        if self.__rollups is None and self.db is not None:
+            self.__rollups = self.db[self.rollups_name()]
+        return self.__rollups
+
+    @rollups.setter
+    def rollups(self, rollups):
+        self.__rollups = rollups
+
+    def ensure_indexes(self):
+        names = super(Connection, self).ensure_indexes()
+        names.append(self.rollups.create_index([("bucket", ASCENDING), ("start", ASCENDING)],
+                                               name="bucket_start", unique=True))
+        return names
+
+    def indexes(self):
+        indexes = [
+            {"keys": [("datetime", DESCENDING)], "name": "datetime"},
+            {"keys": [("capcodes", ASCENDING), ("datetime", DESCENDING)], "name": "capcodes_datetime"}
+        ]
+        expire_after = self.config["database"]["collections"]["alarms"].get("expire_after")
+        if expire_after:
+            indexes.append({"keys": [("received", ASCENDING)], "name": "received_ttl",
+                            "expireAfterSeconds": expire_after})
+        return indexes
+
+    def mongo_url(self):
+        return self.config["database"]["url"]
+
+    def db_name(self):
+        return self.config["database"]["name"]
+
+    def collection_name(self):
+        return self.config["database"]["collections"]["alarms"]["name"]
+
+    def rollups_name(self):
+        """
+        The name of the rollups collection.
+        :return: Returns a string with the name of the collection.
+        """
+        return self.config["database"]["collections"]["alarm_rollups"]["name"]
+
+    def object_to_row(self, obj):
+        if not isinstance(obj, Line):
+            raise TypeError("Param 'obj' is not of type 'Line'.")
+        try:
+            timestamp = obj.datetime
+        except ValueError:
+            timestamp = None
+        row = {
+            "_id": self.__alarm_id__(obj.line),
+            "line": obj.line,
+            "datetime": timestamp,
+            "received": obj.received or datetime.utcnow(),
+            "monitorcode": obj.monitorcode,
+            "capcodes": obj.capcodes,
+            "message": obj.message
+        }
+        if obj.units is not None:
+            row["units"] = [self.__unit_to_row__(unit) for unit in obj.units]
+        return row
+
+    def row_to_object(self, row):
+        if not isinstance(row, dict):
+            raise TypeError("Param 'row' is not of type 'dict'.")
+        line = Line(row["line"], monitorcode=row["monitorcode"], message=row["message"])
+        line.received = row.get("received")
+        if "units" in row:
+            line.units = [self.__row_to_unit__(unit) for unit in row["units"]]
+        return line
+
+    @staticmethod
+    def __alarm_id__(line):
+        """
+        :return: The `_id` of an alarm, the SHA-1 of the line as a hex String.
+        """
+        return hashlib.sha1(line.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def __unit_to_row__(unit):
+        return {
+            "capcode": unit.capcode,
+            "region": unit.region.value["id"],
+            "town": unit.town,
+            "function": unit.function,
+            "discipline": unit.discipline.value["id"]
+        }
+
+    @staticmethod
+    def __row_to_unit__(row):
+        return Unit(
+            capcode=row["capcode"],
+            region=Region.match_by_id(row["region"]),
+            town=row["town"],
+            function=row["function"],
+            discipline=Discipline.match_by_id(row["discipline"])
+        )
+
+    def write_alarms(self, lines):
+        """
+        Write multiple FLEX Line objects to the database, and add the written alarms to the rollups.
+        Alarms that were already written are skipped, so a batch can be written again after a failure.
+        The rollups are only updated for the alarms that were inserted.
+        :param lines: The FLEX Line objects to write to the database.
+        :return: Nothing
+        :raises TypeError: Raised when any of the lines is not a FLEX Line object.
+        :raises BulkWriteError: Raised when the database rejected any of the alarms, for another reason than
+            that it was already written. The other alarms are written and counted.
+        :raises RollupError: Raised when the alarms were written, but the rollups could not be updated.
+        """
+        rows = [self.object_to_row(line) for line in lines]
+        if not rows:
+            return
+        try:
+            self.collection.insert_many(rows, ordered=False)
+        except BulkWriteError as error:
+            errors = error.details.get("writeErrors", [])
+            skipped = set(e["index"] for e in errors)
+            self.__update_rollups__([row for index, row in enumerate(rows) if index not in skipped])
+            if any(e.get("code") != DUPLICATE_KEY for e in errors):
+                raise
+            return
+        self.__update_rollups__(rows)
+
+    def write_alarm(self, line):
+        """
+        Write a single FLEX Line object to the database.
+        :param line: The FLEX Line object to write to the database.
+        :return: Nothing
+        :raises TypeError: Raised when the line is not a FLEX Line object.
+        """
+        row = self.object_to_row(line)
+        self.collection.insert_one(row)
+        self.__update_rollups__([row])
+
+    def find_alarms(self, capcode=None, start=None, end=None, limit=None):
+        """
+        Search the database for alarms, the newest alarm comes first.
+        :param capcode: Only find alarms for this capcode, in the 9 digit format of multimon-ng, default is any.
+        :param start: Only find alarms at or after this datetime, default is no limit.
+        :param end: Only find alarms before this datetime, default is no limit.
+        :param limit: The maximum amount of result to fetch, default is unlimited.
+        :return: A List of FLEX Line objects, or an empty List if none were found.
+        """
+        if limit is not None and limit <= 0:
+            return []  # MongoDB reads a limit of 0 as no limit.
+        params = {}
+        if capcode is not None:
+            params["capcodes"] = capcode
+        if start is not None or end is not None:
+            params["datetime"] = {}
+            if start is not None:
+                params["datetime"]["$gte"] = start
+            if end is not None:
+                params["datetime"]["$lt"] = end
+        options = {} if limit is None else {"limit": limit}
+        cursor = self.collection.find(params, **options).sort("datetime", DESCENDING)
+        return [self.row_to_object(row) for row in cursor]
+
+    def __update_rollups__(self, rows):
+        """
+        Add the given alarm rows to the rollups, with a single upsert per affected bucket.
+        The increments that could not be written before are written along.
+        :param rows: The alarm rows that were written.
+        :return: Nothing
+        :raises RollupError: Raised when the rollups could not be updated, the increments are kept.
+        """
+        if self.rollups is None:
+            return
+        pending = self.pending_rollups
+        for key, counts in self.__rollup_increments__(rows).items():
+            merged = pending.setdefault(key, {})
+            for field, count in counts.items():
+                merged[field] = merged.get(field, 0) + count
+        if not pending:
+            return
+        operations = [
+            UpdateOne({"bucket": bucket, "start": start}, {"$inc": counts}, upsert=True)
+            for (bucket, start), counts in pending.items()
+        ]
+        try:
+            self.rollups.bulk_write(operations, ordered=False)
+        except PyMongoError as error:
+            raise RollupError("The rollups of {0} buckets could not be updated: {1}".format(len(pending), error))
+        self.pending_rollups = {}
+
+    def __rollup_increments__(self, rows):
+        """
+        Count the given alarm rows per bucket.
+        :param rows: The alarm rows that were written.
+        :return: A Dict with a Dict of counters for every (bucket, start) tuple, the counters are keyed on
+            "total" or on the group and the key joined by a dot, ex. "region.01".
+        """
+        increments = {}
+        for row in rows:
+            timestamp = row["datetime"] or row["received"]
+            units = row.get("units") or []
+            unknown = Region.UNKNOWN.value["id"], Discipline.UNKNOWN.value["id"]
+            pairs = set((u["region"], u["discipline"]) for u in units) or set([unknown])
+            regions = set(r for r, _ in pairs)
+            disciplines = set(d for _, d in pairs)
+            fields = ["total"]
+            fields += ["capcode." + c for c in set(row["capcodes"])]
+            fields += ["region." + r for r in regions]
+            fields += ["discipline." + d for d in disciplines]
+            fields += ["region_discipline.{0}_{1}".format(r, d) for r, d in pairs]
+            for bucket, truncate in self.BUCKETS.items():
+                counts = increments.setdefault((bucket, truncate(timestamp)), {})
+                for field in fields:
+                    counts[field] = counts.get(field, 0) + 1
+        return increments
+
+    def alarm_counts(self, start, end, bucket="hour", group_by=None):
+        """
+        Count the alarms per bucket, from the rollups.
+        :param start: The datetime to count from, the bucket it falls in is included.
+        :param end: The datetime to count up to, buckets that start at or after it are excluded.
+        :param bucket: The size of the buckets, one of "minute", "hour" or "day", default is "hour".
+        :param group_by: Count per "capcode", "region", "discipline" or "region_discipline" within every bucket,
+            default is the total per bucket.
+        :return: A List with a Dict for every bucket that has alarms, oldest first, with:
+            * start - The datetime the bucket starts at.
+            * count - The total amount of alarms in the bucket.
+            * counts - Only with group_by, a Dict with the count per capcode String, Region,
+              Discipline or (Region, Discipline) tuple.
+        :raises ValueError: Raised when the bucket or group_by is unknown.
+        """
+        self.__check_counts__(bucket, group_by)
+        params = {"bucket": bucket, "start": {"$gte": self.BUCKETS[bucket](start), "$lt": end}}
+        cursor = self.rollups.find(params).sort("start", ASCENDING)
+        return [self.__count_entry__(doc, group_by) for doc in cursor]
+
+    def __check_counts__(self, bucket, group_by):
+        if bucket not in self.BUCKETS:
+            raise ValueError("Unknown bucket '{0}', choose from {1}.".format(bucket, sorted(self.BUCKETS)))
+        if group_by is not None and group_by not in self.GROUPS:
+            raise ValueError("Unknown group_by '{0}', choose from {1}.".format(group_by, self.GROUPS))
+
+    def __count_entry__(self, doc, group_by):
+        """
+        Convert a rollup document to an entry of the `alarm_counts` result.
+        """
+        entry = {"start": doc["start"], "count": doc.get("total", 0)}
+        if group_by is not None:
+            entry["counts"] = dict(
+                (self.__group_key__(group_by, key), count) for key, count in doc.get(group_by, {}).items()
+            )
+        return entry
+
+    @staticmethod
+    def __group_key__(group_by, key):
+        if group_by == "region":
+            return Region.match_by_id(key)
+        if group_by == "discipline":
+            return Discipline.match_by_id(key)
+        if group_by == "region_discipline":
+            region, _, discipline = key.partition("_")
+            return Region.match_by_id(region), Discipline.match_by_id(discipline)
+        return key
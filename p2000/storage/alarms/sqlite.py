@@ -0,0 +1,150 @@
+import json
+from datetime import datetime, timedelta
+
+from p2000.storage.alarms.database import Connection
+from p2000.storage.sqlite import AbstractSQLiteConnection, DATETIME_FORMAT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alarms (
+    id INTEGER PRIMARY KEY,
+    line TEXT NOT NULL,
+    datetime TEXT,
+    received TEXT NOT NULL,
+    monitorcode TEXT,
+    message TEXT,
+    units TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS alarms_line ON alarms (line);
+CREATE INDEX IF NOT EXISTS alarms_datetime ON alarms (datetime);
+CREATE INDEX IF NOT EXISTS alarms_received ON alarms (received);
+CREATE TABLE IF NOT EXISTS alarm_capcodes (
+    alarm INTEGER NOT NULL REFERENCES alarms (id) ON DELETE CASCADE,
+    capcode TEXT NOT NULL,
+    datetime TEXT
+);
+CREATE INDEX IF NOT EXISTS alarm_capcodes_capcode_datetime ON alarm_capcodes (capcode, datetime);
+CREATE INDEX IF NOT EXISTS alarm_capcodes_alarm ON alarm_capcodes (alarm);
+CREATE TABLE IF NOT EXISTS alarm_rollups (
+    bucket TEXT NOT NULL,
+    start TEXT NOT NULL,
+    field TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (bucket, start, field)
+) WITHOUT ROWID;
+"""
+
+INSERT = "INSERT OR IGNORE INTO alarms (line, datetime, received, monitorcode, message, units) VALUES (?, ?, ?, ?, ?, ?)"
+INSERT_CAPCODE = "INSERT INTO alarm_capcodes (alarm, capcode, datetime) VALUES (?, ?, ?)"
+INSERT_ROLLUP = ("INSERT INTO alarm_rollups (bucket, start, field, count) VALUES (?, ?, ?, ?) "
+                 "ON CONFLICT (bucket, start, field) DO UPDATE SET count = count + excluded.count")
+EXPIRE = "DELETE FROM alarms WHERE received < ?"
+SELECT = "SELECT a.line, a.monitorcode, a.message, a.units FROM alarms a"
+SELECT_ROLLUPS = ("SELECT start, field, count FROM alarm_rollups "
+                  "WHERE bucket = ? AND start >= ? AND start < ? ORDER BY start")
+
+
+def format_datetime(value):
+    return value.strftime(DATETIME_FORMAT) if value is not None else None
+
+
+class SQLiteConnection(AbstractSQLiteConnection, Connection):
+    """
+    This class is responsible for writing decoded FLEX Lines to and from an embedded SQLite database,
+    with the same API as the MongoDB `alarms.Connection`, rollups and expiry included. See `AbstractSQLiteConnection`.
+    The capcodes of every alarm are kept in an indexed table next to it, for `find_alarms` by capcode.
+    Alarms are unique by their line, like the `_id` of the MongoDB Connection, so writing the same lines again
+    does not store or count them twice.
+    """
+
+    def schema(self):
+        return SCHEMA
+
+    def tables(self):
+        return ["alarm_capcodes", "alarms", "alarm_rollups"]
+
+    def write_alarms(self, lines):
+        """
+        Write multiple FLEX Line objects to the database, in a single transaction.
+        Lines that are already stored are skipped, only the alarms that are inserted are added to the rollups.
+        Alarms older than config.json["database"]["collections"]["alarms"]["expire_after"] seconds are
+        deleted in the same transaction.
+        :param lines: The FLEX Line objects to write to the database.
+        :return: Nothing
+        :raises TypeError: Raised when any of the lines is not a FLEX Line object.
+        """
+        rows = [self.object_to_row(line) for line in lines]
+        if not rows:
+            return
+        expire_after = self.config["database"]["collections"]["alarms"].get("expire_after")
+
+        def write(db):
+            inserted = []
+            capcodes = []
+            for row in rows:
+                timestamp = format_datetime(row["datetime"])
+                units = json.dumps(row["units"]) if "units" in row else None
+                values = (row["line"], timestamp, format_datetime(row["received"]),
+                          row["monitorcode"], row["message"], units)
+                cursor = db.execute(INSERT, values)
+                if cursor.rowcount:
+                    inserted.append(row)
+                    capcodes += [(cursor.lastrowid, capcode, timestamp) for capcode in set(row["capcodes"])]
+            db.executemany(INSERT_CAPCODE, capcodes)
+            db.executemany(INSERT_ROLLUP, [
+                (bucket, format_datetime(start), field, count)
+                for (bucket, start), counts in self.__rollup_increments__(inserted).items()
+                for field, count in counts.items()
+            ])
+            if expire_after:
+                db.execute(EXPIRE, (format_datetime(datetime.utcnow() - timedelta(seconds=expire_after)),))
+        self.transaction(write)
+
+    def write_alarm(self, line):
+        self.write_alarms([line])
+
+    def find_alarms(self, capcode=None, start=None, end=None, limit=None):
+        if limit is not None and limit <= 0:
+            return []  # SQLite reads a negative limit as no limit.
+        column = "a.datetime"
+        sql = SELECT
+        conditions = []
+        params = []
+        if capcode is not None:
+            sql += " JOIN alarm_capcodes c ON c.alarm = a.id"
+            column = "c.datetime"
+            conditions.append("c.capcode = ?")
+            params.append(capcode)
+        if start is not None:
+            conditions.append(column + " >= ?")
+            params.append(format_datetime(start))
+        if end is not None:
+            conditions.append(column + " < ?")
+            params.append(format_datetime(end))
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY {0} DESC, a.id DESC LIMIT ?".format(column)
+        params.append(-1 if limit is None else limit)
+        return [self.row_to_object(self.__row__(values)) for values in self.query(sql, params)]
+
+    @staticmethod
+    def __row__(values):
+        row = {"line": values[0], "monitorcode": values[1], "message": values[2]}
+        if values[3] is not None:
+            row["units"] = json.loads(values[3])
+        return row
+
+    def alarm_counts(self, start, end, bucket="hour", group_by=None):
+        self.__check_counts__(bucket, group_by)
+        params = (bucket, format_datetime(self.BUCKETS[bucket](start)), format_datetime(end))
+        docs = []
+        for start_value, field, count in self.query(SELECT_ROLLUPS, params):
+            if not docs or docs[-1]["start"] != start_value:
+                docs.append({"start": start_value})
+            group, _, key = field.partition(".")
+            if key:
+                docs[-1].setdefault(group, {})[key] = count
+            else:
+                docs[-1][group] = count
+        for doc in docs:
+            doc["start"] = datetime.strptime(doc["start"], DATETIME_FORMAT)
+        return [self.__count_entry__(doc, group_by) for doc in docs]
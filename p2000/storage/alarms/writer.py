@@ -0,0 +1,161 @@
+import threading
+from collections import deque
+from datetime import datetime
+
+from pymongo.errors import PyMongoError, BulkWriteError
+
+from p2000.storage.alarms.database import DUPLICATE_KEY, RollupError
+
+
+class BufferedWriter:
+    """
+    Collect FLEX Line objects and write them to an alarms Connection in batches, from a background thread.
+    `write(line)` only appends the line to an in-memory spool, so storage latency never blocks the reader.
+    The spool is flushed when it holds `batch_size` lines or when `interval` seconds have passed.
+    When MongoDB is unreachable the lines stay in the spool and the flush is retried every `interval` seconds.
+    A batch that is written again is not stored twice, and when only the rollups failed the batch is not
+    written again at all, the Connection keeps the increments for the next batch.
+    The spool is bounded, once it holds `spool_size` lines the oldest line is dropped for every new line.
+    Attach it to a reader with `AbstractReader.add_writer(writer)`.
+
+    :ivar written: The amount of lines that were written to the database.
+    :ivar dropped: The amount of lines that were dropped because the spool was full or the database rejected them.
+    :ivar failures: The amount of flushes that failed.
+    :ivar error: The error of the last failed flush, None if the last flush succeeded.
+    """
+
+    def __init__(self, connection, **kwargs):
+        """
+        Create a new BufferedWriter for the given connection.
+        :param connection: The alarms Connection to write to, it is established by the writer if it is not yet.
+        :keyword batch_size: The amount of lines that triggers a flush, default is 100.
+        :keyword interval: The maximum amount of seconds between flushes, default is 1.
+        :keyword spool_size: The maximum amount of lines kept in memory, default is 10000.
+        :keyword units: The UnitCache to resolve the units of lines without units with before they are written,
+            so the alarms are counted per region and discipline, default is None.
+        """
+        self.connection = connection
+        self.batch_size = kwargs.get("batch_size", 100)
+        self.interval = kwargs.get("interval", 1.0)
+        self.spool_size = kwargs.get("spool_size", 10000)
+        self.units = kwargs.get("units")
+        self.spool = deque()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.thread = None
+        self.written = 0
+        self.dropped = 0
+        self.failures = 0
+        self.error = None
+
+    @property
+    def pending(self):
+        """
+        :return: The amount of lines in the spool.
+        """
+        return len(self.spool)
+
+    def start(self):
+        """
+        Start the background thread.
+        :return: The current instance.
+        """
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.__run__, name="p2000-alarm-writer")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """
+        Stop the background thread after a last flush, lines that could not be written stay in the spool.
+        :param timeout: The maximum amount of seconds to wait for the thread, default is no limit.
+        :return: Nothing
+        """
+        self.stopped.set()
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def write(self, line):
+        """
+        Add a line to the spool, this never blocks on the database.
+        The time the line was read is set as `line.received` if it is not set yet.
+        :param line: The FLEX Line object to write.
+        :return: Nothing
+        """
+        if line.received is None:
+            line.received = datetime.utcnow()
+        with self.lock:
+            self.spool.append(line)
+            if len(self.spool) > self.spool_size:
+                self.spool.popleft()
+                self.dropped += 1
+            if len(self.spool) >= self.batch_size:
+                self.wakeup.set()
+
+    def flush(self):
+        """
+        Write every spooled line to the database, in batches of `batch_size`.
+        :return: True if the spool was emptied, False if the database could not be reached.
+        """
+        while True:
+            with self.lock:
+                batch = [self.spool.popleft() for _ in range(min(self.batch_size, len(self.spool)))]
+            if not batch:
+                return True
+            try:
+                if not self.connection.established:
+                    self.connection.establish()
+                if self.units is not None:
+                    self.units.enrich_many([line for line in batch if line.units is None])
+                self.connection.write_alarms(batch)
+                self.written += len(batch)
+                self.error = None
+            except RollupError as error:
+                # The alarms were written, the Connection writes the increments along with the next batch.
+                self.written += len(batch)
+                self.failures += 1
+                self.error = error
+                return False
+            except BulkWriteError as error:
+                # Documents the database rejected will be rejected again, only count them.
+                errors = error.details.get("writeErrors", [])
+                failed = len([e for e in errors if e.get("code") != DUPLICATE_KEY])
+                self.written += len(batch) - failed
+                self.dropped += failed
+                self.error = error
+            except (PyMongoError, IOError) as error:
+                self.__respool__(batch)
+                self.failures += 1
+                self.error = error
+                return False
+
+    def __respool__(self, batch):
+        """
+        Put a batch that could not be written back at the front of the spool, respecting its bound.
+        :param batch: The lines to put back, oldest first.
+        :return: Nothing
+        """
+        with self.lock:
+            self.spool.extendleft(reversed(batch))
+            while len(self.spool) > self.spool_size:
+                self.spool.popleft()
+                self.dropped += 1
+
+    def __run__(self):
+        while not self.stopped.is_set():
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            if not self.flush():
+                # Back off, new lines keep being spooled in the meantime.
+                self.stopped.wait(self.interval)
+        self.flush()
@@ -0,0 +1,24 @@
+import p2000.utils
+from p2000.storage import alarms, units
+
+BACKENDS = {
+    "mongo": {"units": units.Connection, "alarms": alarms.Connection},
+    "sqlite": {"units": units.SQLiteConnection, "alarms": alarms.SQLiteConnection}
+}
+
+
+def create_connection(kind, backend=None):
+    """
+    Create a Connection of the configured storage backend.
+    :param kind: The kind of Connection, "units" or "alarms".
+    :param backend: The name of a backend in BACKENDS, default is config.json["database"]["backend"] or "mongo".
+    :return: A new Connection, that is not yet established.
+    :raises ValueError: When the backend or kind is unknown.
+    """
+    if backend is None:
+        backend = p2000.utils.load_config()["database"].get("backend", "mongo")
+    if backend not in BACKENDS:
+        raise ValueError("Unknown backend '{0}', choose from {1}.".format(backend, sorted(BACKENDS)))
+    if kind not in BACKENDS[backend]:
+        raise ValueError("Unknown kind '{0}', choose from {1}.".format(kind, sorted(BACKENDS[backend])))
+    return BACKENDS[backend][kind]()
@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pymongo
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+import p2000.utils
+
+# The settings of config.json["database"]["client"] and the MongoClient keyword argument each one is passed as.
+OPTIONS = {
+    "max_pool_size": "maxPoolSize",
+    "min_pool_size": "minPoolSize",
+    "max_idle_time_ms": "maxIdleTimeMS",
+    "server_selection_timeout_ms": "serverSelectionTimeoutMS",
+    "connect_timeout_ms": "connectTimeoutMS",
+    "read_preference": "readPreference"
+}
+WRITE_CONCERN = {
+    "w": "w",
+    "wtimeout_ms": "wTimeoutMS",
+    "journal": "journal"
+}
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def client_options(settings):
+    """
+    Convert the client settings of the config to MongoClient keyword arguments.
+    :param settings: A dict like config.json["database"]["client"], ex. {"max_pool_size": 10,
+        "read_preference": "primaryPreferred", "write_concern": {"w": 1, "journal": false}}.
+    :return: A dict with the keyword arguments.
+    :raises ValueError: When a setting is unknown.
+    """
+    options = {}
+    for name, value in settings.items():
+        if name == "write_concern":
+            for key, concern in value.items():
+                if key not in WRITE_CONCERN:
+                    raise ValueError("Unknown write concern '{0}', choose from {1}.".format(key, sorted(WRITE_CONCERN)))
+                options[WRITE_CONCERN[key]] = concern
+        elif name in OPTIONS:
+            options[OPTIONS[name]] = value
+        else:
+            raise ValueError("Unknown client setting '{0}', choose from {1}.".format(
+                name, sorted(list(OPTIONS) + ["write_concern"])
+            ))
+    return options
+
+
+def get_client(url, settings=None):
+    """
+    Get the MongoClient for the given url, every connection in the process shares one client and pool per url.
+    The client is created on the first call, it connects in the background so this never blocks.
+    :param url: The MongoDB url.
+    :param settings: The client settings, only used when the client is created.
+        Default is config.json["database"]["client"].
+    :return: A MongoClient.
+    :raises ValueError: When a setting is unknown.
+    """
+    with _lock:
+        client = _clients.get(url)
+        if client is None:
+            if settings is None:
+                settings = p2000.utils.load_config()["database"].get("client", {})
+            client = MongoClient(url, **client_options(settings))
+            _clients[url] = client
+        return client
+
+
+def close_clients():
+    """
+    Close every client in the registry, the next `get_client` call creates a new one.
+    :return: Nothing
+    """
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
+
+
+def health(url, timeout=1):
+    """
+    Check if the server at the given url can be reached, with a ping over the shared client.
+    :param url: The MongoDB url.
+    :param timeout: The maximum amount of seconds the check may take.
+    :return: A dict with:
+        * ok - True if the server answered.
+        * url - The url that was checked.
+        * latency - The amount of seconds the check took.
+        * error - A String with the error if the server did not answer, else None.
+    """
+    start = time.time()
+    error = None
+    try:
+        with pymongo.timeout(timeout):
+            get_client(url).admin.command("ping")
+    except PyMongoError as e:
+        error = str(e)
+    return {"ok": error is None, "url": url, "latency": time.time() - start, "error": error}
@@ -1,9 +1,10 @@
 import abc, sys
 
-from pymongo import MongoClient
-from pymongo.errors import ServerSelectionTimeoutError
+import pymongo
+from pymongo.errors import ConnectionFailure
 
 import p2000.utils
+from p2000.storage import clients
 
 
 class AbstractConnection:
@@ -18,20 +19,52 @@ class AbstractConnection:
     def establish(self, timeout=1):
         """
         Initialize the database.
+        The MongoClient is shared with every other connection to the same url, see `clients.get_client`,
+        and the collection is fetched from it when it is first used. Only the indexes are created here,
+        use `health()` to check if the server can be reached.
+        :param timeout: The maximum amount of seconds creating the indexes may take.
         :return: The current instance.
-        :raises [IOError, ServerSelectionError]: Raised when the connection to the db cant be made.
+        :raises IOError: Raised when the indexes cant be created because the server cant be reached.
         """
+        self.client = clients.get_client(self.mongo_url())
+        self.db = self.client[self.db_name()]
         try:
-            self.client = MongoClient(self.mongo_url(), serverSelectionTimeoutMS=timeout)
-            # Force Query to check connection, otherwise a bunch of weird formatting errors are raised.
-            self.client.server_info()
-            self.db = self.client[self.db_name()]
-            self.collection = self.db[self.collection_name()]
+            with pymongo.timeout(timeout):
+                self.ensure_indexes()
             return self  # To make a `Connection().establish()` call possible.
-        except ServerSelectionTimeoutError as error:
-            url = self.mongo_url
+        except ConnectionFailure as error:
+            self.client = self.db = self.collection = None
             message = "Could not connect to MongoDB @ '{0}'.\nOriginal error: '{1}'."
-            raise IOError(message.format(url, error.message))
+            raise IOError(message.format(self.mongo_url(), error))
+
+    def health(self, timeout=1):
+        """
+        Check if the server can be reached, see `clients.health`.
+        :param timeout: The maximum amount of seconds the check may take.
+        :return: A dict with "ok", "url", "latency" and "error".
+        """
+        return clients.health(self.mongo_url(), timeout)
+
+    @property
+    def collection(self):
+        """
+        The collection of this connection, fetched from the database when it is first used.
+        :return: A Collection, or None if the connection is not established.
+        """
+        if self.__collection is None and self.db is not None:
+            self.__collection = self.db[self.collection_name()]
+        return self.__collection
+
+    @collection.setter
+    def collection(self, collection):
+        self.__collection = collection
+
+    @property
+    def established(self):
+        """
+        :return: True if `establish()` was called successfully.
+        """
+        return self.collection is not None
 
     @abc.abstractmethod
     def mongo_url(self):
@@ -57,6 +90,26 @@ class AbstractConnection:
         """
         pass
 
+    def indexes(self):
+        """
+        The indexes the collection should have, they are created by `establish()`.
+        :return: A list of dicts, each with the "keys" as a list of (field, direction) tuples and
+            optionally any of the keyword arguments of `Collection.create_index`, ex. "name" or "unique".
+        """
+        return []
+
+    def ensure_indexes(self):
+        """
+        Create every index returned by `indexes()`, indexes that already exist are left alone.
+        :return: A list with the names of the indexes.
+        """
+        names = []
+        for index in self.indexes():
+            options = dict(index)
+            keys = options.pop("keys")
+            names.append(self.collection.create_index(keys, **options))
+        return names
+
     @property
     def config(self):
         """
@@ -91,4 +144,4 @@ class AbstractConnection:
         Destroy/ Drop the current database.
         :return: None
         """
-        self.client[self.collection_name].drop()
+        self.collection.drop()
@@ -0,0 +1,154 @@
+import abc
+import sqlite3
+import threading
+import time
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S.%f"
+
+
+class AbstractSQLiteConnection:
+    """
+    The base of the embedded SQLite backend, an alternative to MongoDB for machines that cannot spare the RAM
+    for mongod, ex. a Raspberry Pi next to the dongle. Mix it in front of a MongoDB Connection class to keep
+    its row conversion, and override the methods that touch the database.
+    The database file is config.json["database"]["sqlite"]["path"]. It is opened in WAL mode,
+    so reading never blocks the writer. Every statement is a constant String with parameters, and
+    sqlite3 keeps them prepared in its statement cache.
+    One sqlite3 connection is shared between threads, its use is serialized with a lock.
+    """
+    __metaclass__ = abc.ABCMeta
+
+    CACHED_STATEMENTS = 64
+
+    def __init__(self, path=None):
+        """
+        Create a new SQLite Connection.
+        :param path: The path to the database file, ":memory:" for a database that only lives in memory.
+            Default is config.json["database"]["sqlite"]["path"].
+        """
+        super(AbstractSQLiteConnection, self).__init__()
+        self.path = path
+        self.lock = threading.RLock()
+
+    @property
+    def established(self):
+        return self.db is not None
+
+    def establish(self, timeout=1):
+        """
+        Open the database file, and create the tables and indexes that do not exist yet.
+        :param timeout: The amount of seconds to wait for a lock held by another process.
+        :return: The current instance.
+        :raises IOError: Raised when the database file cant be opened.
+        """
+        path = self.path or self.config["database"]["sqlite"]["path"]
+        try:
+            db = sqlite3.connect(path, timeout=timeout, check_same_thread=False,
+                                 cached_statements=self.CACHED_STATEMENTS)
+            db.execute("PRAGMA journal_mode = WAL")
+            db.execute("PRAGMA synchronous = NORMAL")
+            db.execute("PRAGMA foreign_keys = ON")
+        except sqlite3.Error as error:
+            message = "Could not open SQLite database @ '{0}'.\nOriginal error: '{1}'."
+            raise IOError(message.format(path, error))
+        self.db = db
+        self.ensure_indexes()
+        return self
+
+    def health(self, timeout=1):
+        """
+        Check if the database file can be read, with a "SELECT 1" on the shared sqlite3 connection.
+        :param timeout: The maximum amount of seconds to wait for another thread that uses the connection.
+        :return: A dict with "ok", "url", "latency" and "error", like the MongoDB `health()`.
+            The url is the path to the database file.
+        """
+        start = time.time()
+        error = None
+        if not self.lock.acquire(timeout=timeout):
+            error = "The connection is in use for more than {0} seconds.".format(timeout)
+        else:
+            try:
+                if self.db is None:
+                    error = "The database is not opened, see establish()."
+                else:
+                    self.db.execute("SELECT 1").fetchone()
+            except sqlite3.Error as e:
+                error = str(e)
+            finally:
+                self.lock.release()
+        path = self.path or self.config["database"]["sqlite"]["path"]
+        return {"ok": error is None, "url": path, "latency": time.time() - start, "error": error}
+
+    @abc.abstractmethod
+    def schema(self):
+        """
+        The tables and indexes of the database, every statement has to be idempotent.
+        :return: A String with the SQL script.
+        """
+        pass
+
+    def ensure_indexes(self):
+        """
+        Run the `schema()` script, tables and indexes that already exist are left alone.
+        :return: A list with the names of the indexes.
+        """
+        with self.lock:
+            self.db.executescript(self.schema())
+        rows = self.query("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL ORDER BY name")
+        return [row[0] for row in rows]
+
+    def query(self, sql, params=()):
+        """
+        Run a SELECT statement.
+        :param sql: The statement.
+        :param params: The parameters of the statement.
+        :return: A List with a tuple for every row.
+        :raises IOError: Raised when the database cant be read, ex. because it is locked.
+        """
+        try:
+            with self.lock:
+                return self.db.execute(sql, params).fetchall()
+        except sqlite3.OperationalError as error:
+            raise IOError("Could not query SQLite database: '{0}'.".format(error))
+
+    def transaction(self, work):
+        """
+        Run the given callable in a single transaction, it is rolled back when the callable raises.
+        :param work: A callable that is called with the sqlite3 connection.
+        :return: The return value of the callable.
+        :raises IOError: Raised when the database cant be written, ex. because it is locked.
+        """
+        try:
+            with self.lock, self.db:
+                return work(self.db)
+        except sqlite3.OperationalError as error:
+            raise IOError("Could not write SQLite database: '{0}'.".format(error))
+
+    def close(self):
+        """
+        Close the database file.
+        :return: Nothing
+        """
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+    def drop_collection(self):
+        """
+        **WARNING, DATA CANNOT BE RECOVERED**
+        Delete every row of the tables of this connection.
+        :return: None
+        """
+        def drop(db):
+            for table in self.tables():
+                db.execute("DELETE FROM {0}".format(table))
+        self.transaction(drop)
+
+    @abc.abstractmethod
+    def tables(self):
+        """
+        The tables of this connection, children first.
+        :return: A list of table names.
+        """
+        pass
@@ -1,2 +1,6 @@
 from p2000.storage.units.database import Connection
-from p2000.storage.units.scraping import Scraper
+from p2000.storage.units.scraping import Scraper, scrape_all
+from p2000.storage.units.cache import UnitCache
+from p2000.storage.units.httpcache import PageCache
+from p2000.storage.units.sqlite import SQLiteConnection
+from p2000.storage.units.index import CapcodeIndex
@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import OrderedDict
+
+from p2000.utils import format_capcode
+
+
+class UnitCache:
+    """
+    An in-process cache that resolves the capcodes of decoded FLEX Lines to Units without a database round trip.
+    The cache works in one of two modes:
+        * Preloaded - `preload()` reads the whole units collection into a dict keyed by capcode.
+          Every capcode that is not in the dict is known to have no units, so a lookup never queries the database.
+        * LRU - Units are fetched with `Connection.find_units_many` on a miss and kept for `ttl` seconds,
+          capcodes without units are kept for `negative_ttl` seconds. The least recently used capcode
+          is evicted when more than `size` capcodes are cached.
+    Capcodes are cached by their 7 digit format, see `utils.format_capcode`.
+    The cache registers itself with the connection, and drops capcodes as soon as units for them are written.
+
+    :ivar hits: The amount of lookups that were answered from the cache.
+    :ivar misses: The amount of lookups that needed a database query.
+    :ivar evictions: The amount of capcodes that were evicted because the cache was full.
+    """
+
+    def __init__(self, connection, **kwargs):
+        """
+        Create a new UnitCache for the given connection.
+        :param connection: The established `units.Connection` to fetch units from.
+        :keyword size: The maximum amount of cached capcodes in LRU mode, default is 10000.
+        :keyword ttl: The amount of seconds found units are kept in LRU mode, default is 3600.
+        :keyword negative_ttl: The amount of seconds a capcode without units is kept in LRU mode, default is 300.
+        """
+        self.connection = connection
+        self.size = kwargs.get("size", 10000)
+        self.ttl = kwargs.get("ttl", 3600)
+        self.negative_ttl = kwargs.get("negative_ttl", 300)
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.complete = False
+        self.stale = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        connection.add_listener(self.invalidate)
+
+    @property
+    def stats(self):
+        """
+        The statistics of the cache.
+        :return: A dict with the hits, misses, evictions, hit_ratio and the amount of cached capcodes.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": float(self.hits) / lookups if lookups else 0.0,
+                "size": len(self.entries)
+            }
+
+    def preload(self):
+        """
+        Read the whole units collection into the cache, this switches the cache to preloaded mode.
+        :return: The current instance.
+        """
+        entries = OrderedDict()
+        for unit in self.connection.all_units():
+            entries.setdefault(format_capcode(unit.capcode), ([], None))[0].append(unit)
+        with self.lock:
+            self.entries = entries
+            self.stale = set()
+            self.complete = True
+        return self
+
+    def invalidate(self, capcodes=None):
+        """
+        Drop the given capcodes from the cache, they are fetched from the database on the next lookup.
+        :param capcodes: The capcodes to drop, default is every capcode. Dropping every capcode
+            switches the cache back to LRU mode.
+        :return: Nothing
+        """
+        with self.lock:
+            if capcodes is None:
+                self.entries = OrderedDict()
+                self.stale = set()
+                self.complete = False
+                return
+            for capcode in capcodes:
+                capcode = format_capcode(capcode)
+                self.entries.pop(capcode, None)
+                if self.complete:
+                    self.stale.add(capcode)
+
+    def find_units(self, capcode):
+        """
+        Find the units for the given capcode.
+        :param capcode: The capcode to find the units for, in any format `utils.format_capcode` accepts.
+        :return: A List of Unit objects, or an empty List if none were found.
+        """
+        return self.find_units_many([capcode])[format_capcode(capcode)]
+
+    def find_units_many(self, capcodes):
+        """
+        Find the units for many capcodes, the capcodes that are not cached are fetched with a single query.
+        :param capcodes: The capcodes to find the units for, in any format `utils.format_capcode` accepts.
+        :return: A Dict with a List of Unit objects for every capcode in the 7 digit format.
+        """
+        result = {}
+        missing = {}
+        now = time.time()
+        with self.lock:
+            for raw in capcodes:
+                capcode = format_capcode(raw)
+                if capcode in missing:
+                    missing[capcode].add(raw)
+                if capcode in result or capcode in missing:
+                    continue
+                units = self.__lookup__(capcode, now)
+                if units is None:
+                    self.misses += 1
+                    missing[capcode] = {capcode, capcode.lstrip("0"), raw}
+                else:
+                    self.hits += 1
+                    result[capcode] = units
+        if missing:
+            # Units may be stored with a capcode in another format, query the capcodes as given and without
+            # leading zeros as well, and group what is found by the 7 digit format like `preload()` does.
+            found = self.connection.find_units_many(set(raw for raws in missing.values() for raw in raws))
+            grouped = {}
+            for unit in (unit for units in found.values() for unit in units):
+                grouped.setdefault(format_capcode(unit.capcode), []).append(unit)
+            with self.lock:
+                for capcode in missing:
+                    result[capcode] = grouped.get(capcode, [])
+                    self.__store__(capcode, result[capcode], now)
+        return result
+
+    def __lookup__(self, capcode, now):
+        """
+        Look the given capcode up in the cache, the lock has to be held.
+        :return: A List of Unit objects, or None if the capcode has to be fetched.
+        """
+        entry = self.entries.get(capcode)
+        if entry is not None:
+            units, expires = entry
+            if expires is None or expires > now:
+                self.entries.move_to_end(capcode)
+                return units
+            del self.entries[capcode]
+        elif self.complete and capcode not in self.stale:
+            return []
+        return None
+
+    def __store__(self, capcode, units, now):
+        self.stale.discard(capcode)
+        if self.complete:
+            if units:
+                self.entries[capcode] = (units, None)
+            return
+        self.entries[capcode] = (units, now + (self.ttl if units else self.negative_ttl))
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def enrich(self, line):
+        """
+        Resolve the units for every capcode of the given FLEX Line object.
+        :param line: The FLEX Line object to enrich.
+        :return: The same line, with `line.units` set to a list of the resolved Unit objects.
+        """
+        found = self.find_units_many(line.capcodes)
+        line.units = [unit for capcode in line.capcodes for unit in found[format_capcode(capcode)]]
+        return line
+
+    def enrich_many(self, lines):
+        """
+        Resolve the units for every capcode of the given FLEX Line objects.
+        :param lines: An iterable of FLEX Line objects.
+        :return: A list with the enriched lines.
+        """
+        return [self.enrich(line) for line in lines]
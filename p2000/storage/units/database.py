@@ -1,13 +1,18 @@
+from pymongo import UpdateOne, DeleteMany, ASCENDING, TEXT
+
 from p2000 import Unit, Region, Discipline
 from p2000.storage.database import AbstractConnection
 
 
 class Connection(AbstractConnection):
     """
-    This class is responsible for writing the database to and from a SQLite database.
-    The details of the database are in the config.json.
+    This class is responsible for writing the database to and from a MongoDB database.
+    The details of the database are in the config.json, see `units.SQLiteConnection` for an embedded alternative.
     """
 
+    KEY_FIELDS = ("capcode", "region", "discipline")
+    PROJECTION = {"capcode": 1, "region": 1, "town": 1, "function": 1, "discipline": 1, "_id": 0}
+
     def __init__(self):
         """
         Created a new Singleton Database to  write and read from.
@@ -15,6 +20,36 @@ class Connection(AbstractConnection):
         and config.json["database"]["url"]
         """
         super(Connection, self).__init__()
+        self.listeners = []
+
+    def add_listener(self, listener):
+        """
+        Register a callable that is called with a list of capcodes after units with those capcodes were written.
+        Used by `UnitCache` to invalidate cached units.
+        :param listener: The callable to register.
+        :return: Nothing
+        """
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """
+        Unregister a callable that was registered with `add_listener`.
+        :param listener: The callable to unregister.
+        :return: Nothing
+        """
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def __notify__(self, capcodes):
+        for listener in self.listeners:
+            listener(capcodes)
+
+    def indexes(self):
+        return [
+            {"keys": [("capcode", ASCENDING)], "name": "capcode"},
+            {"keys": [("region", ASCENDING), ("discipline", ASCENDING)], "name": "region_discipline"},
+            {"keys": [("town", TEXT), ("function", TEXT)], "name": "town_function_text"}
+        ]
 
     def mongo_url(self):
         return self.config["database"]["url"]
@@ -60,6 +95,7 @@ class Connection(AbstractConnection):
         """
         rows = [self.object_to_row(u) for u in units]
         self.collection.insert_many(rows)
+        self.__notify__([row["capcode"] for row in rows])
 
     def write_unit(self, unit):
         """
@@ -70,14 +106,130 @@ class Connection(AbstractConnection):
         """
         row = self.object_to_row(unit)
         self.collection.insert_one(row)
+        self.__notify__([row["capcode"]])
+
+    def sync_units(self, units, region=None, batch_size=1000):
+        """
+        Make the collection match the given units for the scraped scope, with as few writes as possible.
+        Rows are keyed on capcode, region and discipline:
+            * Units without a row are upserted.
+            * Rows of which the town or function differs are updated.
+            * Rows that are equal to their unit are not written at all.
+            * Rows in the scope that have no unit, or that duplicate another row, are deleted.
+        The writes are sent as unordered bulk writes of at most `batch_size` operations.
+        :param units: The scraped Unit objects.
+        :param region: The Region that was scraped, its rows are the scope. Default is every
+            region/discipline combination that occurs in the units.
+        :param batch_size: The maximum amount of operations per bulk write, default is 1000.
+        :return: A dict with the amount of units that were "inserted", "updated", "unchanged" and "deleted".
+        :raises TypeError: Raised when any of the units is not a Unit object.
+        """
+        rows = self.__rows_by_key__(units)
+        if region is not None:
+            scope = {"region": region.value["id"]}
+        elif rows:
+            pairs = sorted(set((key[1], key[2]) for key in rows))
+            scope = {"$or": [{"region": r, "discipline": d} for r, d in pairs]}
+        else:
+            return self.__diff__(rows, [])[0]
+        counts, inserts, updates, stale = self.__diff__(rows, self.collection.find(scope))
+
+        operations = [UpdateOne(dict(zip(self.KEY_FIELDS, self.__key__(row))), {"$set": row}, upsert=True)
+                      for row in inserts]
+        operations += [UpdateOne({"_id": doc["_id"]}, {"$set": row}) for doc, row in updates]
+        for start in range(0, len(stale), batch_size):
+            ids = [doc["_id"] for doc in stale[start:start + batch_size]]
+            operations.append(DeleteMany({"_id": {"$in": ids}}))
+
+        for start in range(0, len(operations), batch_size):
+            self.collection.bulk_write(operations[start:start + batch_size], ordered=False)
+        self.__notify_synced__(inserts, updates, stale)
+        return counts
+
+    def __rows_by_key__(self, units):
+        """
+        Convert the given units to rows, keyed on `KEY_FIELDS`. The last unit with a key wins.
+        :raises TypeError: Raised when any of the units is not a Unit object.
+        """
+        rows = {}
+        for unit in units:
+            row = self.object_to_row(unit)
+            rows[self.__key__(row)] = row
+        return rows
+
+    def __diff__(self, rows, docs):
+        """
+        Compare the wanted rows with the existing rows in the scope of a sync, see `sync_units`.
+        :param rows: The wanted rows, keyed on `KEY_FIELDS`.
+        :param docs: The existing rows in the scope, each with an "_id".
+        :return: A tuple with the counts dict, the rows to insert, the (doc, row) tuples to update and the
+            docs to delete.
+        """
+        existing = {}
+        stale = []
+        for doc in docs:
+            key = self.__key__(doc)
+            if key in rows and key not in existing:
+                existing[key] = doc
+            else:
+                stale.append(doc)
+        inserts = []
+        updates = []
+        for key, row in rows.items():
+            doc = existing.get(key)
+            if doc is None:
+                inserts.append(row)
+            elif any(doc.get(field) != value for field, value in row.items()):
+                updates.append((doc, row))
+        counts = {
+            "inserted": len(inserts),
+            "updated": len(updates),
+            "unchanged": len(existing) - len(updates),
+            "deleted": len(stale)
+        }
+        return counts, inserts, updates, stale
+
+    def __notify_synced__(self, inserts, updates, stale):
+        changed = [row["capcode"] for row in inserts]
+        changed += [row["capcode"] for _, row in updates]
+        changed += [doc["capcode"] for doc in stale]
+        if changed:
+            self.__notify__(changed)
+
+    def __key__(self, row):
+        return tuple(row.get(field) for field in self.KEY_FIELDS)
 
     def find_units(self, capcode, limit=None):
         """
         Search the database for any database matching the given capcode.
+        The limit is applied by MongoDB, only the fields of a Unit are fetched.
         :param capcode: The capcode to search the database for.
         :param limit: The maximum amount of result to fetch, default is unlimited.
         :return: A List of Unit objects, or an empty List if none were found.
         """
+        if limit is not None and limit <= 0:
+            return []  # MongoDB reads a limit of 0 as no limit.
         params = {"capcode": capcode}
-        units = [self.row_to_object(row) for row in self.collection.find(params)]
-        return units[:limit]
+        options = {} if limit is None else {"limit": limit}
+        return [self.row_to_object(row) for row in self.collection.find(params, self.PROJECTION, **options)]
+
+    def all_units(self):
+        """
+        Fetch every unit in the database, used by `UnitCache.preload`.
+        :return: A List of Unit objects.
+        """
+        return [self.row_to_object(row) for row in self.collection.find({}, self.PROJECTION)]
+
+    def find_units_many(self, capcodes):
+        """
+        Search the database for the units of many capcodes at once, with a single query.
+        Useful to resolve every capcode of a multi-capcode alarm.
+        :param capcodes: The capcodes to search the database for.
+        :return: A Dict with a List of Unit objects for every given capcode, the List is empty if none were found.
+        """
+        capcodes = list(capcodes)
+        result = dict((capcode, []) for capcode in capcodes)
+        if capcodes:
+            for row in self.collection.find({"capcode": {"$in": capcodes}}, self.PROJECTION):
+                result[row["capcode"]].append(self.row_to_object(row))
+        return result
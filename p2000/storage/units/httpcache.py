@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import tempfile
+
+
+class PageCache:
+    """
+    An on-disk cache for the pages fetched by the Scraper, so a rescrape only downloads and parses changed pages.
+    Every url is stored in its own JSON file with the body, the ETag and Last-Modified headers,
+    a hash of the body and the data that was extracted from the body.
+    Files are replaced atomically, so the cache can be shared by the threads of `scrape_all`.
+    """
+
+    def __init__(self, directory):
+        """
+        Create a new PageCache in the given directory, the directory is created if it does not exist.
+        :param directory: The directory to store the pages in.
+        """
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    @staticmethod
+    def hash(body):
+        """
+        Hash the given page body.
+        :param body: The body as a String.
+        :return: The hex digest of the body.
+        """
+        return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+    def path(self, url):
+        """
+        :param url: The url of the page.
+        :return: The path of the file the page is stored in.
+        """
+        return os.path.join(self.directory, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url):
+        """
+        Get the stored entry for the given url.
+        :param url: The url of the page.
+        :return: A dict with the keys url, body, etag, last_modified, hash and extract, or None if not stored.
+        """
+        try:
+            with open(self.path(url)) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def headers(self, url):
+        """
+        Create the conditional request headers for the given url.
+        :param url: The url of the page.
+        :return: A dict with If-None-Match and/or If-Modified-Since, empty if the page is not stored.
+        """
+        entry = self.get(url)
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, body, etag=None, last_modified=None):
+        """
+        Store a freshly downloaded page.
+        The extracted data of the previous version is kept when the body did not change.
+        :param url: The url of the page.
+        :param body: The body as a String.
+        :param etag: The ETag header of the response.
+        :param last_modified: The Last-Modified header of the response.
+        :return: True if the body differs from the stored body, else False.
+        """
+        entry = self.get(url)
+        digest = self.hash(body)
+        changed = entry is None or entry.get("hash") != digest
+        self.__write__(url, {
+            "url": url,
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "hash": digest,
+            "extract": None if changed else entry.get("extract")
+        })
+        return changed
+
+    def get_extract(self, url, digest):
+        """
+        Get the data that was extracted from the page with the given hash.
+        :param url: The url of the page.
+        :param digest: The hash of the body the data should have been extracted from.
+        :return: The extracted data, or None if nothing was extracted from that body.
+        """
+        entry = self.get(url)
+        if entry is None or entry.get("hash") != digest:
+            return None
+        return entry.get("extract")
+
+    def put_extract(self, url, digest, extract):
+        """
+        Store the data that was extracted from the page with the given hash.
+        :param url: The url of the page.
+        :param digest: The hash of the body the data was extracted from.
+        :param extract: Any JSON serializable data.
+        :return: Nothing
+        """
+        entry = self.get(url)
+        if entry is not None and entry.get("hash") == digest:
+            entry["extract"] = extract
+            self.__write__(url, entry)
+
+    def __write__(self, url, entry):
+        fd, temp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entry, f)
+            os.replace(temp, self.path(url))
+        except BaseException:
+            if os.path.exists(temp):
+                os.remove(temp)
+            raise
@@ -0,0 +1,192 @@
+import threading
+from bisect import bisect_right, insort
+from collections import Counter
+
+from p2000 import Region, Discipline
+from p2000.utils import format_capcode
+
+UNKNOWN = (Region.UNKNOWN, Discipline.UNKNOWN)
+
+
+class CapcodeIndex:
+    """
+    Guess the Region and Discipline of any capcode, also of capcodes that are not in the units collection,
+    from the capcodes around it. Capcodes are handed out in blocks, so the neighbours of a capcode usually
+    belong to the same region and discipline.
+    The index is kept in memory and answers without a database query:
+        * Ranges - The sorted known capcodes are merged into ranges of consecutive capcodes with the same
+          region and discipline, a capcode within a range gets its label, found with bisect.
+        * Prefixes - A capcode between ranges gets the label of the longest prefix of which at least
+          `purity` of the known capcodes have the same label.
+    Capcodes without a range or a prefix are guessed as (Region.UNKNOWN, Discipline.UNKNOWN).
+    The index registers itself with the connection, written capcodes are fetched again and the ranges
+    are rebuilt on the next guess, so a scrape does not require a full `build()`.
+
+    :ivar labels: A dict with the (Region, Discipline) of every known capcode, as an int.
+    """
+
+    def __init__(self, connection, **kwargs):
+        """
+        Create a new CapcodeIndex for the given connection.
+        :param connection: The established `units.Connection` to read units from.
+        :keyword prefixes: The prefix lengths to guess with, longest first, default is (5, 4, 3, 2).
+        :keyword purity: The minimum share of the capcodes with a prefix that need the same label
+            for the prefix to be used, default is 0.75.
+        """
+        self.connection = connection
+        self.prefixes = tuple(sorted(kwargs.get("prefixes", (5, 4, 3, 2)), reverse=True))
+        self.purity = kwargs.get("purity", 0.75)
+        self.lock = threading.Lock()
+        self.labels = {}
+        self.capcodes = []
+        self.counts = {}
+        self.starts = []
+        self.ranges = []
+        self.best = {}
+        self.dirty = False
+        connection.add_listener(self.update)
+
+    @property
+    def stats(self):
+        """
+        :return: A dict with the amount of known capcodes, ranges and prefixes.
+        """
+        with self.lock:
+            self.__refresh__()
+            return {"capcodes": len(self.labels), "ranges": len(self.ranges), "prefixes": len(self.best)}
+
+    def build(self):
+        """
+        Build the index from the whole units collection.
+        :return: The current instance.
+        """
+        units = self.__group__(self.connection.all_units())
+        with self.lock:
+            self.labels = {}
+            self.capcodes = []
+            self.counts = {}
+            for capcode, found in units.items():
+                self.__set__(capcode, found)
+            self.dirty = True
+        return self
+
+    def update(self, capcodes):
+        """
+        Fetch the units of the given capcodes again, and update their labels.
+        Called by the connection after units were written.
+        :param capcodes: The capcodes that changed.
+        :return: Nothing
+        """
+        capcodes = set(capcodes)
+        # The capcodes are stored as scraped, they are looked up as given and as 7 digits, then grouped like build().
+        found = self.connection.find_units_many(capcodes | set(format_capcode(c) for c in capcodes))
+        units = self.__group__(unit for found_units in found.values() for unit in found_units)
+        with self.lock:
+            for capcode in set(format_capcode(c) for c in capcodes):
+                self.__set__(capcode, units.get(capcode, []))
+            self.dirty = True
+
+    def guess(self, capcode):
+        """
+        Guess the Region and Discipline of the given capcode.
+        :param capcode: The capcode, in any format `utils.format_capcode` accepts.
+        :return: A (Region, Discipline) tuple.
+        """
+        with self.lock:
+            self.__refresh__()
+            return self.__guess__(format_capcode(capcode))
+
+    def guess_many(self, capcodes):
+        """
+        Guess the Region and Discipline of many capcodes, ex. every capcode of a FLEX Line.
+        :param capcodes: The capcodes, in any format `utils.format_capcode` accepts.
+        :return: A Dict with a (Region, Discipline) tuple for every capcode in the 7 digit format.
+        """
+        with self.lock:
+            self.__refresh__()
+            return dict((c, self.__guess__(c)) for c in (format_capcode(c) for c in capcodes))
+
+    @staticmethod
+    def __group__(units):
+        """
+        Group units by their capcode in the 7 digit format, the format the index is keyed on.
+        :param units: An iterable of Unit objects.
+        :return: A Dict with a List of Unit objects for every capcode.
+        """
+        grouped = {}
+        for unit in units:
+            grouped.setdefault(format_capcode(unit.capcode), []).append(unit)
+        return grouped
+
+    def __guess__(self, capcode):
+        """
+        Guess the label of a 7 digit capcode, the lock has to be held and the ranges have to be fresh.
+        """
+        try:
+            number = int(capcode)
+        except ValueError:
+            return UNKNOWN
+        index = bisect_right(self.starts, number) - 1
+        if index >= 0:
+            end, label = self.ranges[index]
+            if number <= end:
+                return label
+        for length in self.prefixes:
+            label = self.best.get(capcode[:length])
+            if label is not None:
+                return label
+        return UNKNOWN
+
+    def __set__(self, capcode, units):
+        """
+        Set the label of a capcode to the most common (Region, Discipline) of its units, or remove it when it
+        has no units. The prefix counts are updated along, the lock has to be held.
+        """
+        try:
+            number = int(capcode)
+        except ValueError:
+            return
+        old = self.labels.pop(number, None)
+        if old is not None:
+            self.__count__(capcode, old, -1)
+        if units:
+            label = Counter((u.region, u.discipline) for u in units).most_common(1)[0][0]
+            self.labels[number] = label
+            self.__count__(capcode, label, 1)
+            if old is None:
+                insort(self.capcodes, number)
+        elif old is not None:
+            self.capcodes.pop(bisect_right(self.capcodes, number) - 1)
+
+    def __count__(self, capcode, label, amount):
+        for length in self.prefixes:
+            counts = self.counts.setdefault(capcode[:length], Counter())
+            counts[label] += amount
+            if counts[label] <= 0:
+                del counts[label]
+
+    def __refresh__(self):
+        """
+        Rebuild the ranges and the prefix labels when capcodes changed, the lock has to be held.
+        """
+        if not self.dirty:
+            return
+        starts = []
+        ranges = []
+        for number in self.capcodes:
+            label = self.labels[number]
+            if ranges and ranges[-1][1] == label:
+                ranges[-1][0] = number
+            else:
+                starts.append(number)
+                ranges.append([number, label])
+        best = {}
+        for prefix, counts in self.counts.items():
+            if counts:
+                label, count = counts.most_common(1)[0]
+                if label != UNKNOWN and count >= self.purity * sum(counts.values()):
+                    best[prefix] = label
+        self.starts = starts
+        self.ranges = [tuple(r) for r in ranges]
+        self.best = best
+        self.dirty = False
@@ -0,0 +1,179 @@
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    STRAINER_FEATURES = "lxml"
+except ImportError:
+    STRAINER_FEATURES = "html.parser"
+
+TABLE_CLASS = "jw-table jw-table--header jw-table--striped"
+LINK_CLASS = "jw-section-menu-list-item"
+
+
+class SoupParser:
+    """
+    Extract the discipline links and the units table by building a BeautifulSoup tree of the whole page.
+    Every backend returns the same data as this one.
+    """
+
+    def links(self, landing):
+        """
+        Extract the sidebar links to various disciplines from the given landing page.
+        :param landing: The html of the landing page.
+        :return: A list with a [title, href] list for every link.
+        """
+        html = BeautifulSoup(landing, "html.parser")
+        return [[item.getText(), item["href"]] for item in html.find_all("a", {"class": LINK_CLASS})]
+
+    def rows(self, page):
+        """
+        Extract the rows of the body of the units table of the given discipline page.
+        :param page: The html of the discipline page.
+        :return: A list with a list of the cell texts for every row, ex. [capcode, town, function].
+        :raises ValueError: When the page has no units table.
+        """
+        return self.__table_rows__(BeautifulSoup(page, "html.parser"))
+
+    @staticmethod
+    def __table_rows__(html):
+        table = html.find("table", {"class": TABLE_CLASS})
+        body = table.find("tbody") if table is not None else None
+        if body is None:
+            raise ValueError("The page has no units table.")
+        return [[td.getText() for td in row.find_all("td")] for row in body.find_all("tr")]
+
+
+class StrainerParser(SoupParser):
+    """
+    Like the SoupParser, but only the links or the units table are turned into a tree, using a SoupStrainer.
+    lxml is used when it is installed, otherwise html.parser.
+    """
+
+    def links(self, landing):
+        strainer = SoupStrainer("a", {"class": LINK_CLASS})
+        html = BeautifulSoup(landing, STRAINER_FEATURES, parse_only=strainer)
+        return [[item.getText(), item["href"]] for item in html.find_all("a", {"class": LINK_CLASS})]
+
+    def rows(self, page):
+        strainer = SoupStrainer("table", {"class": TABLE_CLASS})
+        return self.__table_rows__(BeautifulSoup(page, STRAINER_FEATURES, parse_only=strainer))
+
+
+class TableExtractor(HTMLParser):
+    """
+    A streaming HTMLParser that only keeps the text of the cells of the units table, and the discipline links.
+    Parsing stops as soon as the units table is closed.
+    """
+
+    def __init__(self):
+        HTMLParser.__init__(self, convert_charrefs=True)
+        self.rows = []
+        self.links = []
+        self.found = False
+        self.done = False
+        self.depth = 0  # The depth of nested tables within the units table.
+        self.body = False
+        self.cell = None
+        self.link = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "table":
+            if self.depth > 0:
+                self.depth += 1
+            elif dict(attrs).get("class") == TABLE_CLASS and not self.done:
+                self.found = True
+                self.depth = 1
+        elif self.depth > 0:
+            if tag == "tbody":
+                self.body = True
+            elif self.body and tag == "tr":
+                self.rows.append([])
+            elif self.body and tag == "td" and self.rows:
+                self.cell = []
+                self.rows[-1].append(self.cell)
+        elif tag == "a":
+            attrs = dict(attrs)
+            if LINK_CLASS in (attrs.get("class") or "").split():
+                self.link = [[], attrs.get("href")]
+                self.links.append(self.link)
+
+    def handle_endtag(self, tag):
+        if tag == "table" and self.depth > 0:
+            self.depth -= 1
+            if self.depth == 0:
+                self.done = True
+                self.body = False
+        elif tag == "tbody" and self.depth == 1:
+            self.body = False
+        elif tag == "td":
+            self.cell = None
+        elif tag == "a":
+            self.link = None
+
+    def handle_data(self, data):
+        if self.depth > 0 and self.cell is not None:
+            self.cell.append(data)
+        elif self.link is not None:
+            self.link[0].append(data)
+
+
+class StreamParser:
+    """
+    Extract the discipline links and the units table with a streaming `html.parser.HTMLParser`,
+    only the cells of the units table are materialised. The page is fed in chunks and parsing stops
+    as soon as the units table is closed.
+    """
+
+    CHUNK_SIZE = 16384
+
+    def links(self, landing):
+        """
+        Extract the sidebar links to various disciplines from the given landing page.
+        :param landing: The html of the landing page.
+        :return: A list with a [title, href] list for every link.
+        """
+        extractor = TableExtractor()
+        extractor.feed(landing)
+        extractor.close()
+        return [["".join(text), href] for text, href in extractor.links]
+
+    def rows(self, page):
+        """
+        Extract the rows of the body of the units table of the given discipline page.
+        :param page: The html of the discipline page.
+        :return: A list with a list of the cell texts for every row, ex. [capcode, town, function].
+        :raises ValueError: When the page has no units table.
+        """
+        extractor = TableExtractor()
+        for start in range(0, len(page), self.CHUNK_SIZE):
+            extractor.feed(page[start:start + self.CHUNK_SIZE])
+            if extractor.done:
+                break
+        else:
+            extractor.close()
+        if not extractor.found:
+            raise ValueError("The page has no units table.")
+        return [["".join(cell) for cell in row] for row in extractor.rows]
+
+
+PARSERS = {
+    "soup": SoupParser,
+    "strainer": StrainerParser,
+    "stream": StreamParser
+}
+
+
+def get_parser(parser):
+    """
+    Get a parser backend.
+    :param parser: The name of a backend in PARSERS, or a backend instance that is returned as is.
+    :return: A parser backend instance.
+    :raises ValueError: When the name is not in PARSERS.
+    """
+    if not isinstance(parser, str):
+        return parser
+    if parser not in PARSERS:
+        raise ValueError("Unknown parser '{0}', choose from {1}.".format(parser, sorted(PARSERS)))
+    return PARSERS[parser]()
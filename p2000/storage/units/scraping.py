@@ -1,35 +1,168 @@
-from requests import get
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+
+from requests import Session
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException
 from contextlib import closing
-from bs4 import BeautifulSoup
 
-from p2000 import Discipline
+from p2000 import Discipline, Region
 from p2000 import Unit
+from p2000.storage.units.parsing import get_parser
+
+
+def create_session(pool_size=10):
+    """
+    Create a requests Session that keeps connections alive and can be shared between threads.
+    :param pool_size: The maximum amount of connections kept open per host, default is 10.
+    :return: A new requests Session.
+    """
+    session = Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class RateLimiter:
+    """
+    Spread the requests to a single host over time, the limiter is safe to share between threads.
+    """
+
+    def __init__(self, rate=None):
+        """
+        Create a new RateLimiter.
+        :param rate: The maximum amount of requests per second per host, default is no limit.
+        """
+        self.interval = 1.0 / rate if rate else 0.0
+        self.lock = threading.Lock()
+        self.slots = {}
+
+    def wait(self, url):
+        """
+        Block until a request to the host of the given url is allowed.
+        :param url: The url that is about to be requested.
+        :return: Nothing
+        """
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.slots.get(host, 0.0))
+            self.slots[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
 
 
 # noinspection PyMethodMayBeStatic
 class Scraper:
     BASE_URL = "https://www.tomzulu10capcodes.nl"
     REGIONS_URL = "https://www.tomzulu10capcodes.nl/capcodes-per-regio/"
+    RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
 
-    def __init__(self, region):
+    def __init__(self, region, **kwargs):
+        """
+        Create a new Scraper for the given region.
+        :param region: The Region to scrape.
+        :keyword session: The requests Session to fetch the pages with, default is a new session.
+        :keyword limiter: The RateLimiter to pass every request through, default is no limit.
+        :keyword retries: The amount of times a failed request is retried, default is 3.
+        :keyword backoff: The amount of seconds to wait before the first retry, doubled on every retry, default is 0.5.
+        :keyword timeout: The amount of seconds to wait for a response, default is 30.
+        :keyword base_url: The url to use instead of BASE_URL, REGIONS_URL is derived from it.
+        :keyword cache: The PageCache to make conditional requests with, default is no cache.
+        :keyword parser: The parser backend to extract the links and units with, one of `parsing.PARSERS`
+            or a backend instance, default is "stream".
+        """
         self.region = region
+        self.parser = get_parser(kwargs.get("parser", "stream"))
+        self.cache = kwargs.get("cache")
+        self.digests = {}
+        self.changed = {}
+        self.session = kwargs.get("session") or create_session()
+        self.limiter = kwargs.get("limiter") or RateLimiter()
+        self.retries = kwargs.get("retries", 3)
+        self.backoff = kwargs.get("backoff", 0.5)
+        self.timeout = kwargs.get("timeout", 30)
+        base_url = kwargs.get("base_url")
+        if base_url is not None:
+            self.BASE_URL = base_url
+            self.REGIONS_URL = base_url + "/capcodes-per-regio/"
 
     def get_page(self, url):
         """
         Try to fetch the page that is at the given url.
+        Connection errors and the status codes in RETRY_STATUS_CODES are retried with an exponential backoff.
+        With a cache the request is conditional, a 304 response returns the cached page.
+        Whether the page changed since it was cached is recorded in `self.changed`.
         :param url: The url where the page is located.
         :return: The html of the page a String, or None is the response was not valid.
         :raises IOError: When the application encounters an error fetching the page.
         """
-        try:
-            with closing(get(url, stream=True)) as response:
-                if self.__is_valid_response__(response):
-                    return response.content.decode("utf-8")
-                else:
-                    return None
-        except RequestException as error:
-            raise IOError("Error during request to {0} : {1}".format(url, error))
+        headers = self.cache.headers(url) if self.cache is not None else {}
+        attempt = 0
+        while True:
+            self.limiter.wait(url)
+            try:
+                with closing(self.session.get(url, headers=headers, stream=True, timeout=self.timeout)) as response:
+                    if response.status_code not in self.RETRY_STATUS_CODES or attempt >= self.retries:
+                        return self.__read_response__(url, response)
+            except RequestException as error:
+                if attempt >= self.retries:
+                    raise IOError("Error during request to {0} : {1}".format(url, error))
+            time.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
+
+    def __read_response__(self, url, response):
+        """
+        Read the page from the given response, and store it in the cache if there is one.
+        :param url: The url of the page.
+        :param response: The response to read.
+        :return: The html of the page a String, or None is the response was not valid.
+        """
+        if response.status_code == 304 and self.cache is not None:
+            entry = self.cache.get(url)
+            if entry is not None:
+                self.digests[url] = entry["hash"]
+                self.changed[url] = False
+                return entry["body"]
+        if not self.__is_valid_response__(response):
+            return None
+        body = response.content.decode("utf-8")
+        if self.cache is not None:
+            self.changed[url] = self.cache.put(
+                url, body, response.headers.get("ETag"), response.headers.get("Last-Modified")
+            )
+            self.digests[url] = self.cache.hash(body)
+        return body
+
+    def __extract__(self, url, page, parse):
+        """
+        Extract data from a page, a cached extract is used when the page did not change.
+        :param url: The url of the page.
+        :param page: The html of the page.
+        :param parse: The callable that extracts JSON serializable data from the html.
+        :return: The extracted data.
+        """
+        digest = self.digests.get(url) if self.cache is not None else None
+        if digest is None:
+            return parse(page)
+        extract = self.cache.get_extract(url, digest)
+        if extract is None:
+            extract = parse(page)
+            self.cache.put_extract(url, digest, extract)
+        return extract
+
+    def is_changed(self, discipline_link):
+        """
+        Check to see if the page of the given discipline link changed since it was cached.
+        :param discipline_link: The discipline link dict of a page that was fetched by this instance.
+        :return: True if the page changed, was not cached before or if there is no cache.
+        """
+        return self.changed.get(self.__create_dp_url__(discipline_link), True)
 
     def get_region_url(self):
         """
@@ -41,26 +174,32 @@ class Scraper:
 
     def __get_discipline_links__(self):
         """
-        Fetch the sidebar links to various disciplines from the given landing page.
-        :param landing: The html of the landing page, if no page is given it is fetched using `get_landing_page()`
+        Fetch the sidebar links to various disciplines from the landing page of the region.
         :return: A list with discipline link dicts, each with a discipline and a url.
         """
-        landing = self.get_page(self.get_region_url())
-        html = BeautifulSoup(landing, 'html.parser')
-        items = html.find_all("a", {"class": "jw-section-menu-list-item"})
+        url = self.get_region_url()
+        items = self.__extract__(url, self.get_page(url), self.__parse_discipline_links__)
         return [self.__create_dp_link__(item) for item in items]
 
+    def __parse_discipline_links__(self, landing):
+        """
+        Extract the sidebar links to various disciplines from the given landing page.
+        :param landing: The html of the landing page.
+        :return: A list with a [title, href] list for every link.
+        """
+        return self.parser.links(landing)
+
     def __create_dp_link__(self, item):
         """
         Create a new discipline link dict from the given item.
         The url value is used for fetching the discipline page.
         The correct Discipline is fetched using `Discipline.match()`
-        :param item: The item to turn into a discipline link dict.
+        :param item: The [title, href] list to turn into a discipline link dict.
         :return: A dict with the keys `discipline` and `url`
         """
         return {
-            "discipline": Discipline.match(item.getText()),
-            "url": item["href"]
+            "discipline": Discipline.match(item[0]),
+            "url": item[1]
         }
 
     def __create_dp_url__(self, discipline_link):
@@ -96,19 +235,23 @@ class Scraper:
         :param discipline_link: The link to fetch the page for and extract the database from.
         :return: A list of extracted Unit objects.
         """
-        page = self.get_page(self.__create_dp_url__(discipline_link))
-        html = BeautifulSoup(page, "html.parser")
-        table = html.find("table", {"class": "jw-table jw-table--header jw-table--striped"}).find("tbody")
-        result = []
-        for row in table.find_all("tr"):
-            values = [td.getText() for td in row.find_all("td")]
-            result.append(
-                Unit(
-                    capcode=values[0], town=values[1], function=values[2],
-                    region=self.region, discipline=discipline_link["discipline"]
-                )
+        url = self.__create_dp_url__(discipline_link)
+        rows = self.__extract__(url, self.get_page(url), self.__parse_rows__)
+        return [
+            Unit(
+                capcode=values[0], town=values[1], function=values[2],
+                region=self.region, discipline=discipline_link["discipline"]
             )
-        return result
+            for values in rows
+        ]
+
+    def __parse_rows__(self, page):
+        """
+        Extract the rows of the main table of the given discipline page.
+        :param page: The html of the discipline page.
+        :return: A list with a [capcode, town, function] list for every row.
+        """
+        return self.parser.rows(page)
 
     def __is_valid_response__(self, resp):
         """
@@ -120,3 +263,57 @@ class Scraper:
         return (resp.status_code == 200
                 and content_type is not None
                 and content_type.find('html') > -1)
+
+
+def scrape_all(regions=None, disciplines=None, max_workers=8, **kwargs):
+    """
+    Scrape the units of many regions at once.
+    The landing page of every region is fetched concurrently, each discipline page is fetched as soon as
+    the landing page it is linked from is parsed. Every Scraper shares one pooled session and one RateLimiter.
+    :param regions: The Regions to scrape, default is `Region.all()`.
+    :param disciplines: The Disciplines to scrape, default is every discipline that is linked.
+    :param max_workers: The maximum amount of pages that are fetched at the same time, default is 8.
+    :keyword rate: The maximum amount of requests per second per host, default is no limit.
+    :keyword session: The requests Session to share, default is a new session with a pool of max_workers.
+    :keyword retries: See `Scraper`.
+    :keyword backoff: See `Scraper`.
+    :keyword timeout: See `Scraper`.
+    :keyword base_url: See `Scraper`.
+    :keyword cache: The PageCache to share, see `Scraper`.
+    :keyword changed_only: Only yield the Units of discipline pages that changed since they were cached,
+        default is False.
+    :return: A generator that yields the Unit objects of each page as soon as that page is parsed.
+    :raises IOError: When a page could not be fetched after retrying.
+    """
+    regions = Region.all() if regions is None else regions
+    options = dict(kwargs)
+    options["session"] = kwargs.get("session") or create_session(max_workers)
+    options["limiter"] = RateLimiter(kwargs.get("rate"))
+    options.pop("rate", None)
+    changed_only = options.pop("changed_only", False)
+    scrapers = [Scraper(region, **options) for region in regions]
+
+    def fetch_links(scraper):
+        return scraper, scraper.__get_discipline_links__()
+
+    def fetch_units(scraper, link):
+        units = scraper.__get_units__(link)
+        return None, units if not changed_only or scraper.is_changed(link) else []
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        pending = set(executor.submit(fetch_links, scraper) for scraper in scrapers)
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    scraper, result = future.result()
+                    if scraper is None:
+                        for unit in result:
+                            yield unit
+                        continue
+                    for link in result:
+                        if disciplines is None or link["discipline"] in disciplines:
+                            pending.add(executor.submit(fetch_units, scraper, link))
+        finally:
+            for future in pending:
+                future.cancel()
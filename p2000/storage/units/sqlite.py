@@ -0,0 +1,102 @@
+import json
+
+from p2000.storage.sqlite import AbstractSQLiteConnection
+from p2000.storage.units.database import Connection
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    capcode TEXT NOT NULL,
+    region TEXT NOT NULL,
+    town TEXT,
+    function TEXT,
+    discipline TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS units_capcode ON units (capcode);
+CREATE INDEX IF NOT EXISTS units_region_discipline ON units (region, discipline);
+"""
+
+FIELDS = ("capcode", "region", "town", "function", "discipline")
+SELECT = "SELECT id, capcode, region, town, function, discipline FROM units"
+INSERT = "INSERT INTO units (capcode, region, town, function, discipline) VALUES (?, ?, ?, ?, ?)"
+UPDATE = "UPDATE units SET capcode = ?, region = ?, town = ?, function = ?, discipline = ? WHERE id = ?"
+DELETE = "DELETE FROM units WHERE id = ?"
+
+
+class SQLiteConnection(AbstractSQLiteConnection, Connection):
+    """
+    This class is responsible for writing the units to and from an embedded SQLite database,
+    with the same API as the MongoDB `units.Connection`. See `AbstractSQLiteConnection`.
+    """
+
+    def schema(self):
+        return SCHEMA
+
+    def tables(self):
+        return ["units"]
+
+    @staticmethod
+    def __values__(row):
+        return tuple(row[field] for field in FIELDS)
+
+    @staticmethod
+    def __row__(values):
+        """
+        Convert a selected row tuple to a row dict, with the id as "_id".
+        """
+        doc = dict(zip(FIELDS, values[1:]))
+        doc["_id"] = values[0]
+        return doc
+
+    def write_units(self, units):
+        rows = [self.object_to_row(u) for u in units]
+        self.transaction(lambda db: db.executemany(INSERT, [self.__values__(row) for row in rows]))
+        self.__notify__([row["capcode"] for row in rows])
+
+    def write_unit(self, unit):
+        self.write_units([unit])
+
+    def sync_units(self, units, region=None, batch_size=1000):
+        """
+        See `units.Connection.sync_units`, every write is done in a single transaction.
+        :param batch_size: Ignored, it is accepted for compatibility with `units.Connection`.
+        """
+        rows = self.__rows_by_key__(units)
+        if region is not None:
+            docs = self.query(SELECT + " WHERE region = ?", (region.value["id"],))
+        else:
+            docs = []
+            for r, d in sorted(set((key[1], key[2]) for key in rows)):
+                docs += self.query(SELECT + " WHERE region = ? AND discipline = ?", (r, d))
+        counts, inserts, updates, stale = self.__diff__(rows, [self.__row__(values) for values in docs])
+
+        def write(db):
+            db.executemany(INSERT, [self.__values__(row) for row in inserts])
+            db.executemany(UPDATE, [self.__values__(row) + (doc["_id"],) for doc, row in updates])
+            db.executemany(DELETE, [(doc["_id"],) for doc in stale])
+        if inserts or updates or stale:
+            self.transaction(write)
+        self.__notify_synced__(inserts, updates, stale)
+        return counts
+
+    def find_units(self, capcode, limit=None):
+        if limit is not None and limit <= 0:
+            return []  # SQLite reads a negative limit as no limit.
+        rows = self.query(SELECT + " WHERE capcode = ? ORDER BY id LIMIT ?", (capcode, -1 if limit is None else limit))
+        return [self.row_to_object(self.__row__(values)) for values in rows]
+
+    def all_units(self):
+        return [self.row_to_object(self.__row__(values)) for values in self.query(SELECT)]
+
+    def find_units_many(self, capcodes):
+        """
+        See `units.Connection.find_units_many`, the capcodes are passed as a single JSON array parameter,
+        so the statement is the same for any amount of capcodes.
+        """
+        capcodes = list(capcodes)
+        result = dict((capcode, []) for capcode in capcodes)
+        if capcodes:
+            sql = SELECT + " WHERE capcode IN (SELECT value FROM json_each(?)) ORDER BY id"
+            for values in self.query(sql, (json.dumps(capcodes),)):
+                result[values[1]].append(self.row_to_object(self.__row__(values)))
+        return result
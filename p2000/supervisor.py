@@ -0,0 +1,123 @@
+import os
+import select
+import threading
+import time
+
+from p2000.rtlsdr import Connection
+
+
+class SupervisedConnection(Connection):
+    """
+    A Connection that restarts rtl_fm and multimon-ng when either one exits or when no output was read
+    for `stall_timeout` seconds, ex. after a USB hiccup. The restarts happen behind `stdout`, which
+    keeps yielding lines, so the attached reader keeps its state and never has to be re-attached.
+    The first restart after a healthy run is immediate, the ones that follow wait `backoff` seconds,
+    doubled on every restart up to `max_backoff`. Only the processes started by this connection are terminated.
+
+    :ivar restarts: The amount of times the processes were restarted.
+    :ivar reason: The reason of the last restart, "exit" or "stall", None if the processes were never restarted.
+    """
+
+    CHUNK_SIZE = 65536
+
+    def __init__(self, metrics=None, **kwargs):
+        """
+        Create a new SupervisedConnection.
+        :param metrics: See `Connection`.
+        :keyword device: See `Connection`, as are frequency, ppm and gain.
+        :keyword stall_timeout: The amount of seconds without output after which the processes are restarted,
+            default is 300. None disables stall detection.
+        :keyword backoff: The amount of seconds to wait before the second restart in a row, default is 0.5.
+        :keyword max_backoff: The maximum amount of seconds to wait before a restart, default is 30.
+        :keyword healthy_after: The amount of seconds the processes have to run before the backoff is reset,
+            default is 60.
+        :keyword max_restarts: The maximum amount of restarts, after that stdout is exhausted.
+            Default is None, which restarts forever.
+        :keyword poll_interval: The amount of seconds between checks of the processes while there is no output,
+            default is 1.
+        """
+        super(SupervisedConnection, self).__init__(metrics, **kwargs)
+        self.stall_timeout = kwargs.get("stall_timeout", 300)
+        self.backoff = kwargs.get("backoff", 0.5)
+        self.max_backoff = kwargs.get("max_backoff", 30)
+        self.healthy_after = kwargs.get("healthy_after", 60)
+        self.max_restarts = kwargs.get("max_restarts")
+        self.poll_interval = kwargs.get("poll_interval", 1)
+        self.stopped = threading.Event()
+        self.restarts = 0
+        self.reason = None
+
+    def open(self, **kwargs):
+        """
+        Start rtl_fm and multimon-ng, and supervise them until the connection is killed.
+        :keyword kill: See `Connection.open`.
+        :return: Nothing
+        """
+        if kwargs.get("kill", False):
+            self.kill()
+        self.stopped.clear()
+        self.__spawn__()
+        self.stdout = self.__supervise__()
+
+    def kill(self):
+        """
+        Stop supervising, and terminate the processes started by this connection.
+        :return: Nothing
+        """
+        self.stopped.set()
+        super(SupervisedConnection, self).kill()
+
+    def __supervise__(self):
+        """
+        Yield the raw lines of multimon-ng, and restart the processes when they exit or stall.
+        :return: A generator with the raw lines, as bytes including the newline.
+        """
+        delay = 0.0
+        started = time.time()
+        while not self.stopped.is_set():
+            for line in self.__read__():
+                yield line
+            if self.stopped.is_set() or (self.max_restarts is not None and self.restarts >= self.max_restarts):
+                return
+            if time.time() - started >= self.healthy_after:
+                delay = 0.0
+            super(SupervisedConnection, self).kill()
+            if delay and self.stopped.wait(delay):
+                return
+            delay = min(max(delay * 2, self.backoff), self.max_backoff)
+            self.restarts += 1
+            if self.metrics is not None:
+                self.metrics.restarts.inc()
+            self.__spawn__()
+            started = time.time()
+
+    def __read__(self):
+        """
+        Yield the raw lines of the current multimon-ng process until it exits or stalls, `reason` is set to why.
+        The pipe is read without blocking for longer than `poll_interval`, so a stall is always noticed.
+        :return: A generator with the raw lines, as bytes including the newline.
+        """
+        fd = self.multi_process.stdout.fileno()
+        buffer = b""
+        last = time.time()
+        while not self.stopped.is_set():
+            try:
+                ready, _, _ = select.select([fd], [], [], self.poll_interval)
+                chunk = os.read(fd, self.CHUNK_SIZE) if ready else None
+            except (OSError, ValueError):
+                # The pipe was closed by kill() from another thread.
+                chunk = b""
+            if chunk is not None:
+                if not chunk:
+                    self.reason = "exit"
+                    break
+                last = time.time()
+                lines = (buffer + chunk).split(b"\n")
+                buffer = lines.pop()
+                for line in lines:
+                    yield line + b"\n"
+            elif self.stall_timeout is not None and time.time() - last >= self.stall_timeout:
+                self.reason = "stall"
+                break
+        if buffer:
+            yield buffer
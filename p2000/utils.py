@@ -4,17 +4,32 @@ import subprocess
 # "Program 'rtl-fm' not installed, see the Setup section in the README for more info."
 
 DEVNULL = open(os.devnull, 'w')
+CONFIG_PATH = './resources/config.json'
 
 
-def load_config():
+def load_config(path=CONFIG_PATH):
     """
     Load the config file as JSON.
+    :param path: The path to the config file, default is CONFIG_PATH.
     :return: The config file as JSON.
     """
-    with open('./resources/config.json') as f:
+    with open(path) as f:
         return json.load(f)
 
 
+def format_capcode(capcode):
+    """
+    Format a capcode the way the scraped units tables do, as 7 digits.
+    multimon-ng prints capcodes as 9 digits, ex. "001523172" is formatted as "1523172".
+    :param capcode: The capcode as a String or an int.
+    :return: The capcode as a 7 digit String, or the capcode unchanged if it is not a number.
+    """
+    try:
+        return str(int(capcode)).zfill(7)
+    except ValueError:
+        return capcode
+
+
 def is_rtlfm_installed():
     try:
         subprocess.call(["rtl_fm", "-h"], stdout=DEVNULL, stderr=subprocess.STDOUT, close_fds=True)
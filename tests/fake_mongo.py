@@ -0,0 +1,151 @@
+"""
+A small in-memory stand-in for a pymongo Collection, it supports just the queries and writes used by p2000.storage.
+"""
+import copy
+import itertools
+
+from pymongo import UpdateOne, UpdateMany, DeleteOne, DeleteMany, InsertOne
+from pymongo.errors import BulkWriteError
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, q) for q in condition):
+                return False
+            continue
+        value = doc.get(field)
+        if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+            for operator, operand in condition.items():
+                if operator == "$in":
+                    values = value if isinstance(value, list) else [value]
+                    if not any(v in operand for v in values):
+                        return False
+                if operator == "$gte" and not (value is not None and value >= operand):
+                    return False
+                if operator == "$gt" and not (value is not None and value > operand):
+                    return False
+                if operator == "$lte" and not (value is not None and value <= operand):
+                    return False
+                if operator == "$lt" and not (value is not None and value < operand):
+                    return False
+        elif isinstance(value, list) and not isinstance(condition, list):
+            if condition not in value:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.limited = None
+
+    def limit(self, limit):
+        self.limited = limit
+        self.docs = self.docs[:limit] if limit else self.docs
+        return self
+
+    def sort(self, field, direction=1):
+        self.docs = sorted(self.docs, key=lambda d: d.get(field), reverse=direction < 0)
+        return self
+
+    def __iter__(self):
+        return iter(self.docs)
+
+
+class FakeCollection:
+
+    def __init__(self):
+        self.rows = []
+        self.queries = 0
+        self.writes = 0
+        self.indexes = []
+        self.ids = itertools.count(1)
+
+    def find(self, query=None, projection=None, limit=0):
+        self.queries += 1
+        docs = [copy.deepcopy(r) for r in self.rows if matches(r, query or {})]
+        if projection:
+            keep = [k for k, v in projection.items() if v]
+            docs = [dict((k, d[k]) for k in keep + ["_id"] if k in d and projection.get(k, 1)) for d in docs]
+        return FakeCursor(docs).limit(limit)
+
+    def count_documents(self, query):
+        return len([r for r in self.rows if matches(r, query)])
+
+    def insert_one(self, row):
+        self.writes += 1
+        row.setdefault("_id", next(self.ids))
+        self.rows.append(copy.deepcopy(row))
+
+    def insert_many(self, rows, ordered=True):
+        self.writes += 1
+        ids = set(r["_id"] for r in self.rows)
+        errors = []
+        inserted = 0
+        for index, row in enumerate(rows):
+            row.setdefault("_id", next(self.ids))
+            if row["_id"] in ids:
+                errors.append({"index": index, "code": 11000, "errmsg": "E11000 duplicate key error"})
+                if ordered:
+                    break
+                continue
+            ids.add(row["_id"])
+            self.rows.append(copy.deepcopy(row))
+            inserted += 1
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": inserted})
+
+    def delete_many(self, query):
+        self.rows = [r for r in self.rows if not matches(r, query)]
+
+    def update(self, query, update, upsert, many):
+        found = [r for r in self.rows if matches(r, query)]
+        if not many:
+            found = found[:1]
+        if not found and upsert:
+            row = dict((k, v) for k, v in query.items() if not isinstance(v, dict) and not k.startswith("$"))
+            row["_id"] = next(self.ids)
+            self.rows.append(row)
+            found = [row]
+        for row in found:
+            for field, value in update.get("$set", {}).items():
+                parent, key = self.path(row, field)
+                parent[key] = value
+            for field, value in update.get("$inc", {}).items():
+                parent, key = self.path(row, field)
+                parent[key] = parent.get(key, 0) + value
+
+    @staticmethod
+    def path(row, field):
+        parts = field.split(".")
+        for part in parts[:-1]:
+            row = row.setdefault(part, {})
+        return row, parts[-1]
+
+    def update_one(self, query, update, upsert=False):
+        self.writes += 1
+        self.update(query, update, upsert, False)
+
+    def bulk_write(self, operations, ordered=True):
+        self.writes += 1
+        for op in operations:
+            if isinstance(op, InsertOne):
+                self.insert_many([op._doc])
+            elif isinstance(op, (UpdateOne, UpdateMany)):
+                self.update(op._filter, op._doc, op._upsert, isinstance(op, UpdateMany))
+            elif isinstance(op, DeleteOne):
+                found = [r for r in self.rows if matches(r, op._filter)][:1]
+                self.rows = [r for r in self.rows if r not in found]
+            elif isinstance(op, DeleteMany):
+                self.delete_many(op._filter)
+
+    def create_index(self, keys, **kwargs):
+        self.indexes.append((keys, kwargs))
+        return kwargs.get("name", str(keys))
+
+    def drop(self):
+        self.rows = []
@@ -0,0 +1,65 @@
+"""
+Fakes shared by the reader and storage tests: a connection that yields a list of raw lines, a reader that collects
+what act(line) receives and units and alarms Connections on top of FakeCollections.
+"""
+import threading
+
+from p2000.blacklist import Blacklist
+from p2000.rtlsdr import AbstractReader
+from p2000.storage.alarms import Connection as AlarmsConnection
+from p2000.storage.units import Connection as UnitsConnection
+from tests.fake_mongo import FakeCollection
+
+
+class FakeConnection:
+    """
+    A Connection with the given raw lines on stdout.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.stdout = None
+        self.metrics = None
+
+    def open(self, **kwargs):
+        self.stdout = iter(self.lines)
+
+    def kill(self):
+        self.stdout = None
+
+
+class CollectingReader(AbstractReader):
+    """
+    A reader that keeps every line act(line) is called with, the blacklist is empty unless one is given.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("blacklist", Blacklist(config={"rtlsdr": {"blacklist": {}}}, interval=None))
+        super(CollectingReader, self).__init__(**kwargs)
+        self.received = []
+        self.lock = threading.Lock()
+
+    def act(self, line):
+        with self.lock:
+            self.received.append(line)
+
+
+class FakeUnitsConnection(UnitsConnection):
+    """
+    A units Connection that reads and writes a FakeCollection.
+    """
+
+    def __init__(self):
+        super(FakeUnitsConnection, self).__init__()
+        self.collection = FakeCollection()
+
+
+class FakeAlarmsConnection(AlarmsConnection):
+    """
+    An alarms Connection that writes the alarms and rollups to FakeCollections.
+    """
+
+    def __init__(self):
+        super(FakeAlarmsConnection, self).__init__()
+        self.collection = FakeCollection()
+        self.rollups = FakeCollection()
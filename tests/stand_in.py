@@ -0,0 +1,91 @@
+"""
+A local HTTP stand-in for the capcode website, it serves the saved pages in tests/fixtures/scraping.
+Every region gets the same landing page, the discipline pages are served for every region as well.
+Responses carry an ETag, a request with a matching If-None-Match gets a 304.
+"""
+import hashlib
+import os
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "scraping")
+
+
+def fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        failures = self.server.failures.get(self.path, 0)
+        if failures > 0:
+            self.server.failures[self.path] = failures - 1
+            self.send_response(503)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            return
+        parts = self.path.strip("/").split("/")
+        if len(parts) == 2:
+            name = "landing.html"
+        elif len(parts) == 3:
+            name = parts[2].replace("capcodes-", "") + ".html"
+        else:
+            name = None
+        if self.path in self.server.overrides:
+            body = self.server.overrides[self.path]
+        elif name is not None and os.path.exists(os.path.join(FIXTURES, name)):
+            body = fixture(name)
+        else:
+            self.send_response(404)
+            self.send_header("Content-Type", "text/html")
+            self.end_headers()
+            return
+        etag = '"{0}"'.format(hashlib.sha1(body).hexdigest())
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StandIn:
+    """
+    Run the stand-in in a background thread, use as a context manager.
+
+    :ivar url: The base url of the stand-in, to pass to `Scraper(base_url=...)`.
+    :ivar requests: The paths of every received request.
+    :ivar failures: A dict of path to the amount of times that path should fail with a 503 first.
+    :ivar overrides: A dict of path to the body to serve instead of the fixture.
+    """
+
+    def __init__(self, handler=StandInHandler):
+        self.server = HTTPServer(("127.0.0.1", 0), handler)
+        self.server.requests = []
+        self.server.failures = {}
+        self.server.overrides = {}
+        self.url = "http://127.0.0.1:{0}".format(self.server.server_port)
+        self.requests = self.server.requests
+        self.failures = self.server.failures
+        self.overrides = self.server.overrides
+        self.thread = threading.Thread(target=self.server.serve_forever, args=(0.05,))
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
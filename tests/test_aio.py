@@ -0,0 +1,107 @@
+import asyncio
+import unittest
+
+from p2000.aio import AsyncConnection, AsyncAbstractReader
+
+LINES = (
+    "FLEX: 2018-09-15 21:42:05 1600/2/K/A 10.120 [001523172] ALN A2 Straat Stad 123 x\n"
+    "FLEX: broken\n"
+    "multimon-ng status\n"
+    "FLEX: 2018-09-15 21:42:06 1600/2/K/A 10.120 [000123456] ALN P 2 Weg Dorp 456 x\n"
+)
+
+
+class FakeAsyncConnection(AsyncConnection):
+    COMMAND_RTLFM = ["printf", LINES]
+    COMMAND_MULTI = ["cat"]
+
+
+class CollectingReader(AsyncAbstractReader):
+
+    def __init__(self, **kwargs):
+        super(CollectingReader, self).__init__(**kwargs)
+        self.received = []
+
+    async def act(self, line):
+        await asyncio.sleep(0)
+        self.received.append(line)
+
+
+class FailingReader(AsyncAbstractReader):
+
+    def __init__(self, **kwargs):
+        super(FailingReader, self).__init__(**kwargs)
+        self.calls = 0
+
+    async def act(self, line):
+        self.calls += 1
+        raise RuntimeError(line.monitorcode)
+
+
+class Writer:
+
+    def __init__(self):
+        self.written = []
+
+    def write(self, line):
+        self.written.append(line)
+
+
+class SlowReader(AsyncAbstractReader):
+
+    async def act(self, line):
+        await asyncio.sleep(60)
+
+
+class TestAsyncReader(unittest.TestCase):
+
+    def test_attach(self):
+        reader = CollectingReader()
+        asyncio.run(reader.attach(FakeAsyncConnection()))
+        self.assertEqual([l.monitorcode for l in reader.received], ["001523172", "000123456"])
+        self.assertEqual(reader.received[0].message, "ALN A2 Straat Stad 123")
+        self.assertEqual(reader.connection, None)
+
+    def test_attach_concurrent(self):
+        reader = CollectingReader(concurrency=4)
+        asyncio.run(reader.attach(FakeAsyncConnection()))
+        self.assertEqual(len(reader.received), 2)
+
+    def test_writers(self):
+        reader = CollectingReader()
+        writer = Writer()
+        reader.add_writer(writer)
+        asyncio.run(reader.attach(FakeAsyncConnection()))
+        self.assertEqual(writer.written, reader.received)
+
+    def test_act_error(self):
+        for concurrency in (1, 4):
+            reader = FailingReader(concurrency=concurrency)
+            with self.assertRaises(RuntimeError):
+                asyncio.run(reader.attach(FakeAsyncConnection()))
+            self.assertGreaterEqual(reader.calls, 1)
+            self.assertEqual(reader.connection, None)
+
+    def test_unsupported(self):
+        for key in ("workers", "dedup", "metrics", "journal"):
+            with self.assertRaises(ValueError):
+                CollectingReader(**{key: 1})
+
+    def test_cancel(self):
+        connection = FakeAsyncConnection()
+        reader = SlowReader(concurrency=2)
+
+        async def run():
+            task = asyncio.ensure_future(reader.attach(connection))
+            await asyncio.sleep(0.5)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        self.assertEqual(reader.connection, None)
+        self.assertIsNotNone(connection.multi_process.returncode)
+
+
+if __name__ == '__main__':
+    unittest.main()
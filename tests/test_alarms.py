@@ -0,0 +1,237 @@
+import time
+import unittest
+from datetime import datetime
+
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from p2000 import Unit, Region, Discipline
+from p2000.blacklist import Blacklist
+from p2000.rtlsdr import Line
+from p2000.storage.alarms import Connection, BufferedWriter
+from p2000.storage.units import UnitCache
+from tests.fake_mongo import FakeCollection
+from tests.fakes import FakeConnection as FakeRtlConnection, FakeUnitsConnection, CollectingReader
+
+
+def flex(second, capcodes="001523172", message="A2 Dorpsstraat Groningen"):
+    return "FLEX|2018-09-15 21:42:{0:02d}|1600/2/K/A|10.120|{1}|ALN|{2}".format(second, capcodes, message)
+
+
+class FlakyCollection(FakeCollection):
+
+    def __init__(self):
+        FakeCollection.__init__(self)
+        self.down = False
+        self.reject = None
+
+    def insert_many(self, rows, ordered=True):
+        if self.down:
+            raise AutoReconnect("down")
+        if self.reject is None:
+            return FakeCollection.insert_many(self, rows, ordered)
+        rejected = [i for i, row in enumerate(rows) if self.reject in row["message"]]
+        FakeCollection.insert_many(self, [row for i, row in enumerate(rows) if i not in rejected], ordered)
+        errors = [{"index": i, "code": 121, "errmsg": "Document failed validation"} for i in rejected]
+        raise BulkWriteError({"writeErrors": errors, "nInserted": len(rows) - len(rejected)})
+
+
+class FlakyRollups(FakeCollection):
+
+    def __init__(self):
+        FakeCollection.__init__(self)
+        self.down = False
+
+    def bulk_write(self, operations, ordered=True):
+        if self.down:
+            raise AutoReconnect("down")
+        FakeCollection.bulk_write(self, operations, ordered)
+
+
+class FakeConnection(Connection):
+
+    def __init__(self):
+        super(FakeConnection, self).__init__()
+        self.collection = FlakyCollection()
+        self.rollups = FlakyRollups()
+
+
+class TestConnection(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = FakeConnection()
+
+    def test_roundtrip(self):
+        line = Line(flex(5, "001523172 000123456"))
+        line.units = [Unit(capcode="1523172", region=Region.GRONINGEN, discipline=Discipline.AMBULANCE)]
+        self.connection.write_alarm(line)
+        row = self.connection.collection.rows[0]
+        self.assertEqual(row["datetime"], datetime(2018, 9, 15, 21, 42, 5))
+        self.assertEqual(row["capcodes"], ["001523172", "000123456"])
+        self.assertEqual(row["units"][0]["region"], "01")
+        found = self.connection.find_alarms(capcode="000123456")
+        self.assertEqual(found[0].line, line.line)
+        self.assertEqual(found[0].units[0].discipline, Discipline.AMBULANCE)
+        self.assertRaises(TypeError, self.connection.write_alarm, "line")
+
+    def test_find_alarms(self):
+        self.connection.write_alarms([Line(flex(s)) for s in range(10)])
+        found = self.connection.find_alarms(start=datetime(2018, 9, 15, 21, 42, 3),
+                                            end=datetime(2018, 9, 15, 21, 42, 8))
+        self.assertEqual([l.time for l in found], ["21:42:07", "21:42:06", "21:42:05", "21:42:04", "21:42:03"])
+        self.assertEqual(len(self.connection.find_alarms(limit=2)), 2)
+        self.assertEqual(self.connection.find_alarms(limit=0), [])
+        self.assertEqual(self.connection.find_alarms(capcode="000000001"), [])
+
+
+class TestRollups(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = FakeConnection()
+        lines = []
+        for minute in range(3):
+            for second in range(minute + 1):
+                line = Line("FLEX|2018-09-15 21:{0:02d}:{1:02d}|1600/2/K/A|10.120|001523172 000123456|ALN|A2"
+                            .format(minute, second))
+                line.units = [
+                    Unit(capcode="1523172", region=Region.GRONINGEN, discipline=Discipline.AMBULANCE),
+                    Unit(capcode="0123456", region=Region.FRIESLAND, discipline=Discipline.AMBULANCE)
+                ]
+                lines.append(line)
+        lines.append(Line(flex(30)))
+        self.connection.write_alarms(lines)
+
+    def test_rollups(self):
+        self.assertEqual(self.connection.rollups.count_documents({}), 3 + 1 + 1 + 1)
+        self.assertEqual(self.connection.rollups.writes, 1)
+
+    def test_counts(self):
+        start, end = datetime(2018, 9, 15, 21, 0, 30), datetime(2018, 9, 15, 22)
+        minutes = self.connection.alarm_counts(start, end, bucket="minute")
+        self.assertEqual([(c["start"].minute, c["count"]) for c in minutes], [(0, 1), (1, 2), (2, 3), (42, 1)])
+        hours = self.connection.alarm_counts(start, end, group_by="region")
+        self.assertEqual(len(hours), 1)
+        self.assertEqual(hours[0]["count"], 7)
+        self.assertEqual(hours[0]["counts"], {Region.GRONINGEN: 6, Region.FRIESLAND: 6, Region.UNKNOWN: 1})
+        pairs = self.connection.alarm_counts(start, end, bucket="day", group_by="region_discipline")[0]["counts"]
+        self.assertEqual(pairs[(Region.GRONINGEN, Discipline.AMBULANCE)], 6)
+        capcodes = self.connection.alarm_counts(start, end, group_by="capcode")[0]["counts"]
+        self.assertEqual(capcodes, {"001523172": 7, "000123456": 6})
+        self.assertEqual(self.connection.alarm_counts(start, datetime(2018, 9, 15, 21, 1), bucket="minute"),
+                         [{"start": datetime(2018, 9, 15, 21, 0), "count": 1}])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, self.connection.alarm_counts, datetime.now(), datetime.now(), bucket="week")
+        self.assertRaises(ValueError, self.connection.alarm_counts, datetime.now(), datetime.now(), group_by="town")
+
+
+class TestBufferedWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = FakeConnection()
+        self.collection = self.connection.collection
+
+    def test_batch_size(self):
+        with BufferedWriter(self.connection, batch_size=5, interval=60) as writer:
+            for s in range(12):
+                writer.write(Line(flex(s)))
+            for _ in range(100):
+                if writer.written >= 10:
+                    break
+                time.sleep(0.01)
+            self.assertGreaterEqual(writer.written, 10)
+        self.assertEqual(writer.written, 12)
+        self.assertEqual(len(self.collection.rows), 12)
+
+    def test_interval(self):
+        with BufferedWriter(self.connection, batch_size=100, interval=0.05) as writer:
+            writer.write(Line(flex(1)))
+            time.sleep(0.3)
+            self.assertEqual(len(self.collection.rows), 1)
+
+    def test_unreachable(self):
+        writer = BufferedWriter(self.connection, batch_size=2, spool_size=5)
+        self.collection.down = True
+        for s in range(4):
+            writer.write(Line(flex(s)))
+        self.assertFalse(writer.flush())
+        self.assertEqual(writer.pending, 4)
+        self.assertEqual(writer.failures, 1)
+        for s in range(4, 7):
+            writer.write(Line(flex(s)))
+        self.assertEqual(writer.pending, 5)
+        self.assertEqual(writer.dropped, 2)
+        self.collection.down = False
+        self.assertTrue(writer.flush())
+        self.assertEqual([r["line"] for r in self.collection.rows], [flex(s) for s in range(2, 7)])
+        self.assertIsNone(writer.error)
+
+    def test_received(self):
+        writer = BufferedWriter(self.connection)
+        line = Line(flex(1))
+        writer.write(line)
+        self.assertIsNotNone(line.received)
+        writer.flush()
+        self.assertEqual(self.collection.rows[0]["received"], line.received)
+
+    def test_idempotent(self):
+        writer = BufferedWriter(self.connection)
+        lines = [Line(flex(s)) for s in range(3)]
+        for line in lines:
+            writer.write(line)
+        writer.flush()
+        self.connection.write_alarms(lines)
+        self.assertEqual(len(self.collection.rows), 3)
+        self.assertEqual(self.total(), 3)
+
+    def test_rollups_unreachable(self):
+        writer = BufferedWriter(self.connection)
+        self.connection.rollups.down = True
+        for s in range(3):
+            writer.write(Line(flex(s)))
+        self.assertFalse(writer.flush())
+        self.assertEqual(writer.pending, 0)
+        self.assertEqual(writer.written, 3)
+        self.assertEqual(writer.failures, 1)
+        self.assertEqual(len(self.collection.rows), 3)
+        self.connection.rollups.down = False
+        writer.write(Line(flex(3)))
+        self.assertTrue(writer.flush())
+        self.assertEqual(self.total(), 4)
+
+    def test_rejected(self):
+        writer = BufferedWriter(self.connection)
+        self.collection.reject = "REJECT"
+        writer.write(Line(flex(1)))
+        writer.write(Line(flex(2, message="REJECT")))
+        self.assertTrue(writer.flush())
+        self.assertEqual((writer.written, writer.dropped), (1, 1))
+        self.assertEqual(self.total(), 1)
+
+    def test_units(self):
+        units = FakeUnitsConnection()
+        units.write_units([Unit(capcode="1523172", region=Region.GRONINGEN, discipline=Discipline.AMBULANCE)])
+        writer = BufferedWriter(self.connection, units=UnitCache(units))
+        writer.write(Line(flex(1)))
+        writer.flush()
+        self.assertEqual(self.collection.rows[0]["units"][0]["region"], "01")
+        start, end = datetime(2018, 9, 15), datetime(2018, 9, 16)
+        counts = self.connection.alarm_counts(start, end, bucket="day", group_by="region")
+        self.assertEqual(counts[0]["counts"], {Region.GRONINGEN: 1})
+
+    def total(self):
+        counts = self.connection.alarm_counts(datetime(2018, 9, 15), datetime(2018, 9, 16), bucket="day")
+        return sum(c["count"] for c in counts)
+
+    def test_reader(self):
+        writer = BufferedWriter(self.connection)
+        config = {"rtlsdr": {"blacklist": {"prefixes": ["ALN TESTOPROEP"]}}}
+        reader = CollectingReader(blacklist=Blacklist(config=config, interval=None))
+        reader.add_writer(writer)
+        raws = [(flex(1) + "\n").encode("utf-8"), b"multimon-ng\n",
+                (flex(2, message="TESTOPROEP BACK-UP SYSTEEM GMC BN (2)") + "\n").encode("utf-8")]
+        reader.attach(FakeRtlConnection(raws))
+        self.assertEqual(writer.pending, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
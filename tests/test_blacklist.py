@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from p2000.blacklist import Blacklist, Rules
+from p2000.rtlsdr import Line
+
+LINE = "FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|001523172 000123456|ALN|TESTOPROEP BACK-UP SYSTEEM"
+
+
+def config(**settings):
+    return {"rtlsdr": {"blacklist": settings}}
+
+
+# noinspection SpellCheckingInspection
+class TestRules(unittest.TestCase):
+
+    def setUp(self):
+        self.line = Line(LINE)
+
+    def test_monitorcodes(self):
+        self.assertTrue(Rules({"monitorcodes": ["001523172"]}).is_monitorcode_blacklisted(self.line))
+        self.assertFalse(Rules({"monitorcodes": ["000123456"]}).is_monitorcode_blacklisted(self.line))
+        self.assertFalse(Rules({"monitorcodes": ["000000001"]}).is_monitorcode_blacklisted(self.line))
+
+    def test_messages(self):
+        self.assertTrue(Rules({"messages": ["ALN TESTOPROEP BACK-UP SYSTEEM"]}).is_message_blacklisted(self.line))
+        self.assertFalse(Rules({"messages": ["ALN TESTOPROEP"]}).is_message_blacklisted(self.line))
+        self.assertFalse(Rules({}).is_message_blacklisted(self.line))
+
+    def test_prefixes(self):
+        self.assertTrue(Rules({"prefixes": ["ALN TESTOPROEP"]}).is_message_blacklisted(self.line))
+        self.assertFalse(Rules({"prefixes": ["TESTOPROEP"]}).is_message_blacklisted(self.line))
+        self.assertFalse(Rules({"prefixes": ["ALN.TEST"]}).is_message_blacklisted(self.line))
+
+    def test_wildcards(self):
+        self.assertTrue(Rules({"wildcards": ["* TESTOPROEP *"]}).is_message_blacklisted(self.line))
+        self.assertFalse(Rules({"wildcards": ["* TESTOPROEP"]}).is_message_blacklisted(self.line))
+
+    def test_patterns(self):
+        self.assertTrue(Rules({"patterns": [r".*BACK-UP\b"]}).is_message_blacklisted(self.line))
+        self.assertFalse(Rules({"patterns": ["BACK-UP"]}).is_message_blacklisted(self.line))
+
+    def test_combined(self):
+        rules = Rules({"prefixes": ["A1"], "wildcards": ["*SYSTEEM"], "patterns": ["P 1"]})
+        self.assertTrue(rules.is_message_blacklisted(self.line))
+
+
+class TestBlacklist(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "config.json")
+        self.write(monitorcodes=["001523172"])
+        self.line = Line(LINE)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, content=None, **settings):
+        with open(self.path, "w") as f:
+            f.write(content if content is not None else json.dumps(config(**settings)))
+
+    def touch(self):
+        stat = os.stat(self.path)
+        os.utime(self.path, (stat.st_atime, stat.st_mtime + 10))
+
+    def test_reload(self):
+        blacklist = Blacklist(self.path, interval=0)
+        self.assertTrue(blacklist.is_line_blacklisted(self.line))
+        self.write(monitorcodes=[])
+        self.touch()
+        self.assertFalse(blacklist.is_line_blacklisted(self.line))
+        self.assertEqual(blacklist.reloads, 1)
+
+    def test_reload_error(self):
+        blacklist = Blacklist(self.path, interval=0)
+        self.write("{")
+        self.touch()
+        self.assertTrue(blacklist.is_line_blacklisted(self.line))
+        self.assertIsNotNone(blacklist.error)
+        self.write(monitorcodes=[])
+        self.touch()
+        self.touch()
+        self.assertFalse(blacklist.is_line_blacklisted(self.line))
+        self.assertIsNone(blacklist.error)
+
+    def test_interval(self):
+        blacklist = Blacklist(self.path, interval=60)
+        self.write(monitorcodes=[])
+        self.touch()
+        self.assertTrue(blacklist.is_line_blacklisted(self.line))
+        blacklist.checked = time.time() - 61
+        self.assertFalse(blacklist.is_line_blacklisted(self.line))
+
+    def test_config(self):
+        blacklist = Blacklist(self.path, config=config(messages=["x"]), interval=None)
+        self.assertEqual(blacklist.rules.messages, frozenset(["x"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from p2000 import Unit, Region, Discipline
+from p2000.blacklist import Blacklist
+from p2000.broker import Broker, BrokerConnection, Subscriber, Subscription
+from p2000.storage.units import CapcodeIndex
+from tests.fakes import FakeConnection, FakeUnitsConnection, CollectingReader
+
+
+def flex(capcode, message="A2 Dorpsstraat Groningen"):
+    return "FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|{0}|ALN|{1}\n".format(capcode, message).encode("utf-8")
+
+
+def wait(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("Timed out.")
+        time.sleep(0.01)
+
+
+class TestBroker(unittest.TestCase):
+
+    def setUp(self):
+        units = FakeUnitsConnection()
+        units.write_units([
+            Unit(capcode="1523172", region=Region.GRONINGEN, discipline=Discipline.FIRE_DEPARTMENT),
+            Unit(capcode="0512000", region=Region.TWENTE, discipline=Discipline.POLICE)
+        ])
+        self.broker = Broker(("127.0.0.1", 0), index=CapcodeIndex(units).build()).start()
+        self.threads = []
+
+    def tearDown(self):
+        self.broker.stop()
+        for thread in self.threads:
+            thread.join(5)
+
+    def subscribe(self, **kwargs):
+        reader = CollectingReader()
+        thread = threading.Thread(target=reader.attach, args=(BrokerConnection(self.broker.address, **kwargs),))
+        thread.start()
+        self.threads.append(thread)
+        return reader
+
+    def test_publish(self):
+        everything = self.subscribe()
+        twente = self.subscribe(regions=[Region.TWENTE])
+        fire = self.subscribe(disciplines=["01"], capcodes=["001523172"])
+        wait(lambda: len(self.broker.broker_stats["subscribers"]) == 3)
+
+        self.broker.attach(FakeConnection([flex("001523172"), flex("000512000 000000001"), b"multimon-ng status\n"]))
+        wait(lambda: len(everything.received) == 2 and len(twente.received) == 1 and len(fire.received) == 1)
+        self.assertEqual(everything.received[0], flex("001523172"))
+        self.assertEqual(twente.received, [flex("000512000 000000001")])
+        self.assertEqual(fire.received, [flex("001523172")])
+        self.assertEqual(self.broker.broker_stats["published"], 2)
+
+        self.broker.stop()
+        wait(lambda: everything.connection is None)
+
+    def test_blacklisted(self):
+        config = {"rtlsdr": {"blacklist": {"monitorcodes": ["001523172"]}}}
+        broker = Broker(("127.0.0.1", 0), blacklist=Blacklist(config=config, interval=None))
+        broker.attach(FakeConnection([flex("001523172"), flex("000512000")]))
+        self.assertEqual(broker.published, 1)
+
+    def test_payload(self):
+        line = self.broker.create_line(flex("001523172 000999999"))
+        self.assertEqual(self.broker.payload(line), {
+            "line": line.line, "timestamp": "2018-09-15", "time": "21:42:05", "capcodes": ["1523172", "0999999"],
+            "message": "ALN A2 Dorpsstraat Groningen", "regions": ["00", "01"], "disciplines": ["00", "01"]
+        })
+        self.broker.index = None
+        self.assertEqual(self.broker.payload(line)["disciplines"], ["02"])
+
+    def test_unix_socket(self):
+        directory = tempfile.mkdtemp()
+        try:
+            broker = Broker(os.path.join(directory, "broker.sock")).start()
+            reader = CollectingReader()
+            thread = threading.Thread(target=reader.attach, args=(BrokerConnection(broker.address),))
+            thread.start()
+            wait(lambda: len(broker.broker_stats["subscribers"]) == 1)
+            broker.act(broker.create_line(flex("001523172")))
+            wait(lambda: len(reader.received) == 1)
+            broker.stop()
+            thread.join(5)
+            self.assertFalse(os.path.exists(broker.address))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_unreachable(self):
+        connection = BrokerConnection(("127.0.0.1", 1))
+        with self.assertRaises(IOError):
+            connection.open()
+
+
+class TestSubscriber(unittest.TestCase):
+
+    def test_bounded(self):
+        subscriber = Subscriber(None, Subscription(), 2)
+        for data in (b"1", b"2", b"3"):
+            subscriber.publish(data)
+        self.assertEqual(subscriber.dropped, 1)
+        self.assertEqual([subscriber.queue.get_nowait() for _ in range(2)], [b"2", b"3"])
+
+    def test_subscription(self):
+        with self.assertRaises(ValueError):
+            Subscription.from_dict({"regions": "01"})
+        subscription = Subscription.from_dict({"regions": ["01"]})
+        self.assertTrue(subscription.matches({"capcodes": [], "regions": ["00", "01"], "disciplines": []}))
+        self.assertFalse(subscription.matches({"capcodes": [], "regions": ["05"], "disciplines": []}))
+
+
+if __name__ == '__main__':
+    unittest.main()
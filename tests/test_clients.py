@@ -0,0 +1,78 @@
+import unittest
+
+from p2000.storage import clients
+from p2000.storage.alarms import Connection
+from tests.fake_mongo import FakeCollection
+
+UNREACHABLE = "mongodb://127.0.0.1:1/"
+
+
+class FakeDatabase(dict):
+
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+class TestClients(unittest.TestCase):
+
+    def tearDown(self):
+        clients.close_clients()
+
+    def test_options(self):
+        options = clients.client_options({
+            "max_pool_size": 20, "read_preference": "secondaryPreferred",
+            "write_concern": {"w": "majority", "journal": True}
+        })
+        self.assertEqual(options, {"maxPoolSize": 20, "readPreference": "secondaryPreferred",
+                                   "w": "majority", "journal": True})
+        self.assertRaises(ValueError, clients.client_options, {"pool": 1})
+        self.assertRaises(ValueError, clients.client_options, {"write_concern": {"fsync": True}})
+
+    def test_registry(self):
+        client = clients.get_client(UNREACHABLE, {"max_pool_size": 5, "write_concern": {"w": 1}})
+        self.assertIs(clients.get_client(UNREACHABLE), client)
+        self.assertEqual(client.options.pool_options.max_pool_size, 5)
+        self.assertIsNot(clients.get_client("mongodb://127.0.0.1:2/", {}), client)
+        clients.close_clients()
+        self.assertIsNot(clients.get_client(UNREACHABLE, {}), client)
+
+    def test_health(self):
+        clients.get_client(UNREACHABLE, {"server_selection_timeout_ms": 100})
+        result = clients.health(UNREACHABLE, timeout=0.2)
+        self.assertFalse(result["ok"])
+        self.assertEqual(result["url"], UNREACHABLE)
+        self.assertIsNotNone(result["error"])
+        self.assertLess(result["latency"], 2)
+
+    def test_establish(self):
+        clients.get_client(UNREACHABLE, {})
+        connection = Unreachable()
+        self.assertRaises(IOError, connection.establish, 0.2)
+        self.assertFalse(connection.established)
+        self.assertFalse(connection.health(0.2)["ok"])
+
+
+class Unreachable(Connection):
+
+    def mongo_url(self):
+        return UNREACHABLE
+
+
+class TestLazyCollections(unittest.TestCase):
+
+    def test_lazy(self):
+        connection = Connection()
+        self.assertIsNone(connection.collection)
+        self.assertIsNone(connection.rollups)
+        self.assertFalse(connection.established)
+        connection.db = FakeDatabase()
+        self.assertFalse(connection.db)
+        self.assertIs(connection.collection, connection.db["Alarms"])
+        self.assertIs(connection.rollups, connection.db["AlarmRollups"])
+        self.assertTrue(connection.established)
+        self.assertEqual(connection.ensure_indexes(), ["datetime", "capcodes_datetime", "bucket_start"])
+
+
+if __name__ == '__main__':
+    unittest.main()
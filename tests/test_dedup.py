@@ -0,0 +1,65 @@
+import unittest
+
+from p2000.dedup import Deduplicator
+from p2000.metrics import Metrics
+from p2000.rtlsdr import Line
+from tests.fakes import FakeConnection, CollectingReader
+
+
+def flex(capcodes="001523172", message="A2 Dorpsstraat Groningen", second=0):
+    return "FLEX|2018-09-15 21:42:{0:02d}|1600/2/K/A|10.120|{1}|ALN|{2}".format(second, capcodes, message)
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestDeduplicator(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = Clock()
+        self.dedup = Deduplicator(window=30, size=3, clock=self.clock)
+
+    def test_window(self):
+        self.assertFalse(self.dedup.is_duplicate(Line(flex())))
+        self.clock.now += 10
+        # Another receiver, another timestamp and the capcodes in another order, the same message.
+        self.assertTrue(self.dedup.is_duplicate(Line(flex(second=10))))
+        self.assertFalse(self.dedup.is_duplicate(Line(flex(message="A1 Dorpsstraat Groningen"))))
+        self.assertFalse(self.dedup.is_duplicate(Line(flex(capcodes="001523172 000123456"))))
+        self.assertTrue(self.dedup.is_duplicate(Line(flex(capcodes="000123456 001523172"))))
+        self.clock.now += 21
+        self.assertFalse(self.dedup.is_duplicate(Line(flex())))
+        self.assertEqual(self.dedup.stats, {"checked": 6, "suppressed": 2, "size": 3, "evictions": 0})
+
+    def test_bounded(self):
+        for i in range(5):
+            self.assertFalse(self.dedup.is_duplicate(Line(flex(message=str(i)))))
+        self.assertEqual(self.dedup.stats["size"], 3)
+        self.assertEqual(self.dedup.evictions, 2)
+        self.assertFalse(self.dedup.is_duplicate(Line(flex(message="0"))))
+        self.assertTrue(self.dedup.is_duplicate(Line(flex(message="4"))))
+
+
+class TestReaderDedup(unittest.TestCase):
+
+    def test_reader(self):
+        metrics = Metrics()
+        reader = CollectingReader(dedup=Deduplicator(), metrics=metrics)
+        writes = []
+        reader.add_writer(type("Writer", (), {"write": lambda self, line: writes.append(line)})())
+        lines = [flex(), flex(second=1), b"status", flex(message="A1"), flex()]
+        reader.attach(FakeConnection([(l if isinstance(l, bytes) else l.encode("utf-8")) + b"\n" for l in lines]))
+        self.assertEqual(len(reader.received), 3)
+        self.assertEqual(len(writes), 2)
+        self.assertEqual(reader.dedup.suppressed, 2)
+        self.assertEqual(metrics.duplicates.value, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
 from p2000 import Region, Discipline
+from p2000.enums import KeywordMatcher
 
 
 class TestEnumRegion(unittest.TestCase):
@@ -101,6 +102,36 @@ class TestEnumDiscipline(unittest.TestCase):
         self.assertEqual(Discipline.match("Capcodes KWC - KNRM"), Discipline.KNRM)
         self.assertEqual(Discipline.match("Capcodes Brugbediening + KNRM"), Discipline.KNRM)
 
+        self.assertEqual(Discipline.match("Capcodes Gemeente"), Discipline.UNKNOWN)
+        self.assertEqual(Discipline.match("Capcodes Politie + Brandweer"), Discipline.FIRE_DEPARTMENT)
+
+    def test_classify(self):
+        self.assertEqual(Discipline.classify("P 1 BRT-01 Brand woning Dorpsstraat Zwolle"), Discipline.FIRE_DEPARTMENT)
+        self.assertEqual(Discipline.classify("A1 17123 Rit 93412 Coolsingel Rotterdam"), Discipline.AMBULANCE)
+        self.assertEqual(Discipline.classify("P 2 Assistentie Politie Utrecht"), Discipline.POLICE)
+        self.assertEqual(Discipline.classify("KNRM Reddingboot Scheveningen"), Discipline.KNRM)
+        self.assertEqual(Discipline.classify("Brandstoflekkage"), Discipline.UNKNOWN)
+        self.assertEqual(Discipline.classify("Proefalarm"), Discipline.UNKNOWN)
+        self.assertEqual(Discipline.classify(""), Discipline.UNKNOWN)
+
+
+class TestKeywordMatcher(unittest.TestCase):
+
+    def test_match(self):
+        matcher = KeywordMatcher([("a", ["foo", "foobar"]), ("b", ["bar", "Baz"])])
+        self.assertEqual(matcher.match("xx FOOBAR"), "a")
+        self.assertEqual(matcher.match("baz then foo"), "a")
+        self.assertEqual(matcher.match("abazb"), "b")
+        self.assertEqual(matcher.match("nothing", "default"), "default")
+
+    def test_words(self):
+        matcher = KeywordMatcher([("a", ["foo"])], words=True)
+        self.assertEqual(matcher.match("a foo."), "a")
+        self.assertEqual(matcher.match("food"), None)
+
+    def test_empty(self):
+        self.assertEqual(KeywordMatcher([]).match("foo", "default"), "default")
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+from p2000 import Discipline
+from p2000.extraction import Alarm, extract, enrich, extract_many
+from p2000.rtlsdr import Line
+
+
+class TestExtraction(unittest.TestCase):
+
+    def test_ambulance(self):
+        alarm = extract("ALN A1 17123 Rit 93412 Coolsingel 40 3012AD Rotterdam ROTTDM")
+        self.assertEqual(alarm, Alarm(priority="A1", postal_code="3012AD", street="Coolsingel 40", town="Rotterdam",
+                                      ride="93412", discipline=Discipline.AMBULANCE))
+        alarm = extract("A2 AMBU 07106 Dijkstraat 6871 BG Renkum Rit: 123456")
+        self.assertEqual((alarm.priority, alarm.postal_code, alarm.street, alarm.town, alarm.ride),
+                         ("A2", "6871BG", "Dijkstraat", "Renkum", "123456"))
+        alarm = extract("B1 17101 Rit 11873 Stationsplein 2909LD Capelle aan den IJssel")
+        self.assertEqual((alarm.priority, alarm.town), ("B1", "Capelle aan den IJssel"))
+
+    def test_fire_department(self):
+        alarm = extract("ALN P 1 BRT-01 Brand woning Kerkstraat 12 Groningen 011231")
+        self.assertEqual(alarm, Alarm(priority="P1", street="Kerkstraat 12", town="Groningen",
+                                      discipline=Discipline.FIRE_DEPARTMENT))
+        alarm = extract("Prio 2 OMS Automatische brandmelding Industrieweg Assen 031231")
+        self.assertEqual((alarm.priority, alarm.street, alarm.town), ("P2", "Industrieweg", "Assen"))
+        alarm = extract("P 1 Gebouwbrand Van Hoytemastraat Den Haag 151231")
+        self.assertEqual((alarm.street, alarm.town), ("Van Hoytemastraat", "Den Haag"))
+
+    def test_streets(self):
+        cases = [
+            ("A1 Jan van Galenstraat 5 Amsterdam", "Jan van Galenstraat 5", "Amsterdam", None),
+            ("A2 Oude Enghweg Hilversum", "Oude Enghweg", "Hilversum", None),
+            ("P 1 Nieuwe Binnenweg 1 Rotterdam", "Nieuwe Binnenweg 1", "Rotterdam", None),
+            ("A1 Markt 4 5211JW 's-Hertogenbosch", "Markt 4", "'s-Hertogenbosch", "5211JW"),
+            ("A1 Damrak 1 Amsterdam", "Damrak 1", "Amsterdam", None),
+        ]
+        for message, street, town, postal_code in cases:
+            alarm = extract(message)
+            self.assertEqual((alarm.street, alarm.town, alarm.postal_code), (street, town, postal_code), message)
+
+    def test_missing(self):
+        self.assertEqual(extract("Proefalarm"), Alarm())
+        self.assertEqual(extract(""), Alarm())
+        self.assertEqual(extract("Test A1 Rit"), Alarm(discipline=Discipline.AMBULANCE))
+        self.assertEqual(extract("Brand in Amsterdam").street, None)
+
+    def test_enrich(self):
+        line = Line("FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|001523172|ALN|A2 Dorpsstraat 9711AA Groningen")
+        self.assertIsNone(line.alarm)
+        self.assertEqual(enrich(line).alarm.as_dict(), {"priority": "A2", "postal_code": "9711AA",
+                                                        "street": "Dorpsstraat", "town": "Groningen",
+                                                        "ride": None, "discipline": "02"})
+
+    def test_extract_many(self):
+        line = Line("FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|001523172|ALN|P 2 Politie Markt Utrecht")
+        alarms = extract_many([line, "A1 Kerkstraat Ede"])
+        self.assertEqual([a.priority for a in alarms], ["P2", "A1"])
+        self.assertEqual(alarms[0].discipline, Discipline.POLICE)
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            Alarm().unknown = 1
+
+
+if __name__ == '__main__':
+    unittest.main()
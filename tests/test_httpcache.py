@@ -0,0 +1,71 @@
+import shutil
+import tempfile
+import unittest
+
+from p2000 import Region
+from p2000.storage.units import scrape_all
+from p2000.storage.units.httpcache import PageCache
+from tests.stand_in import StandIn, fixture
+
+BRANDWEER = "/capcodes-per-regio/01-groningen/capcodes-brandweer"
+
+
+class TestPageCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = PageCache(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_put(self):
+        self.assertEqual(self.cache.headers("http://a"), {})
+        self.assertTrue(self.cache.put("http://a", "body", '"1"', "Mon, 01 Oct 2018 00:00:00 GMT"))
+        self.assertEqual(self.cache.headers("http://a"), {
+            "If-None-Match": '"1"', "If-Modified-Since": "Mon, 01 Oct 2018 00:00:00 GMT"
+        })
+        self.assertFalse(self.cache.put("http://a", "body", '"2"'))
+        self.assertTrue(self.cache.put("http://a", "other"))
+
+    def test_extract(self):
+        self.cache.put("http://a", "body")
+        digest = PageCache.hash("body")
+        self.cache.put_extract("http://a", digest, [["1", "2", "3"]])
+        self.assertEqual(self.cache.get_extract("http://a", digest), [["1", "2", "3"]])
+        self.cache.put("http://a", "body")
+        self.assertEqual(self.cache.get_extract("http://a", digest), [["1", "2", "3"]])
+        self.cache.put("http://a", "other")
+        self.assertEqual(self.cache.get_extract("http://a", digest), None)
+        self.assertEqual(self.cache.get_extract("http://a", PageCache.hash("other")), None)
+
+
+class TestIncrementalScrape(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.stand_in = StandIn().__enter__()
+
+    def tearDown(self):
+        self.stand_in.__exit__()
+        shutil.rmtree(self.directory)
+
+    def scrape(self, **kwargs):
+        return list(scrape_all([Region.GRONINGEN], base_url=self.stand_in.url,
+                               cache=PageCache(self.directory), **kwargs))
+
+    def test_incremental(self):
+        self.assertEqual(len(self.scrape(changed_only=True)), 5)
+        self.assertEqual(self.scrape(changed_only=True), [])
+        self.assertEqual(len(self.scrape()), 5)
+
+        body = fixture("brandweer.html").replace(b"Haren &amp; Glimmen", b"Haren")
+        self.stand_in.overrides[BRANDWEER] = body
+        units = self.scrape(changed_only=True)
+        self.assertEqual([u.town for u in units], ["Groningen", "Haren", "Appingedam"])
+        self.assertEqual(units[1].function, "Brandweer Haren")
+        self.assertEqual(self.scrape(changed_only=True), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from datetime import datetime
+
+from p2000.journal import Journal, HEADER, list_segments, replay, segment_name
+from p2000.replay import ReplayConnection
+from p2000.rtlsdr import Line
+from p2000.storage.alarms import BufferedWriter
+from tests.fakes import CollectingReader, FakeAlarmsConnection, FakeConnection
+
+
+def flex(second, capcode):
+    return "FLEX|2018-09-15 21:42:{0:02d}|1600/2/K/A|10.120|{1}|ALN|A2 Dorpsstraat Groningen\n".format(second, capcode)
+
+
+class Clock:
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "journal")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_append_replay(self):
+        journal = Journal(self.path)
+        offsets = [journal.append(b"line 1\n"), journal.append(b"line 22\n", timestamp=5.0)]
+        self.assertEqual(offsets, [0, HEADER.size + 7])
+        self.assertEqual(journal.end, 2 * HEADER.size + 15)
+        self.assertEqual([line for _, _, line in journal.replay()], [b"line 1\n", b"line 22\n"])
+        self.assertEqual(list(journal.replay(offset=offsets[1])), [(offsets[1], 5.0, b"line 22\n")])
+        journal.close()
+        with self.assertRaises(IOError):
+            journal.append(b"closed\n")
+
+    def test_policy(self):
+        with self.assertRaises(ValueError):
+            Journal(self.path, fsync="sometimes")
+        for policy in Journal.POLICIES:
+            journal = Journal(self.path, fsync=policy, fsync_interval=0)
+            journal.append(policy.encode("utf-8"))
+            journal.close()
+        self.assertEqual([line for _, _, line in replay(self.path)], [b"always", b"interval", b"never"])
+
+    def test_interval_sync(self):
+        journal = Journal(self.path, fsync_interval=0.05, clock=Clock())
+        journal.append(b"line\n")
+        self.assertTrue(journal.dirty)
+        deadline = time.time() + 5
+        while journal.dirty and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(journal.dirty)
+        journal.close()
+        self.assertIsNone(journal.syncer)
+
+    def test_rotation(self):
+        clock = Clock()
+        journal = Journal(self.path, segment_size=3 * (HEADER.size + 4), clock=clock)
+        for index in range(10):
+            clock.now += 1
+            journal.append("{0:04d}".format(index).encode("utf-8"))
+        self.assertEqual(len(list_segments(self.path)), 4)
+        self.assertEqual([line for _, _, line in replay(self.path, since=1005)], [b"0004", b"0005", b"0006",
+                                                                               b"0007", b"0008", b"0009"])
+        offset = 7 * (HEADER.size + 4)
+        self.assertEqual([line for _, _, line in replay(self.path, offset=offset)], [b"0007", b"0008", b"0009"])
+        journal.close()
+
+    def test_retention(self):
+        record = HEADER.size + 4
+        journal = Journal(self.path, segment_size=2 * record, retention_bytes=4 * record)
+        for index in range(10):
+            journal.append("{0:04d}".format(index).encode("utf-8"))
+        self.assertEqual(list_segments(self.path), [6 * record, 8 * record])
+        self.assertEqual([line for _, _, line in replay(self.path, offset=0)], [b"0006", b"0007", b"0008", b"0009"])
+        journal.close()
+
+        clock = Clock(os.path.getmtime(os.path.join(self.path, segment_name(8 * record))) + 3600)
+        journal = Journal(self.path, segment_size=2 * record, retention=60, clock=clock)
+        journal.append(b"0010")
+        self.assertEqual(list_segments(self.path), [10 * record])
+        journal.close()
+
+    def test_recover(self):
+        journal = Journal(self.path)
+        journal.append(b"complete\n")
+        journal.close()
+        with open(os.path.join(self.path, segment_name(0)), "ab") as segment:
+            segment.write(HEADER.pack(100, 0.0, 0) + b"torn")
+        journal = Journal(self.path)
+        self.assertEqual(journal.end, HEADER.size + 9)
+        journal.append(b"after\n")
+        self.assertEqual([line for _, _, line in journal.replay()], [b"complete\n", b"after\n"])
+        journal.close()
+
+    def test_reader(self):
+        recording = os.path.join(self.directory, "flex.log")
+        with open(recording, "w") as f:
+            f.write("multimon-ng status\n")
+            for second in range(3):
+                f.write(flex(second, "001523172"))
+        journal = Journal(self.path)
+        reader = CollectingReader(journal=journal, workers=2)
+        reader.attach(ReplayConnection(recording, speed=None))
+        journal.close()
+        with open(recording, "rb") as f:
+            self.assertEqual([line for _, _, line in replay(self.path)], f.readlines())
+
+    def test_replay_writer(self):
+        connection = FakeAlarmsConnection()
+        journal = Journal(self.path)
+        with BufferedWriter(connection, interval=0.05) as writer:
+            reader = CollectingReader(journal=journal)
+            reader.add_writer(writer)
+            reader.attach(FakeConnection([flex(0, "001523172").encode("utf-8")]))
+        journal.close()
+        # Write the journal again as after a crash, the alarm that was stored already is skipped.
+        with BufferedWriter(connection, interval=0.05) as writer:
+            for _, timestamp, raw in replay(self.path):
+                line = Line.parse(raw)
+                line.received = datetime.utcfromtimestamp(timestamp)
+                writer.write(line)
+        self.assertEqual(connection.collection.count_documents({}), 1)
+        self.assertEqual([r["total"] for r in connection.rollups.find({"bucket": "hour"})], [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
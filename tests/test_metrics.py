@@ -0,0 +1,103 @@
+import logging
+import unittest
+from urllib.request import urlopen
+
+from p2000.blacklist import Blacklist
+from p2000.metrics import Metrics, Histogram, PrometheusSink, LogSink, render_prometheus, format_line, \
+    escape_label
+from p2000.rtlsdr import AbstractReader, Connection
+from tests.fakes import FakeConnection
+
+FLEX = b"FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|001523172|ALN|A2 Dorpsstraat Groningen\n"
+TEST = b"FLEX|2018-09-15 21:42:06|1600/2/K/A|10.120|001523172|ALN|TESTOPROEP\n"
+CONFIG = {"rtlsdr": {"blacklist": {"messages": ["ALN TESTOPROEP"], "monitorcodes": []}}}
+
+
+class FailingReader(AbstractReader):
+
+    def act(self, line):
+        if line.startswith(b"FLEX") and b"TESTOPROEP" not in line:
+            return
+        raise RuntimeError("act failed")
+
+
+class TestMetrics(unittest.TestCase):
+
+    def test_histogram(self):
+        histogram = Histogram("latency", "Latency.", buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 5):
+            histogram.observe(value)
+        self.assertEqual([s[2] for s in histogram.samples()], [2, 3, 4, 4, 5.65])
+        self.assertEqual(histogram.snapshot(), {"count": 4, "sum": 5.65})
+
+    def test_render(self):
+        first, second = Metrics({"receiver": "0"}), Metrics({"receiver": "1"})
+        first.lines_read.inc(3)
+        text = render_prometheus([first, second])
+        self.assertIn("# TYPE p2000_lines_read_total counter\n", text)
+        self.assertIn('p2000_lines_read_total{receiver="0"} 3\n', text)
+        self.assertIn('p2000_lines_read_total{receiver="1"} 0\n', text)
+        self.assertIn('p2000_act_seconds_bucket{le="+Inf",receiver="0"} 0\n', text)
+        self.assertEqual(text.count("# HELP p2000_act_seconds "), 1)
+        self.assertIn("lines_read_total[receiver=0]=3", format_line([first, second]))
+
+    def test_escape(self):
+        self.assertEqual(escape_label('C:\\rtl "0"\nx'), 'C:\\\\rtl \\"0\\"\\nx')
+        text = render_prometheus([Metrics({"receiver": 'a\\b"\n'})])
+        self.assertIn('p2000_lines_read_total{receiver="a\\\\b\\"\\n"} 0\n', text)
+
+    def test_reader(self):
+        metrics = Metrics()
+        reader = FailingReader(blacklist=Blacklist(config=CONFIG, interval=None), workers=2, metrics=metrics)
+        connection = FakeConnection([FLEX, TEST, b"status\n", FLEX])
+        reader.attach(connection)
+        self.assertIs(connection.metrics, metrics)
+        snapshot = metrics.snapshot()
+        self.assertEqual(snapshot["p2000_lines_read_total"], 4)
+        self.assertEqual(snapshot["p2000_lines_blacklisted_total"], 1)
+        self.assertEqual(snapshot["p2000_parse_failures_total"], 1)
+        self.assertEqual(snapshot["p2000_act_errors_total"], 2)
+        self.assertEqual(snapshot["p2000_act_seconds"]["count"], 4)
+        self.assertEqual(snapshot["p2000_read_stall_seconds"]["count"], 4)
+
+    def test_disabled(self):
+        reader = FailingReader(blacklist=Blacklist(config=CONFIG, interval=None))
+        connection = FakeConnection([FLEX])
+        reader.attach(connection)
+        self.assertIsNone(connection.metrics)
+
+    def test_restarts(self):
+        metrics = Metrics()
+        connection = Connection(metrics)
+        connection.multi_process = object()  # As if it was opened before.
+        connection.COMMAND_RTLFM = ["true"]
+        connection.COMMAND_MULTI = ["true"]
+        connection.open()
+        connection.multi_process.wait()
+        connection.rtlfm_process.wait()
+        self.assertEqual(metrics.restarts.value, 1)
+
+
+class TestSinks(unittest.TestCase):
+
+    def setUp(self):
+        self.metrics = Metrics()
+        self.metrics.lines_read.inc(7)
+
+    def test_prometheus(self):
+        sink = PrometheusSink(self.metrics, port=0).start()
+        try:
+            response = urlopen("http://127.0.0.1:{0}/metrics".format(sink.port), timeout=5)
+            self.assertIn("text/plain", response.headers["Content-Type"])
+            self.assertIn("p2000_lines_read_total 7\n", response.read().decode("utf-8"))
+        finally:
+            sink.stop()
+
+    def test_log(self):
+        with self.assertLogs("p2000.metrics", logging.INFO) as logs:
+            LogSink(self.metrics, interval=60).start().stop()
+        self.assertIn("lines_read_total=7", logs.output[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from p2000.storage.units.parsing import PARSERS, SoupParser, get_parser
+from tests.stand_in import fixture
+
+TRICKY = """
+<html><body>
+<table class="other"><tbody><tr><td>no</td></tr></tbody></table>
+<table class="jw-table jw-table--header jw-table--striped">
+  <thead><tr><td>Capcode</td><td>Plaats</td></tr></thead>
+  <tbody>
+    <tr><td> 0100001 </td><td>Gron<i>ingen</i></td><td>A &amp; B &lt;C&gt; &eacute;</td></tr>
+    <tr><td>0100002</td><td></td><td>Post
+    Noord</td></tr>
+  </tbody>
+</table>
+<table class="jw-table jw-table--header jw-table--striped"><tbody><tr><td>second</td></tr></tbody></table>
+</body></html>
+"""
+
+
+# noinspection SpellCheckingInspection
+class TestParsers(unittest.TestCase):
+
+    def setUp(self):
+        self.pages = [fixture(name).decode("utf-8") for name in ["brandweer.html", "ambulance.html"]] + [TRICKY]
+        self.landing = fixture("landing.html").decode("utf-8")
+
+    def test_identical(self):
+        expected = [SoupParser().rows(page) for page in self.pages]
+        for name in PARSERS:
+            parser = get_parser(name)
+            self.assertEqual([parser.rows(page) for page in self.pages], expected, name)
+            self.assertEqual(parser.links(self.landing), SoupParser().links(self.landing), name)
+
+    def test_tricky(self):
+        self.assertEqual(SoupParser().rows(TRICKY), [
+            [" 0100001 ", "Groningen", u"A & B <C> é"],
+            ["0100002", "", "Post\n    Noord"]
+        ])
+
+    def test_no_table(self):
+        for name in PARSERS:
+            self.assertRaises(ValueError, get_parser(name).rows, self.landing)
+
+    def test_get_parser(self):
+        parser = SoupParser()
+        self.assertIs(get_parser(parser), parser)
+        self.assertRaises(ValueError, get_parser, "unknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
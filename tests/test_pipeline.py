@@ -0,0 +1,101 @@
+import threading
+import unittest
+
+from p2000.pipeline import Pipeline, Spill
+from tests.fakes import FakeConnection, CollectingReader
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.lines = [str(i).encode("ascii") for i in range(200)]
+
+    def test_block(self):
+        result = []
+        pipeline = Pipeline(result.append, workers=1, size=4).start()
+        pipeline.feed(self.lines)
+        pipeline.stop()
+        self.assertEqual(result, self.lines)
+        self.assertEqual(pipeline.stats.enqueued, 200)
+        self.assertEqual(pipeline.stats.processed, 200)
+        self.assertEqual(pipeline.stats.dropped, 0)
+
+    def test_drop_oldest(self):
+        gate = threading.Event()
+        result = []
+
+        def act(line):
+            gate.wait()
+            result.append(line)
+
+        pipeline = Pipeline(act, workers=1, size=4, overflow=Pipeline.DROP_OLDEST).start()
+        pipeline.feed(self.lines)
+        gate.set()
+        pipeline.stop()
+        self.assertEqual(pipeline.stats.processed + pipeline.stats.dropped, 200)
+        self.assertGreater(pipeline.stats.dropped, 0)
+        self.assertEqual(result[-4:], self.lines[-4:])
+
+    def test_spill(self):
+        gate = threading.Event()
+        result = []
+
+        def act(line):
+            gate.wait()
+            result.append(line)
+
+        pipeline = Pipeline(act, workers=1, size=4, overflow=Pipeline.SPILL).start()
+        pipeline.feed(self.lines)
+        self.assertGreater(pipeline.stats.spilled, 0)
+        gate.set()
+        pipeline.stop()
+        self.assertEqual(result, self.lines)
+        self.assertEqual(pipeline.stats.dropped, 0)
+
+    def test_errors(self):
+        def act(line):
+            raise ValueError(line)
+
+        pipeline = Pipeline(act, workers=2).start()
+        with self.assertLogs("p2000.pipeline", "ERROR") as logs:
+            pipeline.feed(self.lines[:10])
+            pipeline.stop()
+        self.assertEqual(len(logs.records), 10)
+        self.assertIsNotNone(logs.records[0].exc_info)
+        self.assertEqual(pipeline.stats.errors, 10)
+        self.assertEqual(pipeline.stats.processed, 10)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Pipeline, print, overflow="unknown")
+        self.assertRaises(ValueError, Pipeline, print, workers=0)
+
+    def test_spill_roundtrip(self):
+        spill = Spill()
+        spill.write((1.5, b"a b\nc"))
+        spill.write((2.5, b""))
+        self.assertEqual(spill.read(), (1.5, b"a b\nc"))
+        self.assertEqual(spill.read(), (2.5, b""))
+        self.assertEqual(spill.read(), None)
+        spill.close()
+
+
+class TestPipelinedReader(unittest.TestCase):
+
+    def test_attach(self):
+        lines = [str(i).encode("ascii") for i in range(50)]
+        reader = CollectingReader(workers=3, queue_size=8)
+        reader.attach(FakeConnection(lines))
+        self.assertEqual(sorted(reader.received), sorted(lines))
+        self.assertEqual(reader.stats.processed, 50)
+        self.assertEqual(reader.connection, None)
+
+    def test_attach_inline(self):
+        lines = [b"1", b"2"]
+        reader = CollectingReader()
+        reader.attach(FakeConnection(lines))
+        self.assertEqual(reader.received, lines)
+        self.assertEqual(reader.stats, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from p2000.metrics import render_prometheus
+from p2000.receivers import ReceiverPool
+from p2000.replay import ReplayConnection
+from p2000.supervisor import SupervisedConnection
+from tests.fakes import CollectingReader
+
+
+def flex(second, capcode):
+    return "FLEX|2018-09-15 21:42:{0:02d}|1600/2/K/A|10.120|{1}|ALN|A2 Dorpsstraat Groningen\n".format(second, capcode)
+
+
+def replay(metrics, path, **kwargs):
+    return ReplayConnection(path, speed=None)
+
+
+class FailingConnection(ReplayConnection):
+
+    def open(self, **kwargs):
+        super(FailingConnection, self).open(**kwargs)
+        self.stdout = self.__fail__()
+
+    @staticmethod
+    def __fail__():
+        yield flex(0, "000000001").encode("utf-8")
+        raise IOError("USB error")
+
+
+class UnopenableConnection(ReplayConnection):
+
+    def open(self, **kwargs):
+        raise IOError("No dongle")
+
+
+class TestReceiverPool(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.paths = []
+        for receiver, count in enumerate((3, 2)):
+            path = os.path.join(self.directory, "{0}.log".format(receiver))
+            with open(path, "w") as f:
+                for second in range(count):
+                    f.write(flex(second, "00000000{0}".format(receiver)))
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_merge(self):
+        pool = ReceiverPool([{"name": "north", "path": self.paths[0]}, {"name": "south", "path": self.paths[1]}],
+                            factory=replay, queue_size=1)
+        reader = CollectingReader(workers=2)
+        reader.attach(pool)
+        expected = []
+        for path in self.paths:
+            with open(path, "rb") as f:
+                expected += f.readlines()
+        self.assertEqual(sorted(reader.received), sorted(expected))
+        stats = pool.stats
+        self.assertEqual((stats["north"]["lines"], stats["south"]["lines"]), (3, 2))
+        self.assertFalse(stats["north"]["running"])
+        self.assertIsNone(pool.stdout)
+        self.assertIn('p2000_lines_read_total{receiver="south"} 2', render_prometheus(pool.metrics))
+
+    def test_error(self):
+        pool = ReceiverPool([{"path": self.paths[0]}, {"path": self.paths[1]}],
+                            factory=lambda metrics, path: FailingConnection(path, speed=None))
+        reader = CollectingReader()
+        reader.attach(pool)
+        self.assertEqual(len(reader.received), 2)
+        self.assertEqual(sorted(pool.stats), ["0", "1"])
+        self.assertIn("USB error", pool.stats["0"]["error"])
+
+    def test_open_error(self):
+        connections = [ReplayConnection(self.paths[0], speed=None), UnopenableConnection(self.paths[1], speed=None)]
+        pool = ReceiverPool([{}, {}], factory=lambda metrics: connections.pop(0))
+        opened = pool.receivers[0].connection
+        self.assertRaises(IOError, pool.open)
+        self.assertIsNone(opened.stdout)
+        self.assertTrue(all(r.thread is None for r in pool.receivers))
+
+    def test_settings(self):
+        pool = ReceiverPool([{"name": "a", "device": 0}, {"name": "b", "device": 1, "frequency": "169.6M", "ppm": 0}])
+        connections = [r.connection for r in pool.receivers]
+        self.assertTrue(all(isinstance(c, SupervisedConnection) for c in connections))
+        self.assertEqual(connections[1].COMMAND_RTLFM,
+                         ["rtl_fm", "-d", "1", "-f", "169.6M", "-M", "fm", "-s", "22050", "-p", "0", "-g", "30"])
+        self.assertIs(connections[0].metrics, pool.receivers[0].metrics)
+        self.assertEqual([r.name for r in ReceiverPool().receivers], ["0"])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, ReceiverPool, [])
+        self.assertRaises(ValueError, ReceiverPool, [{"name": "a"}, {"name": "a"}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from p2000.replay import ReplayConnection
+from tests.fakes import CollectingReader
+
+
+def flex(second):
+    return "FLEX|2018-09-15 21:42:{0:02d}|1600/2/K/A|10.120|001523172|ALN|A2 Dorpsstraat Groningen\n".format(second)
+
+
+class CatReplay(ReplayConnection):
+    COMMAND_MULTI = ["cat"]
+
+
+class TestReplayConnection(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "flex.log")
+        with open(self.path, "w") as f:
+            f.write(flex(0) + "multimon-ng status line\n" + flex(1) + flex(1) + flex(59))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def replay(self, connection):
+        reader = CollectingReader()
+        start = time.time()
+        reader.attach(connection)
+        return reader.received, time.time() - start
+
+    def test_fastest(self):
+        received, seconds = self.replay(ReplayConnection(self.path, speed=None))
+        self.assertEqual(len(received), 5)
+        self.assertEqual(received[0].decode("utf-8"), flex(0))
+        self.assertLess(seconds, 0.5)
+
+    def test_speed(self):
+        connection = ReplayConnection(self.path, speed=10, max_gap=2)
+        received, seconds = self.replay(connection)
+        self.assertEqual(len(received), 5)
+        # 1 second to the second line, and the gap of 58 seconds is capped at 2 seconds.
+        self.assertGreaterEqual(seconds, 0.3)
+        self.assertLess(seconds, 1.0)
+        self.assertEqual(connection.replayed, 5)
+        self.assertIsNone(connection.stdout)
+
+    def test_kill(self):
+        connection = ReplayConnection(self.path, speed=1)
+        connection.open()
+        next(connection.stdout)
+        threading.Timer(0.1, connection.stopped.set).start()
+        start = time.time()
+        self.assertEqual(len(list(connection.stdout)), 1)
+        self.assertLess(time.time() - start, 0.5)
+        connection.kill()
+
+    def test_raw(self):
+        # cat stands in for multimon-ng, the recording is passed through as is.
+        with open(self.path, "rb") as f:
+            size = len(f.read())
+        received, _ = self.replay(CatReplay(self.path, format="raw", speed=None))
+        self.assertEqual(len(received), 5)
+        received, seconds = self.replay(CatReplay(self.path, format="raw", speed=1, sample_rate=size))
+        self.assertEqual(len(received), 5)
+        self.assertGreaterEqual(seconds, 0.4)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, ReplayConnection, self.path, format="wav")
+        self.assertRaises(ValueError, ReplayConnection, self.path, speed=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from datetime import datetime
+
+from p2000.rtlsdr import Line, parse_many
+
+CLASSIC = "FLEX: 2018-09-15 21:42:05 1600/2/K/A 10.120 [001523172] ALN A2 Dorpsstraat  Groningen 12345 x"
+PIPES = "FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|001523172 000123456|ALN|A2 Dorpsstraat Groningen"
+
+
+# noinspection SpellCheckingInspection
+class TestLine(unittest.TestCase):
+
+    def setUp(self):
+        pass
+
+    def test_classic(self):
+        line = Line(CLASSIC)
+        words = CLASSIC.split()
+        self.assertEqual(line.line, CLASSIC)
+        self.assertEqual(line.timestamp, " ".join(words[1:2]))
+        self.assertEqual(line.monitorcode, words[5].strip("[]"))
+        self.assertEqual(line.message, " ".join(words[6:-1]))
+        self.assertEqual(line.capcodes, ["001523172"])
+        self.assertEqual(line.time, "21:42:05")
+        self.assertEqual(line.datetime, datetime(2018, 9, 15, 21, 42, 5))
+        self.assertEqual((line.baud, line.levels, line.phase, line.type), (1600, 2, "K", "A"))
+        self.assertEqual((line.cycle, line.frame), (10, 120))
+
+    def test_classic_whitespace(self):
+        for raw in [CLASSIC + "\n", CLASSIC + " \r\n", CLASSIC.replace(" x", "\tx"), CLASSIC + "  ",
+                    "FLEX: 2018-09-15 21:42:05 1600/2/K/A 10.120 [001523172] ALN A2 x y \n"]:
+            self.assertEqual(Line(raw).message, " ".join(raw.split()[6:-1]), repr(raw))
+
+    def test_pipes(self):
+        line = Line(PIPES)
+        self.assertEqual(line.timestamp, "2018-09-15")
+        self.assertEqual(line.time, "21:42:05")
+        self.assertEqual(line.monitorcode, "001523172")
+        self.assertEqual(line.capcodes, ["001523172", "000123456"])
+        self.assertEqual(line.message, "ALN A2 Dorpsstraat Groningen")
+        self.assertEqual(line.baud, 1600)
+
+    def test_kwargs(self):
+        line = Line(CLASSIC, timestamp="t", monitorcode="m", message="msg")
+        self.assertEqual((line.timestamp, line.monitorcode, line.message), ("t", "m", "msg"))
+
+    def test_slots(self):
+        self.assertRaises(AttributeError, setattr, Line(CLASSIC), "other", 1)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, Line, "")
+        self.assertRaises(ValueError, Line, "FLEX: 2018-09-15 21:42:05")
+
+    def test_parse(self):
+        line = Line.parse((CLASSIC + "\n").encode("utf-8"))
+        self.assertEqual(line.line, CLASSIC)
+
+    def test_parse_many(self):
+        buffer = "\n".join([CLASSIC, "", "multimon-ng 1.1.5", PIPES, "FLEX|broken"]).encode("utf-8")
+        lines = parse_many(buffer)
+        self.assertEqual([l.line for l in lines], [CLASSIC, PIPES])
+
+
+if __name__ == '__main__':
+    unittest.main()
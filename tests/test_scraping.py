@@ -0,0 +1,71 @@
+import time
+import unittest
+
+from p2000 import Region, Discipline
+from p2000.storage.units import Scraper, scrape_all
+from p2000.storage.units.scraping import RateLimiter
+from tests.stand_in import StandIn
+
+
+# noinspection SpellCheckingInspection
+class TestScraper(unittest.TestCase):
+
+    def setUp(self):
+        self.stand_in = StandIn().__enter__()
+
+    def tearDown(self):
+        self.stand_in.__exit__()
+
+    def test_get_units(self):
+        scraper = Scraper(Region.GRONINGEN, base_url=self.stand_in.url)
+        units = scraper.get_units()
+        self.assertEqual([len(u) for u in units], [3, 2])
+        self.assertEqual(units[0][1].capcode, "0100002")
+        self.assertEqual(units[0][1].town, "Haren")
+        self.assertEqual(units[0][1].function, "Brandweer Haren & Glimmen")
+        self.assertEqual(units[0][2].function, "Brandweer Appingedam Algemeen")
+        self.assertEqual(units[0][0].discipline, Discipline.FIRE_DEPARTMENT)
+        self.assertEqual(units[1][0].discipline, Discipline.AMBULANCE)
+        self.assertEqual(units[1][0].region, Region.GRONINGEN)
+
+    def test_retry(self):
+        path = "/capcodes-per-regio/01-groningen"
+        self.stand_in.failures[path] = 2
+        scraper = Scraper(Region.GRONINGEN, base_url=self.stand_in.url, backoff=0)
+        self.assertEqual(len(scraper.get_units()), 2)
+        self.assertEqual(self.stand_in.requests.count(path), 3)
+
+    def test_retry_exhausted(self):
+        path = "/capcodes-per-regio/01-groningen"
+        self.stand_in.failures[path] = 5
+        scraper = Scraper(Region.GRONINGEN, base_url=self.stand_in.url, backoff=0, retries=1)
+        self.assertEqual(scraper.get_page(self.stand_in.url + path), None)
+
+    def test_scrape_all(self):
+        regions = [Region.GRONINGEN, Region.FRIESLAND, Region.DRENTHE]
+        units = list(scrape_all(regions, base_url=self.stand_in.url, max_workers=4))
+        self.assertEqual(len(units), 15)
+        self.assertEqual(set(u.region for u in units), set(regions))
+        self.assertEqual(len(self.stand_in.requests), 9)
+
+    def test_scrape_all_disciplines(self):
+        units = list(scrape_all([Region.GRONINGEN, Region.TWENTE], [Discipline.AMBULANCE],
+                                base_url=self.stand_in.url))
+        self.assertEqual(len(units), 4)
+        self.assertEqual(set(u.discipline for u in units), set([Discipline.AMBULANCE]))
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_wait(self):
+        limiter = RateLimiter(20)
+        start = time.time()
+        for _ in range(3):
+            limiter.wait("http://a/page")
+        limiter.wait("http://b/page")
+        self.assertGreaterEqual(time.time() - start, 0.1)
+        self.assertLess(time.time() - start, 0.15)
+        self.assertEqual(sorted(limiter.slots.keys()), ["a", "b"])
+
+if __name__ == '__main__':
+    unittest.main()
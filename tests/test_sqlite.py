@@ -0,0 +1,148 @@
+import unittest
+from datetime import datetime
+
+from p2000 import Unit, Region, Discipline
+from p2000.rtlsdr import Line
+from p2000.storage import backends
+from p2000.storage.alarms import SQLiteConnection as AlarmsConnection, BufferedWriter
+from p2000.storage.units import SQLiteConnection as UnitsConnection, UnitCache
+
+
+def unit(capcode, town="Groningen", region=Region.GRONINGEN, discipline=Discipline.FIRE_DEPARTMENT):
+    return Unit(capcode=capcode, region=region, town=town, function="test", discipline=discipline)
+
+
+def flex(minute, second, capcodes="001523172", message="A2 Dorpsstraat Groningen"):
+    return "FLEX|2018-09-15 21:{0:02d}:{1:02d}|1600/2/K/A|10.120|{2}|ALN|{3}".format(minute, second, capcodes, message)
+
+
+class TestUnits(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = UnitsConnection(":memory:").establish()
+        self.changed = []
+        self.connection.add_listener(self.changed.extend)
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_establish(self):
+        self.assertTrue(self.connection.established)
+        self.assertEqual(self.connection.ensure_indexes(), ["units_capcode", "units_region_discipline"])
+
+    def test_health(self):
+        result = self.connection.health()
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["url"], ":memory:")
+        self.assertIsNone(result["error"])
+        self.connection.close()
+        result = self.connection.health()
+        self.assertFalse(result["ok"])
+        self.assertIsNotNone(result["error"])
+
+    def test_find_units(self):
+        self.connection.write_units([unit("0100001"), unit("0100001", "Haren"), unit("0100002")])
+        self.assertEqual([u.town for u in self.connection.find_units("0100001")], ["Groningen", "Haren"])
+        self.assertEqual([u.town for u in self.connection.find_units("0100001", limit=1)], ["Groningen"])
+        self.assertEqual(self.connection.find_units("0100001", limit=0), [])
+        self.assertEqual(self.connection.find_units("0100001", limit=-1), [])
+        self.assertEqual(self.connection.find_units("0100002")[0].region, Region.GRONINGEN)
+        self.assertEqual(self.connection.find_units("0999999"), [])
+        found = self.connection.find_units_many(["0100001", "0100002", "0999999"])
+        self.assertEqual(sorted((k, len(v)) for k, v in found.items()),
+                         [("0100001", 2), ("0100002", 1), ("0999999", 0)])
+        self.assertEqual(len(self.connection.all_units()), 3)
+        self.assertEqual(self.changed, ["0100001", "0100001", "0100002"])
+
+    def test_sync(self):
+        units = [unit("0100001"), unit("0100002"), unit("0100003"), unit("0200001", region=Region.FRIESLAND)]
+        counts = self.connection.sync_units(units)
+        self.assertEqual(counts, {"inserted": 4, "updated": 0, "unchanged": 0, "deleted": 0})
+        self.assertEqual(self.connection.sync_units(units)["unchanged"], 4)
+
+        counts = self.connection.sync_units([unit("0100001"), unit("0100002", "Haren"), unit("0100004")],
+                                            region=Region.GRONINGEN)
+        self.assertEqual(counts, {"inserted": 1, "updated": 1, "unchanged": 1, "deleted": 1})
+        self.assertEqual(sorted(u.capcode for u in self.connection.all_units()),
+                         ["0100001", "0100002", "0100004", "0200001"])
+        self.assertEqual(self.connection.find_units("0100002")[0].town, "Haren")
+        self.assertEqual(sorted(self.changed[4:]), ["0100002", "0100003", "0100004"])
+
+    def test_cache(self):
+        self.connection.write_units([unit("1523172")])
+        cache = UnitCache(self.connection).preload()
+        line = cache.enrich(Line(flex(42, 0)))
+        self.assertEqual([u.capcode for u in line.units], ["1523172"])
+
+
+class TestAlarms(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = AlarmsConnection(":memory:").establish()
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_find_alarms(self):
+        line = Line(flex(42, 0))
+        line.units = [unit("1523172")]
+        self.connection.write_alarms([line, Line(flex(42, 1, "000123456 001523172")), Line(flex(42, 2, "000123456"))])
+        self.connection.write_alarm(Line(flex(42, 3)))
+        self.assertEqual([l.message for l in self.connection.find_alarms(limit=1)], [Line(flex(42, 3)).message])
+        self.assertEqual(self.connection.find_alarms(limit=0), [])
+        self.assertEqual(self.connection.find_alarms(capcode="001523172", limit=-1), [])
+        found = self.connection.find_alarms(capcode="001523172")
+        self.assertEqual([l.line for l in found], [flex(42, 3), flex(42, 1, "000123456 001523172"), flex(42, 0)])
+        self.assertEqual(found[-1].units[0].discipline, Discipline.FIRE_DEPARTMENT)
+        self.assertIsNone(found[0].units)
+        found = self.connection.find_alarms(start=datetime(2018, 9, 15, 21, 42, 1), end=datetime(2018, 9, 15, 21, 42, 3))
+        self.assertEqual(len(found), 2)
+        self.assertEqual(len(self.connection.find_alarms(capcode="000123456", end=datetime(2018, 9, 15, 21, 42, 2))), 1)
+
+    def test_counts(self):
+        self.connection.write_alarms([Line(flex(minute, 0, message="A{0}".format(i)))
+                                      for i, minute in enumerate((0, 0, 1, 30))])
+        start, end = datetime(2018, 9, 15, 21), datetime(2018, 9, 15, 22)
+        minutes = self.connection.alarm_counts(start, end, bucket="minute")
+        self.assertEqual([(c["start"].minute, c["count"]) for c in minutes], [(0, 2), (1, 1), (30, 1)])
+        hours = self.connection.alarm_counts(start, end, group_by="region_discipline")
+        self.assertEqual(hours, [{"start": start, "count": 4,
+                                  "counts": {(Region.UNKNOWN, Discipline.UNKNOWN): 4}}])
+        self.assertEqual(self.connection.alarm_counts(start, end, group_by="capcode")[0]["counts"], {"001523172": 4})
+        self.assertRaises(ValueError, self.connection.alarm_counts, start, end, bucket="week")
+
+    def test_idempotent(self):
+        lines = [Line(flex(42, 0)), Line(flex(42, 1)), Line(flex(42, 0))]
+        self.connection.write_alarms(lines)
+        self.connection.write_alarms(lines[1:] + [Line(flex(42, 2))])
+        self.assertEqual([l.line for l in self.connection.find_alarms()], [flex(42, 2), flex(42, 1), flex(42, 0)])
+        self.assertEqual(len(self.connection.find_alarms(capcode="001523172")), 3)
+        counts = self.connection.alarm_counts(datetime(2018, 9, 15, 21), datetime(2018, 9, 15, 22))
+        self.assertEqual([c["count"] for c in counts], [3])
+
+    def test_writer(self):
+        with BufferedWriter(self.connection, interval=0.05) as writer:
+            for second in range(10):
+                writer.write(Line(flex(42, second)))
+        self.assertEqual(writer.written, 10)
+        self.assertEqual(len(self.connection.find_alarms()), 10)
+
+    def test_drop(self):
+        self.connection.write_alarm(Line(flex(42, 0)))
+        self.connection.drop_collection()
+        self.assertEqual(self.connection.find_alarms(), [])
+        self.assertEqual(self.connection.alarm_counts(datetime(2018, 1, 1), datetime(2019, 1, 1)), [])
+
+
+class TestBackends(unittest.TestCase):
+
+    def test_create_connection(self):
+        self.assertIsInstance(backends.create_connection("units", "sqlite"), UnitsConnection)
+        self.assertIsInstance(backends.create_connection("alarms", "sqlite"), AlarmsConnection)
+        self.assertEqual(type(backends.create_connection("alarms")), backends.alarms.Connection)
+        self.assertRaises(ValueError, backends.create_connection, "units", "redis")
+        self.assertRaises(ValueError, backends.create_connection, "towns", "sqlite")
+
+
+if __name__ == '__main__':
+    unittest.main()
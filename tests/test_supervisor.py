@@ -0,0 +1,85 @@
+import threading
+import time
+import unittest
+
+from p2000.metrics import Metrics
+from p2000.supervisor import SupervisedConnection
+from tests.fakes import CollectingReader
+
+FLEX = "FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|001523172|ALN|A2 Dorpsstraat Groningen"
+
+
+class FakeSupervisedConnection(SupervisedConnection):
+    # rtl_fm is replaced by a shell that prints lines, multimon-ng by cat.
+    COMMAND_MULTI = ["cat"]
+
+    def __init__(self, script, **kwargs):
+        super(FakeSupervisedConnection, self).__init__(**kwargs)
+        self.COMMAND_RTLFM = ["sh", "-c", script]
+        self.spawned = []
+
+    def __spawn__(self):
+        super(FakeSupervisedConnection, self).__spawn__()
+        self.spawned.append((self.rtlfm_process, self.multi_process))
+
+
+class TestSupervisedConnection(unittest.TestCase):
+
+    def test_exit(self):
+        metrics = Metrics()
+        connection = FakeSupervisedConnection("echo '{0}'; printf partial".format(FLEX), backoff=0.01,
+                                              max_restarts=3, poll_interval=0.05)
+        reader = CollectingReader(metrics=metrics)
+        reader.attach(connection)
+        self.assertEqual(len(reader.received), 8)
+        self.assertEqual(reader.received[0], (FLEX + "\n").encode("utf-8"))
+        self.assertEqual(reader.received[1], b"partial")
+        self.assertEqual(connection.restarts, 3)
+        self.assertEqual(metrics.restarts.value, 3)
+        self.assertEqual(connection.reason, "exit")
+        self.assertEqual(len(connection.spawned), 4)
+        for processes in connection.spawned:
+            self.assertTrue(all(p.poll() is not None for p in processes))
+
+    def test_stall(self):
+        connection = FakeSupervisedConnection("echo '{0}'; exec sleep 30".format(FLEX), stall_timeout=0.2,
+                                              max_restarts=1, poll_interval=0.05)
+        reader = CollectingReader()
+        start = time.time()
+        reader.attach(connection)
+        self.assertLess(time.time() - start, 5)
+        self.assertEqual(len(reader.received), 2)
+        self.assertEqual(connection.reason, "stall")
+        for rtlfm, multi in connection.spawned:
+            self.assertIsNotNone(rtlfm.poll())
+            self.assertIsNotNone(multi.poll())
+
+    def test_backoff(self):
+        connection = FakeSupervisedConnection("true", backoff=0.1, max_backoff=0.2, max_restarts=4,
+                                              poll_interval=0.05)
+        start = time.time()
+        list(self.open(connection))
+        # The first restart is immediate, then 0.1, 0.2 and 0.2 seconds.
+        self.assertGreaterEqual(time.time() - start, 0.5)
+        self.assertEqual(connection.restarts, 4)
+
+    def test_kill(self):
+        connection = FakeSupervisedConnection("exec sleep 30", poll_interval=0.05)
+        stdout = self.open(connection)
+        timer = threading.Timer(0.2, connection.kill)
+        timer.start()
+        start = time.time()
+        self.assertEqual(list(stdout), [])
+        self.assertLess(time.time() - start, 5)
+        timer.join()
+        self.assertEqual(connection.restarts, 0)
+        self.assertIsNotNone(connection.spawned[0][0].poll())
+
+    @staticmethod
+    def open(connection):
+        connection.open()
+        return connection.stdout
+
+
+if __name__ == '__main__':
+    unittest.main()
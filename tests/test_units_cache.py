@@ -0,0 +1,72 @@
+import unittest
+
+from p2000 import Unit, Region, Discipline
+from p2000.rtlsdr import Line
+from p2000.storage.units import UnitCache
+from tests.fakes import FakeUnitsConnection
+
+
+def unit(capcode, town="Groningen"):
+    return Unit(capcode=capcode, region=Region.GRONINGEN, town=town,
+                function="test", discipline=Discipline.FIRE_DEPARTMENT)
+
+
+class TestUnitCache(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = FakeUnitsConnection()
+        self.connection.write_units([unit("1523172"), unit("1523172", "Haren"), unit("0123456")])
+        self.line = Line("FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|001523172 000123456 000999999|ALN|A2 test")
+
+    def test_lru(self):
+        cache = UnitCache(self.connection)
+        self.assertEqual(len(cache.enrich(self.line).units), 3)
+        self.assertEqual(self.connection.collection.queries, 1)
+        cache.enrich(self.line)
+        self.assertEqual(self.connection.collection.queries, 1)
+        self.assertEqual(cache.stats["hits"], 3)
+        self.assertEqual(cache.stats["misses"], 3)
+
+    def test_ttl(self):
+        cache = UnitCache(self.connection, ttl=-1, negative_ttl=-1)
+        cache.enrich(self.line)
+        cache.enrich(self.line)
+        self.assertEqual(cache.stats["misses"], 6)
+
+    def test_size(self):
+        cache = UnitCache(self.connection, size=2)
+        cache.enrich(self.line)
+        self.assertEqual(cache.stats["size"], 2)
+        self.assertEqual(cache.stats["evictions"], 1)
+
+    def test_lru_format(self):
+        self.connection.write_units([unit("100040"), unit("000123456", "Haren")])
+        line = Line("FLEX|2018-09-15 21:42:05|1600/2/K/A|10.120|000100040 000123456|ALN|A2 test")
+        lru = UnitCache(self.connection)
+        self.assertEqual(sorted(u.town for u in lru.enrich(line).units), ["Groningen", "Groningen", "Haren"])
+        self.assertEqual(len(lru.find_units("100040")), 1)
+        preload = UnitCache(self.connection).preload()
+        self.assertEqual(sorted(u.town for u in preload.enrich(line).units), ["Groningen", "Groningen", "Haren"])
+
+    def test_preload(self):
+        cache = UnitCache(self.connection).preload()
+        queries = self.connection.collection.queries
+        self.assertEqual([u.town for u in cache.enrich(self.line).units], ["Groningen", "Haren", "Groningen"])
+        self.assertEqual(self.connection.collection.queries, queries)
+        self.assertEqual(cache.stats["misses"], 0)
+
+    def test_invalidate(self):
+        cache = UnitCache(self.connection).preload()
+        self.assertEqual(cache.find_units("000999999"), [])
+        self.connection.write_unit(unit("0999999"))
+        self.assertEqual(len(cache.find_units("000999999")), 1)
+        self.assertEqual(cache.stats["misses"], 1)
+
+        lru = UnitCache(self.connection)
+        self.assertEqual(len(lru.find_units("1523172")), 2)
+        self.connection.write_units([unit("1523172")])
+        self.assertEqual(len(lru.find_units("1523172")), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
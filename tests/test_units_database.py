@@ -0,0 +1,84 @@
+import unittest
+
+from p2000 import Unit, Region, Discipline
+from tests.fakes import FakeUnitsConnection
+
+
+def unit(capcode, town="Groningen", region=Region.GRONINGEN, discipline=Discipline.FIRE_DEPARTMENT):
+    return Unit(capcode=capcode, region=region, town=town, function="test", discipline=discipline)
+
+
+# noinspection SpellCheckingInspection
+class TestSyncUnits(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = FakeUnitsConnection()
+        self.changed = []
+        self.connection.add_listener(self.changed.extend)
+
+    def test_sync(self):
+        units = [unit("0100001"), unit("0100002"), unit("0100003")]
+        counts = self.connection.sync_units(units)
+        self.assertEqual(counts, {"inserted": 3, "updated": 0, "unchanged": 0, "deleted": 0})
+        self.assertEqual(self.connection.collection.count_documents({}), 3)
+
+        writes = self.connection.collection.writes
+        counts = self.connection.sync_units(units, batch_size=2)
+        self.assertEqual(counts, {"inserted": 0, "updated": 0, "unchanged": 3, "deleted": 0})
+        self.assertEqual(self.connection.collection.writes, writes)
+
+        counts = self.connection.sync_units([unit("0100001"), unit("0100002", "Haren"), unit("0100004")])
+        self.assertEqual(counts, {"inserted": 1, "updated": 1, "unchanged": 1, "deleted": 1})
+        self.assertEqual(sorted(r["capcode"] for r in self.connection.collection.rows),
+                         ["0100001", "0100002", "0100004"])
+        self.assertEqual(self.connection.find_units("0100002")[0].town, "Haren")
+        self.assertEqual(sorted(self.changed[3:]), ["0100002", "0100003", "0100004"])
+
+    def test_duplicates(self):
+        self.connection.write_units([unit("0100001"), unit("0100001")])
+        counts = self.connection.sync_units([unit("0100001")])
+        self.assertEqual(counts, {"inserted": 0, "updated": 0, "unchanged": 1, "deleted": 1})
+        self.assertEqual(self.connection.collection.count_documents({}), 1)
+
+    def test_scope(self):
+        self.connection.sync_units([
+            unit("0100001"), unit("0200001", region=Region.FRIESLAND),
+            unit("0120001", discipline=Discipline.AMBULANCE)
+        ])
+        counts = self.connection.sync_units([unit("0100002")])
+        self.assertEqual(counts["deleted"], 1)
+        self.assertEqual(self.connection.collection.count_documents({}), 3)
+
+        counts = self.connection.sync_units([], region=Region.GRONINGEN)
+        self.assertEqual(counts["deleted"], 2)
+        self.assertEqual([r["capcode"] for r in self.connection.collection.rows], ["0200001"])
+        self.assertEqual(self.connection.sync_units([])["deleted"], 0)
+
+
+class TestFindUnits(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = FakeUnitsConnection()
+        self.connection.write_units([unit("0100001"), unit("0100001", "Haren"), unit("0100002")])
+
+    def test_find_units(self):
+        self.assertEqual([u.town for u in self.connection.find_units("0100001")], ["Groningen", "Haren"])
+        self.assertEqual([u.town for u in self.connection.find_units("0100001", limit=1)], ["Groningen"])
+        self.assertEqual(self.connection.find_units("0100001", limit=0), [])
+        self.assertEqual(self.connection.find_units("0999999"), [])
+
+    def test_find_units_many(self):
+        found = self.connection.find_units_many(["0100001", "0100002", "0999999"])
+        self.assertEqual(self.connection.collection.queries, 1)
+        self.assertEqual(sorted((k, len(v)) for k, v in found.items()),
+                         [("0100001", 2), ("0100002", 1), ("0999999", 0)])
+        self.assertEqual(self.connection.find_units_many([]), {})
+
+    def test_ensure_indexes(self):
+        names = self.connection.ensure_indexes()
+        self.assertEqual(names, ["capcode", "region_discipline", "town_function_text"])
+        self.assertEqual(len(self.connection.collection.indexes), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import unittest
+
+from p2000 import Unit, Region, Discipline
+from p2000.storage.units import CapcodeIndex
+from tests.fakes import FakeUnitsConnection
+
+FIRE = (Region.GRONINGEN, Discipline.FIRE_DEPARTMENT)
+AMBULANCE = (Region.GRONINGEN, Discipline.AMBULANCE)
+POLICE = (Region.TWENTE, Discipline.POLICE)
+UNKNOWN = (Region.UNKNOWN, Discipline.UNKNOWN)
+
+
+def unit(capcode, label):
+    return Unit(capcode=capcode, region=label[0], town="Town", function="test", discipline=label[1])
+
+
+class TestCapcodeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.connection = FakeUnitsConnection()
+        self.connection.write_units([
+            unit("0100010", FIRE), unit("0100020", FIRE), unit("0100030", FIRE),
+            unit("0100500", AMBULANCE), unit("0100600", AMBULANCE),
+            unit("0512000", POLICE), unit("0512900", POLICE)
+        ])
+        self.index = CapcodeIndex(self.connection).build()
+
+    def test_known(self):
+        self.assertEqual(self.index.guess("0100020"), FIRE)
+        self.assertEqual(self.index.guess("000100500"), AMBULANCE)
+        self.assertEqual(self.index.guess(512000), POLICE)
+
+    def test_range(self):
+        self.assertEqual(self.index.guess("0100015"), FIRE)
+        self.assertEqual(self.index.guess("0100550"), AMBULANCE)
+        self.assertEqual(self.index.guess("0512345"), POLICE)
+
+    def test_prefix(self):
+        self.assertEqual(self.index.guess("0512999"), POLICE)
+        self.assertEqual(self.index.guess("0100900"), UNKNOWN)  # Between the fire and ambulance prefixes.
+        self.assertEqual(self.index.guess("0100031"), FIRE)
+        self.assertEqual(self.index.guess("0900000"), UNKNOWN)
+        self.assertEqual(self.index.guess("abc"), UNKNOWN)
+
+    def test_guess_many(self):
+        self.assertEqual(self.index.guess_many(["000100010", "0512000"]), {"0100010": FIRE, "0512000": POLICE})
+
+    def test_update(self):
+        self.assertEqual(self.index.guess("0100040"), FIRE)
+        self.connection.write_units([unit("0100040", POLICE)])
+        self.assertEqual(self.index.guess("0100040"), POLICE)
+        self.assertEqual(self.index.guess("0100025"), FIRE)
+        self.assertEqual(self.index.stats, {"capcodes": 8, "ranges": 4, "prefixes": 8})
+
+        self.connection.collection.delete_many({"capcode": "0100040"})
+        self.index.update(["0100040"])
+        self.assertEqual(self.index.stats["capcodes"], 7)
+        self.assertEqual(self.index.guess("0100040"), FIRE)
+
+    def test_update_format(self):
+        # Capcodes that are not stored as 7 digits are normalised the same way by build() and update().
+        self.connection.write_units([unit("100040", POLICE)])
+        self.assertEqual(self.index.guess("0100040"), POLICE)
+        self.assertEqual(self.index.stats["capcodes"], CapcodeIndex(self.connection).build().stats["capcodes"])
+
+
+if __name__ == '__main__':
+    unittest.main()